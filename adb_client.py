@@ -0,0 +1,273 @@
+"""Pure-Python client for the ADB server host protocol (the server listening on port 5037).
+
+Every request is sent as a 4-digit hex length followed by the service name and the
+server answers OKAY or FAIL. host:* services are handled by the server itself; any
+other service first switches the connection to a device with host:transport.
+"""
+import os
+import shlex
+import socket
+import struct
+import subprocess
+import threading
+
+ADB_HOST = os.environ.get("ANDROID_ADB_SERVER_ADDRESS", "127.0.0.1")
+ADB_PORT = int(os.environ.get("ANDROID_ADB_SERVER_PORT", "5037"))
+
+# Shell protocol v2 packet ids (see adb/shell_protocol.h)
+SHELL_STDIN = 0
+SHELL_STDOUT = 1
+SHELL_STDERR = 2
+SHELL_EXIT = 3
+SHELL_CLOSE_STDIN = 4
+
+_SHELL_HEADER = struct.Struct("<BI")
+
+
+class AdbError(Exception):
+    pass
+
+
+class AdbCommandError(AdbError):
+    """Raised when a shell command exits with a non-zero status and check=True."""
+
+    def __init__(self, cmd, returncode, output="", stderr=""):
+        self.cmd = cmd
+        self.returncode = returncode
+        self.output = output
+        self.stderr = stderr
+        super().__init__(f"'{cmd}' exited with status {returncode}\n{stderr or output}".strip())
+
+
+def quote_command(cmd):
+    """Turn an argv list into a device shell command line; strings are passed through."""
+    if isinstance(cmd, str):
+        return cmd
+    return " ".join(shlex.quote(str(arg)) for arg in cmd)
+
+
+def parse_device_list(text):
+    """Parse `adb devices -l` style lines into dicts with serial, state and the key:value fields."""
+    result = []
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) < 2:
+            continue
+        info = {"serial": parts[0], "state": parts[1]}
+        for field in parts[2:]:
+            key, _, value = field.partition(":")
+            if value:
+                info[key] = value
+        result.append(info)
+    return result
+
+
+class AdbConnection:
+    """One socket to the ADB server, speaking the length-prefixed request format."""
+
+    def __init__(self, sock):
+        self.sock = sock
+
+    def send(self, service):
+        data = service.encode("utf-8")
+        self.sock.sendall(b"%04x" % len(data) + data)
+        self.read_status()
+
+    def read_status(self):
+        status = self.read_exact(4)
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            raise AdbError(self.read_string())
+        raise AdbError(f"Unexpected response from ADB server: {status!r}")
+
+    def read_exact(self, size):
+        buf = bytearray()
+        while len(buf) < size:
+            chunk = self.sock.recv(size - len(buf))
+            if not chunk:
+                raise AdbError("Connection closed by ADB server")
+            buf += chunk
+        return bytes(buf)
+
+    def read_string(self):
+        length = int(self.read_exact(4), 16)
+        return self.read_exact(length).decode("utf-8", "replace")
+
+    def iter_chunks(self, size=65536):
+        while True:
+            chunk = self.sock.recv(size)
+            if not chunk:
+                return
+            yield chunk
+
+    def read_all(self):
+        return b"".join(self.iter_chunks())
+
+    def settimeout(self, timeout):
+        self.sock.settimeout(timeout)
+
+    def close(self):
+        try:
+            # shutdown() also wakes up a reader blocked in recv() on another thread
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AdbClient:
+    """Talks to the local ADB server directly instead of spawning `adb` for every call.
+
+    The server closes a connection as soon as a one-shot service finishes, so each call
+    opens a new loopback socket; that costs microseconds compared to starting a new
+    adb process.
+    """
+
+    def __init__(self, host=ADB_HOST, port=ADB_PORT, timeout=10):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._features = {}
+        self._lock = threading.Lock()
+        self._server_started = False
+
+    # --- Connections ---
+
+    def open(self):
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        except ConnectionRefusedError:
+            if self._server_started:
+                raise AdbError("ADB server is not running")
+            # Same behaviour as the adb binary: start the server on first use
+            self._server_started = True
+            try:
+                subprocess.run(["adb", "start-server"], stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL, check=True)
+            except (OSError, subprocess.CalledProcessError) as e:
+                raise AdbError(f"Failed to start ADB server: {e}") from e
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return AdbConnection(sock)
+
+    def host_query(self, service):
+        with self.open() as conn:
+            conn.send(service)
+            return conn.read_string()
+
+    def transport(self, serial=None):
+        conn = self.open()
+        try:
+            conn.send(f"host:transport:{serial}" if serial else "host:transport-any")
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def open_service(self, service, serial=None, timeout=None):
+        """Open a device service and return the connection for the caller to stream from."""
+        conn = self.transport(serial)
+        try:
+            conn.send(service)
+        except Exception:
+            conn.close()
+            raise
+        conn.settimeout(timeout)
+        return conn
+
+    # --- Host services ---
+
+    def version(self):
+        return int(self.host_query("host:version"), 16)
+
+    def devices(self):
+        """Return [(serial, state), ...] just like the body of `adb devices`."""
+        result = []
+        for line in self.host_query("host:devices").splitlines():
+            parts = line.split("\t")
+            if len(parts) >= 2:
+                result.append((parts[0], parts[1]))
+        return result
+
+    def devices_long(self):
+        """Like devices() but each entry is a dict with serial, state and the
+        product/model/device/transport_id fields from `adb devices -l`."""
+        return parse_device_list(self.host_query("host:devices-l"))
+
+    def features(self, serial=None):
+        key = serial or ""
+        with self._lock:
+            if key in self._features:
+                return self._features[key]
+        service = f"host-serial:{serial}:features" if serial else "host:features"
+        features = set(self.host_query(service).split(","))
+        with self._lock:
+            self._features[key] = features
+        return features
+
+    def connect(self, address):
+        return self.host_query(f"host:connect:{address}")
+
+    def disconnect(self, address):
+        return self.host_query(f"host:disconnect:{address}")
+
+    # --- Device services ---
+
+    def shell_v2(self, cmd, serial=None, timeout=None):
+        """Run cmd with shell protocol v2 and return (stdout, stderr, exit_code) as bytes."""
+        cmd = quote_command(cmd)
+        stdout, stderr = bytearray(), bytearray()
+        exit_code = None
+        with self.open_service(f"shell,v2,raw:{cmd}", serial, timeout) as conn:
+            while exit_code is None:
+                try:
+                    packet_id, length = _SHELL_HEADER.unpack(conn.read_exact(_SHELL_HEADER.size))
+                except AdbError:
+                    break
+                payload = conn.read_exact(length)
+                if packet_id == SHELL_STDOUT:
+                    stdout += payload
+                elif packet_id == SHELL_STDERR:
+                    stderr += payload
+                elif packet_id == SHELL_EXIT:
+                    exit_code = payload[0] if payload else 0
+        return bytes(stdout), bytes(stderr), exit_code
+
+    def shell(self, cmd, serial=None, check=False, timeout=None):
+        """Run a shell command on the device and return its output as text."""
+        if "shell_v2" in self.features(serial):
+            stdout, stderr, code = self.shell_v2(cmd, serial, timeout)
+            out = stdout.decode("utf-8", "replace")
+            if check and code:
+                raise AdbCommandError(quote_command(cmd), code, out, stderr.decode("utf-8", "replace"))
+            return out
+        # Legacy devices: stdout and stderr are merged and the exit status is lost
+        with self.open_service(f"shell:{quote_command(cmd)}", serial, timeout) as conn:
+            return conn.read_all().decode("utf-8", "replace").replace("\r\n", "\n")
+
+    def exec_out(self, cmd, serial=None, timeout=None):
+        """Run cmd through the exec: service and return the raw, unmangled stdout bytes."""
+        with self.open_service(f"exec:{quote_command(cmd)}", serial, timeout) as conn:
+            return conn.read_all()
+
+    def tcpip(self, port, serial=None):
+        with self.open_service(f"tcpip:{port}", serial) as conn:
+            return conn.read_all().decode("utf-8", "replace")
+
+    def reboot(self, mode="", serial=None):
+        with self.open_service(f"reboot:{mode}", serial) as conn:
+            try:
+                conn.read_all()
+            except OSError:
+                # The device usually drops the connection while going down
+                pass
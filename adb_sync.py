@@ -0,0 +1,310 @@
+"""In-process implementation of the ADB `sync:` file transfer service.
+
+A single sync connection stays open for many STAT/LIST/RECV/SEND requests. The batch
+helpers (stat_many, pull_many, push_many) pipeline requests: several are written to
+the socket before the first answer is read, so the device never idles between files.
+"""
+import os
+import posixpath
+import stat as stat_mod
+import struct
+from collections import namedtuple
+
+from adb_client import AdbError
+
+SYNC_DATA_MAX = 64 * 1024
+DEFAULT_WINDOW = 32
+
+_HEADER = struct.Struct("<4sI")
+_STAT = struct.Struct("<III")
+_DENT = struct.Struct("<IIII")
+
+SyncStat = namedtuple("SyncStat", "mode size mtime")
+SyncEntry = namedtuple("SyncEntry", "name mode size mtime")
+
+
+class SyncError(AdbError):
+    pass
+
+
+class _LocalFailure(Exception):
+    def __init__(self, error):
+        self.error = error
+
+
+def is_dir(mode):
+    return stat_mod.S_ISDIR(mode)
+
+
+class SyncConnection:
+    """A `sync:` session on one device. Use as a context manager or call close()."""
+
+    def __init__(self, client, serial=None):
+        self.client = client
+        self.serial = serial
+        self.conn = None
+        self._open()
+
+    def _open(self):
+        self.conn = self.client.open_service("sync:", self.serial, timeout=self.client.timeout)
+
+    def _reopen(self):
+        # adbd ends the sync service after a failed RECV/SEND, so start a fresh one
+        self.conn.close()
+        self._open()
+
+    def _send_request(self, cmd, path):
+        data = path.encode("utf-8")
+        self.conn.sock.sendall(_HEADER.pack(cmd, len(data)) + data)
+
+    def _read_header(self):
+        return _HEADER.unpack(self.conn.read_exact(_HEADER.size))
+
+    def _read_fail(self, length):
+        return self.conn.read_exact(length).decode("utf-8", "replace")
+
+    # --- Single requests ---
+
+    def stat(self, path):
+        self._send_request(b"STAT", path)
+        return self._read_stat()
+
+    def _read_stat(self):
+        cmd = self.conn.read_exact(4)
+        if cmd != b"STAT":
+            raise SyncError(f"Unexpected sync response {cmd!r}")
+        return SyncStat(*_STAT.unpack(self.conn.read_exact(_STAT.size)))
+
+    def list(self, path):
+        """Return every entry of a remote directory (name, mode, size, mtime) in one request."""
+        self._send_request(b"LIST", path)
+        entries = []
+        while True:
+            cmd = self.conn.read_exact(4)
+            mode, size, mtime, namelen = _DENT.unpack(self.conn.read_exact(_DENT.size))
+            if cmd == b"DONE":
+                return entries
+            if cmd != b"DENT":
+                raise SyncError(f"Unexpected sync response {cmd!r}")
+            name = self.conn.read_exact(namelen).decode("utf-8", "replace")
+            if name not in (".", ".."):
+                entries.append(SyncEntry(name, mode, size, mtime))
+
+    def pull(self, remote_path, local_path, progress=None):
+        self._send_request(b"RECV", remote_path)
+        try:
+            return self._read_file(remote_path, local_path, progress)
+        except _LocalFailure as e:
+            raise e.error
+
+    def _read_file(self, remote_path, local_path, progress=None):
+        try:
+            f = open(local_path, "wb")
+        except OSError as e:
+            # RECV is already on the wire: drop the reply so the next one lines up
+            self._discard_file(remote_path)
+            raise _LocalFailure(e)
+        received = 0
+        try:
+            with f:
+                while True:
+                    cmd, length = self._read_header()
+                    if cmd == b"DATA":
+                        f.write(self.conn.read_exact(length))
+                        received += length
+                        if progress:
+                            progress(received)
+                    elif cmd == b"DONE":
+                        return received
+                    elif cmd == b"FAIL":
+                        raise SyncError(f"{remote_path}: {self._read_fail(length)}")
+                    else:
+                        raise SyncError(f"Unexpected sync response {cmd!r}")
+        except Exception:
+            try:
+                os.remove(local_path)
+            except OSError:
+                pass
+            raise
+
+    def _discard_file(self, remote_path):
+        while True:
+            cmd, length = self._read_header()
+            if cmd == b"DATA":
+                self.conn.read_exact(length)
+            elif cmd == b"DONE":
+                return
+            elif cmd == b"FAIL":
+                raise SyncError(f"{remote_path}: {self._read_fail(length)}")
+            else:
+                raise SyncError(f"Unexpected sync response {cmd!r}")
+
+    def push(self, local_path, remote_path, mode=0o644, progress=None):
+        try:
+            self._write_file(local_path, remote_path, mode, progress)
+        except _LocalFailure as e:
+            raise e.error
+        return self._read_send_status(remote_path)
+
+    def _write_file(self, local_path, remote_path, mode, progress=None):
+        sock = self.conn.sock
+        sent = 0
+        # Open first so an unreadable local file never leaves a half-sent request behind
+        try:
+            f = open(local_path, "rb")
+        except OSError as e:
+            raise _LocalFailure(e)
+        with f:
+            self._send_request(b"SEND", f"{remote_path},{stat_mod.S_IFREG | mode}")
+            while True:
+                chunk = f.read(SYNC_DATA_MAX)
+                if not chunk:
+                    break
+                sock.sendall(_HEADER.pack(b"DATA", len(chunk)) + chunk)
+                sent += len(chunk)
+                if progress:
+                    progress(sent)
+        mtime = int(os.path.getmtime(local_path))
+        sock.sendall(_HEADER.pack(b"DONE", mtime))
+        return sent
+
+    def _read_send_status(self, remote_path):
+        cmd, length = self._read_header()
+        if cmd == b"OKAY":
+            return
+        if cmd == b"FAIL":
+            raise SyncError(f"{remote_path}: {self._read_fail(length)}")
+        raise SyncError(f"Unexpected sync response {cmd!r}")
+
+    # --- Pipelined batches ---
+
+    def stat_many(self, paths, window=DEFAULT_WINDOW):
+        """STAT many remote paths, keeping up to `window` requests in flight."""
+        results = []
+        pending = 0
+        for path in paths:
+            self._send_request(b"STAT", path)
+            pending += 1
+            if pending >= window:
+                results.append(self._read_stat())
+                pending -= 1
+        while pending:
+            results.append(self._read_stat())
+            pending -= 1
+        return results
+
+    def pull_many(self, pairs, window=DEFAULT_WINDOW, progress=None, results=None):
+        """Pull [(remote, local), ...] over this connection.
+
+        Returns a list of (remote, local, error) where error is None on success.
+        progress(done, total, bytes_transferred) is called after every file. Results are
+        appended to `results` if given, so a caller whose progress callback raises to
+        cancel still sees the files finished before that.
+        """
+        def send_one(position, remote, local):
+            self._send_request(b"RECV", remote)
+
+        def read_reply(position, remote, local):
+            return self._read_file(remote, local)
+
+        return self._run_pipelined(list(pairs), window, send_one, read_reply, progress, results)
+
+    def push_many(self, pairs, mode=0o644, window=DEFAULT_WINDOW, progress=None, results=None):
+        """Push [(local, remote), ...]; same result format as pull_many."""
+        sizes = {}
+
+        def send_one(position, local, remote):
+            try:
+                sizes[position] = self._write_file(local, remote, mode)
+            except _LocalFailure as e:
+                # Nothing was sent for this file, so the session is still usable
+                sizes[position] = e
+
+        def read_reply(position, local, remote):
+            size = sizes.pop(position)
+            if isinstance(size, _LocalFailure):
+                raise size
+            self._read_send_status(remote)
+            return size
+
+        return self._run_pipelined(list(pairs), window, send_one, read_reply, progress, results)
+
+    def _run_pipelined(self, pairs, window, send_one, read_reply, progress, results=None):
+        results = [] if results is None else results
+        total_bytes = 0
+        retried = set()
+        index = 0
+        while index < len(pairs):
+            # Queue up a window of requests, then drain the answers in order
+            batch = pairs[index:index + window]
+            sent = 0
+            try:
+                for first, second in batch:
+                    send_one(sent, first, second)
+                    sent += 1
+            except OSError:
+                # The device already closed the session; the replies below say why
+                pass
+            for position, (first, second) in enumerate(batch):
+                error = None
+                local_failure = False
+                try:
+                    if position >= sent:
+                        raise AdbError("Sync session closed before the request was sent")
+                    total_bytes += read_reply(position, first, second)
+                except _LocalFailure as e:
+                    # The session is still in step: nothing was sent, or the reply was drained
+                    error = e.error
+                    local_failure = True
+                except SyncError as e:
+                    error = e
+                except (AdbError, OSError) as e:
+                    # Lost the connection rather than a per-file failure: retry once
+                    if index not in retried:
+                        retried.add(index)
+                        self._reopen()
+                        break
+                    error = e
+                index += 1
+                results.append((first, second, error))
+                if progress:
+                    progress(len(results), len(pairs), total_bytes)
+                if error is not None and not local_failure:
+                    # adbd ends the session on failure, dropping the rest of the window
+                    self._reopen()
+                    break
+        return results
+
+    def close(self):
+        if self.conn is None:
+            return
+        try:
+            self.conn.sock.sendall(_HEADER.pack(b"QUIT", 0))
+        except OSError:
+            pass
+        self.conn.close()
+        self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def pull_file(client, remote_path, local_path, serial=None):
+    """Pull a single file; a local directory target keeps the remote file name."""
+    if os.path.isdir(local_path):
+        local_path = os.path.join(local_path, posixpath.basename(remote_path))
+    with SyncConnection(client, serial) as sync:
+        sync.pull(remote_path, local_path)
+    return local_path
+
+
+def push_file(client, local_path, remote_path, serial=None):
+    """Push a single file; a remote directory target keeps the local file name."""
+    with SyncConnection(client, serial) as sync:
+        if remote_path.endswith("/") or is_dir(sync.stat(remote_path).mode):
+            remote_path = posixpath.join(remote_path, os.path.basename(local_path))
+        sync.push(local_path, remote_path)
+    return remote_path
@@ -3,12 +3,33 @@ import tkinter as tk
 from tkinter import messagebox, simpledialog, filedialog
 from PIL import Image, ImageTk
 import threading
-import time
 import os
-import re
 from colorama import Fore
 from localization_data import texts
-import tempfile
+from adb_client import AdbClient, AdbError
+from adb_sync import pull_file as sync_pull_file, push_file as sync_push_file
+from shell_session import ShellSessionPool
+import gallery_sync
+import dir_sync
+import tar_transfer
+import chunked_pull
+import contacts_export
+import device_snapshot
+import app_permissions
+import screen_capture
+from frame_sampler import FrameSampler, frame_image, record_frames
+from logcat_viewer import LogcatWindow
+from process_monitor import ProcessMonitor, ProcessMonitorWindow
+from telemetry import TelemetryRecorder, TelemetryWindow
+from output_viewer import OutputViewer
+from task_executor import TaskExecutor, TaskListWindow
+from device_manager import BroadcastResultWindow, DeviceLimiter, DeviceSelectorWindow, broadcast
+from device_tracker import ATTACHED, DETACHED, DeviceTracker
+from device_props import PropertyStore
+from device_settings import SettingsStore, format_changes, load_profile
+from package_index import PackageCatalog, PackageDialog
+import apk_installer
+from apk_metadata import ApkMetadataCache, ApkMetadataError
 import win32gui  # Make sure you have pywin32 installed: pip install pywin32
 import tkinter.ttk as ttk # For Combobox
 
@@ -20,50 +41,136 @@ menu_items = {}
 # Store references to all menu and menu items for language switching
 menu_refs = {}
 
-try:
-    from PIL.Image import Resampling
-except ImportError:
-    Resampling = None
-
-def wait_for_device():
+# Shared client for the local ADB server, used instead of spawning `adb` per call
+adb = AdbClient()
+# Persistent device shells for quick input/keyevent style commands
+shells = ShellSessionPool(adb)
+# Parsed getprop per device; dropped when the tracker sees the device go away or reboot
+properties = PropertyStore(adb)
+# Installed packages per device for autocomplete and lookups
+packages = PackageCatalog(adb)
+# Package name/versionCode of local APKs, keyed by size+mtime and hash
+apk_cache = ApkMetadataCache()
+# settings system/secure/global per device, updated by our own writes
+settings_store = SettingsStore(adb)
+# Live device list pushed by the ADB server; started once the app is created
+tracker = DeviceTracker(adb)
+# Serials picked in the device selector; empty means the single default device
+selected_serials = []
+# At most two actions at a time per phone, however many broadcasts are running
+device_limiter = DeviceLimiter(per_device=2)
+
+def run_task(name, work, on_success=None, error_message=None, dedicated=False):
+    """Runs work(task) on the background executor; errors come back as a message box.
+
+    Long-lived work (a reader that lasts as long as a subprocess) passes dedicated=True so
+    it gets its own thread and the pool stays free for short jobs.
+    """
+    def on_error(task, e):
+        messagebox.showerror(texts[current_language]['error'], f"{error_message or task.name}:\n{e}")
+    return tasks.submit(name, work, on_success=on_success, on_error=on_error, dedicated=dedicated)
+
+def primary_serial():
+    """Serial for single-device tools (mirroring, logcat, live preview)."""
+    return selected_serials[0] if selected_serials else None
+
+def per_device_path(path, serial):
+    """Keeps output files of a broadcast apart by tagging them with the serial."""
+    if serial is None or len(selected_serials) < 2:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}_{serial.replace(':', '_')}{ext}"
+
+def run_on_devices(name, work, on_success=None, error_message=None, show_each=None):
+    """Runs work(task, serial) on every selected device, or once on the default device.
+
+    With several devices selected the per-device results are collected into one table
+    instead of on_success; show_each(serial, result) can still open a window per device.
+    """
+    serials = list(selected_serials)
+    if len(serials) < 2:
+        serial = serials[0] if serials else None
+        return run_task(name, lambda task: work(task, serial), on_success, error_message)
+
+    def work_all(task):
+        def on_result(result, completed):
+            task.progress(f"{completed}/{len(serials)} devices")
+            if result.ok and show_each is not None:
+                task.call_ui(show_each, result.serial, result.value)
+        return broadcast(serials, lambda serial: work(task, serial), limiter=device_limiter,
+                         cancel_event=task.cancel_event, on_result=on_result)
+
+    return run_task(f"{name} ({len(serials)} devices)", work_all,
+                    on_success=lambda results: BroadcastResultWindow(app, name, results),
+                    error_message=error_message)
+
+def select_devices():
+    def apply(serials):
+        global selected_serials
+        selected_serials = serials
+        print(Fore.LIGHTGREEN_EX + f"[*] Selected devices: {', '.join(serials) or 'default'}")
+    DeviceSelectorWindow(app, tracker, selected_serials, apply, title=texts[current_language]['select_device'])
+
+def on_device_event(event, info):
+    # Runs on the tracker thread
+    print(Fore.LIGHTGREEN_EX + f"[*] Device {info['serial']} {event} ({info['state']})")
+    if event == DETACHED:
+        shells.discard(info['serial'])
+        packages.discard(info['serial'])
+        settings_store.invalidate(info['serial'])
+    if event != ATTACHED:
+        properties.invalidate(info['serial'])
+
+def on_device_reboot(serial):
+    # Called by the property cache; the shell died with the old boot and packages or settings may have changed
+    print(Fore.LIGHTGREEN_EX + f"[*] {serial or 'Device'} rebooted, dropping its cached state")
+    shells.discard(serial)
+    packages.discard(serial)
+    settings_store.invalidate(serial)
+
+def ask_package(title, prompt):
+    """Package name prompt that autocompletes from the first selected device's package index."""
+    index = packages.index(primary_serial())
+    if index.stale:
+        # The dialog opens right away and picks up suggestions once the list arrives
+        run_task("Load packages", lambda task: index.ensure_loaded(), error_message="Failed to list packages")
+    return PackageDialog(app, title, prompt, index.search).show()
+
+def wait_for_device(task=None, serial=None, timeout=10):
     print(Fore.LIGHTGREEN_EX + "[*] Waiting for device...")
-    for _ in range(10):
-        try:
-            result = subprocess.check_output(["adb", "devices"], text=True)
-            lines = result.strip().splitlines()
-            if len(lines) > 1 and "device" in lines[1]:
-                print(Fore.LIGHTGREEN_EX + "[*] Device found. Starting remote access...")
-                return True
-        except subprocess.SubprocessError:
-            pass
-        time.sleep(1)
-    return False
+    # The tracker is woken by the server as soon as the device comes up
+    found = tracker.wait_for(serial, timeout=timeout, cancel_event=task.cancel_event if task is not None else None)
+    if task is not None:
+        task.check_cancelled()
+    if found is None:
+        return False
+    print(Fore.LIGHTGREEN_EX + "[*] Device found. Starting remote access...")
+    return True
 
 def send_popup_message():
     msg = simpledialog.askstring(texts[current_language]['input_title'], texts[current_language]['input_prompt'])
     if not msg:
         return
     msg_sanitized = msg.replace(" ", "_")
-    subprocess.run(["adb", "shell", "input", "text", msg_sanitized])
-    messagebox.showinfo(texts[current_language]['success'], texts[current_language]['operation_complete'])
-
-def get_ip_address():
-    output = subprocess.check_output(["adb", "shell", "ip", "addr"], text=True)
-    interfaces = output.split("\n\n")
-
-    for interface in interfaces:
-        if "inet " in interface and "127.0.0.1" not in interface:
-            match = re.search(r'inet (\d+\.\d+\.\d+\.\d+)', interface)
-            if match:
-                print(Fore.LIGHTGREEN_EX + f"[*] Device IP Address: {match.group(1)}")
-                return match.group(1)
+    run_on_devices("Send message", lambda task, serial: shells.run(["input", "text", msg_sanitized], serial=serial),
+                   on_success=lambda _: messagebox.showinfo(texts[current_language]['success'], texts[current_language]['operation_complete']))
+
+def get_ip_address(serial=None):
+    snapshot = device_snapshot.take_snapshot(adb, serial, sections=("interfaces",))
+    ip_address = device_snapshot.primary_ipv4(snapshot)
+    if ip_address:
+        print(Fore.LIGHTGREEN_EX + f"[*] Device IP Address: {ip_address}")
+        return ip_address
     raise Exception("Failed to retrieve IP address. Make sure the device is connected to WiFi.")
 
-def launch_scrcpy_filtered(ip_address):
+def launch_scrcpy_filtered(ip_address, task=None):
     process = subprocess.Popen(["scrcpy", "-s", f"{ip_address}:5555"],
                                 stdout=subprocess.PIPE,
                                 stderr=subprocess.STDOUT,
                                 text=True)
+    if task is not None:
+        # Cancelling the task closes the mirror instead of leaving the worker stuck on stdout
+        task.on_cancel(process.terminate)
 
     if process.stdout is not None:
         for line in process.stdout:
@@ -75,76 +182,113 @@ def launch_scrcpy_filtered(ip_address):
             print(line, end="")
 
 def tcp_connect_wifi():
-    try:
-        if not wait_for_device():
+    serial = primary_serial()
+
+    def work(task):
+        task.progress("Waiting for device...")
+        if not wait_for_device(task, serial):
             raise Exception(texts[current_language]['no_device'])
 
-        subprocess.run(["adb", "tcpip", "5555"], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        time.sleep(2)
+        task.progress("Restarting adbd in TCP mode...")
+        adb.tcpip(5555, serial=serial)
+        task.sleep(2)
 
-        ip_address = get_ip_address()
+        ip_address = get_ip_address(serial)
         print(Fore.LIGHTGREEN_EX + f"[*] Attempting to connect to {ip_address}:5555 ..." + Fore.RESET)
+        task.progress(f"Connecting to {ip_address}:5555...")
 
-        connect_result = subprocess.run(["adb", "connect", f"{ip_address}:5555"],
-                                        stdout=subprocess.PIPE,
-                                        stderr=subprocess.STDOUT,
-                                        text=True)
+        connect_result = adb.connect(f"{ip_address}:5555")
 
         filtered_output = "\n".join(
-            line for line in connect_result.stdout.splitlines()
+            line for line in connect_result.splitlines()
             if not any(skip in line for skip in [
                 "skipped.", "adb.exe:", "adb reverse", "WARN:"
             ])
         )
-        if "connected" not in connect_result.stdout.lower():
+        if "connected" not in connect_result.lower():
             raise Exception(f"ADB connection failed:\n{filtered_output.strip()}")
 
-        # Launch scrcpy with filtered output
-        launch_scrcpy_filtered(ip_address)
+        task.call_ui(messagebox.showinfo, texts[current_language]['success'], f"Successfully connected to {ip_address}:5555")
 
-        messagebox.showinfo(texts[current_language]['success'], f"Successfully connected to {ip_address}:5555")
+        # The mirror gets its own task, listed (and cancellable) until scrcpy exits
+        run_task(f"scrcpy {ip_address}:5555", lambda mirror: launch_scrcpy_filtered(ip_address, mirror),
+                 error_message="scrcpy failed", dedicated=True)
 
-    except subprocess.CalledProcessError as e:
-        messagebox.showerror(texts[current_language]['error'], f"Command failed:\n{e}")
-    except Exception as e:
-        messagebox.showerror(texts[current_language]['error'], str(e))
+    run_task("TCP connect over WiFi", work, error_message="Command failed")
 
 def tcp_disconnect_wifi():
+    target_ip = simpledialog.askstring(texts[current_language]['input_title'], "Enter the device IP (e.g., 192.168.1.123):")
+    if target_ip:
+        run_task(f"Disconnect {target_ip}", lambda task: adb.disconnect(f"{target_ip}:5555"),
+                 on_success=lambda _: messagebox.showinfo(texts[current_language]['success'], f"Disconnected from {target_ip}:5555"),
+                 error_message="Failed to disconnect")
+
+def save_settings_snapshot():
+    path = filedialog.asksaveasfilename(title="Save settings as", initialfile="settings.json", defaultextension=".json",
+                                        filetypes=[("JSON", "*.json")])
+    if path:
+        def work(task, serial):
+            count = settings_store.save_snapshot(serial, per_device_path(path, serial))
+            return f"{count} settings saved to {os.path.basename(per_device_path(path, serial))}"
+
+        run_on_devices("Save settings", work,
+                       on_success=lambda summary: messagebox.showinfo(texts[current_language]['success'], summary),
+                       error_message="Failed to read settings")
+
+def apply_settings_profile():
+    path = filedialog.askopenfilename(title="Settings profile", filetypes=[("JSON", "*.json"), ("All files", "*.*")])
+    if not path:
+        return
     try:
-        target_ip = simpledialog.askstring(texts[current_language]['input_title'], "Enter the device IP (e.g., 192.168.1.123):")
-        if target_ip:
-            subprocess.run(["adb", "disconnect", f"{target_ip}:5555"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            messagebox.showinfo(texts[current_language]['success'], f"Disconnected from {target_ip}:5555")
-    except Exception as e:
-        messagebox.showerror(texts[current_language]['error'], f"Failed to disconnect:\n{e}")
+        profile = load_profile(path)
+    except (OSError, ValueError) as e:
+        messagebox.showerror(texts[current_language]['error'], str(e))
+        return
+
+    def work(task, serial):
+        # One round trip to read all three tables, one script for every key that differs
+        results = settings_store.apply_profile(serial, profile)
+        return format_changes(results) if results else "Device already matches the profile"
+
+    run_on_devices(f"Apply {os.path.basename(path)}", work,
+                   on_success=lambda output: show_large_output_window(texts[current_language]['output_title'], output),
+                   show_each=lambda serial, output: show_large_output_window(f"{texts[current_language]['output_title']} - {serial}", output),
+                   error_message="Failed to apply settings")
 
 
 
 def check_device():
-    result = subprocess.run(["adb", "devices"], capture_output=True, text=True)
-    lines = result.stdout.strip().splitlines()
-    if len(lines) > 1 and lines[1] and "device" in lines[1]:
-        messagebox.showinfo(texts[current_language]['success'], texts[current_language]['device_list'])
+    # Answered from the tracker's registry, no round trip to the server
+    devices = sorted(tracker.devices(), key=lambda info: info['serial'])
+    if tracker.ready():
+        lines = []
+        for info in devices:
+            line = f"{'* ' if info['serial'] in selected_serials else '  '}{info['serial']}  [{info['state']}]"
+            cached = properties.peek(info['serial'])
+            if cached is not None:
+                line += f"  {cached.manufacturer} {cached.model}, Android {cached.android_version} (SDK {cached.sdk}, {cached.abi})"
+            lines.append(line)
+        messagebox.showinfo(texts[current_language]['success'], texts[current_language]['device_list'] + "\n\n" + "\n".join(lines))
     else:
         messagebox.showerror(texts[current_language]['error'], texts[current_language]['no_device'])
 
 def take_screenshot():
-    temp_dir = tempfile.gettempdir()
-    temp_path = os.path.join(temp_dir, "android_screenshot.png")
-    subprocess.run(["adb", "shell", "screencap", "-p", "/sdcard/screen.png"])
-    subprocess.run(["adb", "pull", "/sdcard/screen.png", temp_path])
+    # Capture, decode and downscale off the Tk thread; only the widgets are built on it
+    def work(task, serial):
+        img = screen_capture.capture(adb, serial)
+        return img, screen_capture.make_preview(img)
+
+    run_on_devices("Screenshot", work, on_success=lambda result: show_screenshot(*result),
+                   error_message="Failed to take screenshot",
+                   show_each=lambda serial, result: show_screenshot(*result, title=f"Screenshot Preview - {serial}"))
 
+def show_screenshot(img, preview, title="Screenshot Preview"):
     preview_win = tk.Toplevel(app)
-    preview_win.title("Screenshot Preview")
+    preview_win.title(title)
     preview_win.geometry("600x800")
     preview_win.resizable(True, True)
 
-    img = Image.open(temp_path)
-    if Resampling is not None:
-        img.thumbnail((600, 800), Resampling.LANCZOS)
-    else:
-        img.thumbnail((600, 800))
-    img_tk = ImageTk.PhotoImage(img)
+    img_tk = ImageTk.PhotoImage(preview)
     img_label = tk.Label(preview_win, image=img_tk)
     setattr(img_label, 'image', img_tk)
     img_label.pack(expand=True, fill="both", padx=10, pady=10)
@@ -161,120 +305,223 @@ def take_screenshot():
     save_btn = tk.Button(preview_win, text="Save", command=save_image)
     save_btn.pack(pady=10)
 
+def open_live_preview():
+    # One sampler feeds both the preview and the optional recorder
+    sampler = FrameSampler(adb, primary_serial()).start()
+    preview_sub = sampler.subscribe(maxsize=1)
+    recording = {'stop': None}
+
+    preview_win = tk.Toplevel(app)
+    preview_win.title(texts[current_language]['live_screen_preview'])
+    preview_win.geometry("600x900")
+    preview_win.configure(bg="#282c34")
+
+    img_label = tk.Label(preview_win, bg="#282c34")
+    img_label.pack(expand=True, fill="both", padx=10, pady=10)
+    stats_label = tk.Label(preview_win, bg="#282c34", fg="white", font=("Consolas", 10))
+    stats_label.pack()
+
+    def toggle_recording():
+        if recording['stop'] is None:
+            folder = filedialog.askdirectory(title="Select folder for recorded frames")
+            if not folder:
+                return
+            recording['stop'] = threading.Event()
+            recording['sub'] = sampler.subscribe(maxsize=8)
+            threading.Thread(target=record_frames, args=(recording['sub'], folder, recording['stop']), daemon=True).start()
+            record_btn.config(text="Stop Recording")
+        else:
+            recording['stop'].set()
+            sampler.unsubscribe(recording['sub'])
+            recording['stop'] = None
+            record_btn.config(text="Record")
+
+    record_btn = tk.Button(preview_win, text="Record", command=toggle_recording)
+    record_btn.pack(pady=10)
+
+    def refresh():
+        if not preview_win.winfo_exists():
+            return
+        frame = preview_sub.get(timeout=0)
+        if frame is not None:
+            img_tk = ImageTk.PhotoImage(screen_capture.make_preview(frame_image(frame)))
+            img_label.config(image=img_tk)
+            setattr(img_label, 'image', img_tk)
+        stats = sampler.stats()
+        status = f"{stats['fps']:.1f} FPS | latency {stats['latency_avg'] * 1000:.0f} ms (p95 {stats['latency_p95'] * 1000:.0f} ms) | dropped {stats['dropped']}"
+        if sampler.error is not None:
+            status += f"\n{sampler.error}"
+        stats_label.config(text=status)
+        preview_win.after(50, refresh)
+
+    def on_close():
+        if recording['stop'] is not None:
+            recording['stop'].set()
+        sampler.stop(wait=False)
+        preview_win.destroy()
+
+    preview_win.protocol("WM_DELETE_WINDOW", on_close)
+    refresh()
+
 def open_terminal():
-    subprocess.Popen(["adb", "shell"], creationflags=subprocess.CREATE_NEW_CONSOLE)
+    serial = primary_serial()
+    subprocess.Popen(["adb"] + (["-s", serial] if serial else []) + ["shell"], creationflags=subprocess.CREATE_NEW_CONSOLE)
 
 def extract_contacts():
-    try:
-        output = subprocess.check_output(["adb", "shell", "content", "query", "--uri", "content://contacts/phones/"], text=True)
-        with open("contacts.txt", "w", encoding="utf-8") as f:
-            f.write(output)
-        messagebox.showinfo(texts[current_language]['success'], "Contacts extracted and saved to contacts.txt")
-    except Exception as e:
-        messagebox.showerror(texts[current_language]['error'], f"Failed to extract contacts.\n{e}")
+    path = filedialog.asksaveasfilename(title="Save contacts as", initialfile="contacts.csv", defaultextension=".csv",
+                                        filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl")])
+    if not path:
+        return
+    incremental = messagebox.askyesno("Extract Contacts", "Only add contacts changed since the last export to this file?")
+
+    def work(task, serial):
+        # Rows are parsed and written while `content query` is still streaming
+        target = per_device_path(path, serial)
+        result = contacts_export.export_rows(adb, target, serial,
+                                             incremental_key=contacts_export.MODIFIED_KEY if incremental else None,
+                                             progress=lambda count: task.progress(f"{count} contacts"),
+                                             cancel_event=task.cancel_event)
+        action = "appended to" if result['appended'] else "saved to"
+        return f"{result['rows']} contacts {action} {os.path.basename(target)} in {result['elapsed']:.1f}s"
+
+    run_on_devices("Extract contacts", work,
+                   on_success=lambda summary: messagebox.showinfo(texts[current_language]['success'], summary),
+                   error_message="Failed to extract contacts.")
+
+def format_transfer_progress(done, total, transferred, elapsed):
+    rate = transferred / elapsed / (1024 * 1024) if elapsed > 0 else 0.0
+    return f"{done}/{total} files, {transferred / (1024 * 1024):.1f} MB, {rate:.1f} MB/s"
 
 def extract_gallery():
-    try:
-        save_folder = "gallery_images"
-        os.makedirs(save_folder, exist_ok=True)
-        subprocess.run(["adb", "shell", "su", "-c", f"ls /sdcard/DCIM/Camera/"], stdout=subprocess.DEVNULL)
-        files = subprocess.check_output(["adb", "shell", "ls", "/sdcard/DCIM/Camera/"], text=True).splitlines()
-        pulled = 0
-        for file in files:
-            if file.lower().endswith((".jpg", ".jpeg", ".png")):
-                subprocess.run(["adb", "pull", f"/sdcard/DCIM/Camera/{file}", f"{save_folder}/{file}"])
-                pulled += 1
-        messagebox.showinfo(texts[current_language]['success'], f"Downloaded {pulled} images to folder: {save_folder}")
-    except Exception as e:
-        messagebox.showerror(texts[current_language]['error'], f"Failed to extract images.\n{e}")
-        
+    save_folder = "gallery_images"
+
+    def work(task, serial):
+        # Only new or changed images are pulled; the manifest in save_folder makes reruns resumable
+        result = gallery_sync.sync_folder(adb, per_device_path(save_folder, serial), serial=serial,
+                                          progress=lambda *args: task.progress(format_transfer_progress(*args)),
+                                          cancel_event=task.cancel_event)
+        for name, error in result["errors"]:
+            print(Fore.LIGHTRED_EX + f"[!] Failed to pull {name}: {error}")
+        return f"{result['pulled']} pulled, {result['skipped']} up to date, {result['failed']} failed"
+
+    run_on_devices("Extract gallery", work,
+                   on_success=lambda summary: messagebox.showinfo(
+                       texts[current_language]['success'], f"Images saved to folder: {save_folder}\n{summary}"),
+                   error_message="Failed to extract images.")
+
 def start_activity():
     full_str = simpledialog.askstring("Start Activity", "Enter in form: package/activity")
     if full_str:
-        subprocess.run(["adb", "shell", "am", "start", "-n", full_str])
-        messagebox.showinfo(f"Started: {full_str}")
+        run_on_devices("Start activity", lambda task, serial: adb.shell(["am", "start", "-n", full_str], serial=serial),
+                       on_success=lambda _: messagebox.showinfo(f"Started: {full_str}"))
 
 def open_url():
     url = simpledialog.askstring("Open URL", "Enter URL to open (e.g. https://example.com)")
     if url:
-        subprocess.run(["adb", "shell", "am", "start", "-a", "android.intent.action.VIEW", "-d", url])
-        messagebox.showinfo(f"Opened URL: {url}")
+        run_on_devices("Open URL", lambda task, serial: adb.shell(["am", "start", "-a", "android.intent.action.VIEW", "-d", url], serial=serial),
+                       on_success=lambda _: messagebox.showinfo(f"Opened URL: {url}"))
 
 def simulate_tap():
     coords = simpledialog.askstring("Tap", "Enter X,Y coordinates (e.g., 300 800):")
     if coords:
-        subprocess.run(["adb", "shell", "input", "tap"] + coords.split())
-        messagebox.showinfo(f"Tapped at: {coords}")
+        run_on_devices("Tap", lambda task, serial: shells.run(["input", "tap"] + coords.split(), serial=serial),
+                       on_success=lambda _: messagebox.showinfo(f"Tapped at: {coords}"))
 
 def simulate_swipe():
     coords = simpledialog.askstring("Swipe", "Enter x1 y1 x2 y2 duration (ms):")
     if coords:
-        subprocess.run(["adb", "shell", "input", "swipe"] + coords.split())
-        messagebox.showinfo(f"Swipe: {coords}")
+        run_on_devices("Swipe", lambda task, serial: shells.run(["input", "swipe"] + coords.split(), serial=serial),
+                       on_success=lambda _: messagebox.showinfo(f"Swipe: {coords}"))
 
 def list_packages():
-    output = subprocess.check_output(["adb", "shell", "pm", "list", "packages"], text=True)
-    with open("packages.txt", "w", encoding="utf-8") as f:
-        f.write(output)
-    show_large_output_window(texts[current_language]['output_title'], output)
+    def work(task, serial):
+        index = packages.index(serial)
+        index.refresh()
+        output = index.format()
+        with open(per_device_path("packages.txt", serial), "w", encoding="utf-8") as f:
+            f.write(output)
+        return output
+
+    run_on_devices("List packages", work,
+                   on_success=lambda output: show_large_output_window(texts[current_language]['output_title'], output),
+                   show_each=lambda serial, output: show_large_output_window(f"{texts[current_language]['output_title']} - {serial}", output))
 
 def uninstall_package():
-    package = simpledialog.askstring("Uninstall App", "Enter package name to uninstall:")
+    package = ask_package("Uninstall App", "Enter package name to uninstall:")
     if package:
-        subprocess.run(["adb", "shell", "pm", "uninstall", package])
-        messagebox.showinfo(f"Uninstalled: {package}")
+        def work(task, serial):
+            output = adb.shell(["pm", "uninstall", package], serial=serial, check=True)
+            packages.index(serial).remove(package)
+            return output
+
+        run_on_devices(f"Uninstall {package}", work,
+                       on_success=lambda _: messagebox.showinfo(f"Uninstalled: {package}"))
 
 def view_logcat():
-    subprocess.Popen(["adb", "logcat"], creationflags=subprocess.CREATE_NEW_CONSOLE)
+    LogcatWindow(app, adb, primary_serial())
 
 def toggle_wifi():
     state = simpledialog.askstring("WiFi", "Enter: enable or disable")
     if state in ("enable", "disable"):
-        subprocess.run(["adb", "shell", "svc", "wifi", state])
-        messagebox.showinfo("WiFi", f"WiFi {state}d")
+        run_on_devices(f"WiFi {state}", lambda task, serial: shells.run(["svc", "wifi", state], serial=serial),
+                       on_success=lambda _: messagebox.showinfo("WiFi", f"WiFi {state}d"))
 
 def toggle_data():
     state = simpledialog.askstring("Mobile Data", "Enter: enable or disable")
     if state in ("enable", "disable"):
-        subprocess.run(["adb", "shell", "svc", "data", state])
-        messagebox.showinfo("Data", f"Mobile data {state}d")
+        run_on_devices(f"Mobile data {state}", lambda task, serial: shells.run(["svc", "data", state], serial=serial),
+                       on_success=lambda _: messagebox.showinfo("Data", f"Mobile data {state}d"))
 
         
 def start_camera(front=True):
-    camera_id = 1 if front else 0
-    subprocess.run([
-        "adb", "shell", "am", "start", 
-        "-a", "android.media.action.VIDEO_CAMERA", 
-        "--ez", "android.intent.extra.USE_FRONT_CAMERA", str(front).lower()
-    ])
-    messagebox.showinfo("Camera", f"{'Front' if front else 'Rear'} camera launched.")
+    def work(task, serial):
+        adb.shell([
+            "am", "start",
+            "-a", "android.media.action.VIDEO_CAMERA",
+            "--ez", "android.intent.extra.USE_FRONT_CAMERA", str(front).lower()
+        ], serial=serial)
+
+    run_on_devices("Start camera", work,
+                   on_success=lambda _: messagebox.showinfo("Camera", f"{'Front' if front else 'Rear'} camera launched."))
 
 
 def reboot_device():
-    subprocess.run(["adb", "reboot"])
-    messagebox.showinfo("Device is rebooting...")
+    run_on_devices("Reboot", lambda task, serial: adb.reboot(serial=serial),
+                   on_success=lambda _: messagebox.showinfo("Device is rebooting..."))
 
 def power_off_device():
-    subprocess.run(["adb", "shell", "reboot", "-p"])
-    messagebox.showinfo("Device is shutting down...")
+    run_on_devices("Power off", lambda task, serial: adb.shell(["reboot", "-p"], serial=serial),
+                   on_success=lambda _: messagebox.showinfo("Device is shutting down..."))
 
 def lock_screen():
-    subprocess.run(["adb", "shell", "input", "keyevent", "26"])
-    messagebox.showinfo("Screen locked.")
+    run_on_devices("Lock screen", lambda task, serial: shells.run(["input", "keyevent", "26"], serial=serial),
+                   on_success=lambda _: messagebox.showinfo("Screen locked."))
 
 def show_battery_info():
-    result = subprocess.run(["adb", "shell", "dumpsys", "battery"], capture_output=True, text=True)
-    print("Battery Info:\n" + result.stdout)
+    run_on_devices("Battery info", lambda task, serial: adb.shell(["dumpsys", "battery"], serial=serial),
+                   on_success=lambda output: print("Battery Info:\n" + output),
+                   show_each=lambda serial, output: print(f"Battery Info ({serial}):\n" + output))
+
+def record_battery_telemetry():
+    interval = simpledialog.askfloat("Battery Telemetry", "Seconds between samples:", initialvalue=5.0, minvalue=0.5)
+    if not interval:
+        return
+    # One recorder per selected device; each keeps sampling until its window is closed
+    for serial in selected_serials or [None]:
+        title = texts[current_language]['battery_telemetry'] + (f" - {serial}" if serial else "")
+        TelemetryWindow(app, TelemetryRecorder(adb, serial, interval).start(), title)
 
 def launch_app():
-    package = simpledialog.askstring("Launch App", "Enter package name (e.g., com.android.chrome):")
+    package = ask_package("Launch App", "Enter package name (e.g., com.android.chrome):")
     if package:
-        subprocess.run(["adb", "shell", "monkey", "-p", package, "-c", "android.intent.category.LAUNCHER", "1"])
-        messagebox.showinfo("", f"Launched: {package}")
+        run_on_devices(f"Launch {package}", lambda task, serial: adb.shell(["monkey", "-p", package, "-c", "android.intent.category.LAUNCHER", "1"], serial=serial),
+                       on_success=lambda _: messagebox.showinfo("", f"Launched: {package}"))
         
 def start_scrcpy():
     try:
-        subprocess.Popen(["scrcpy"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        # One mirror window per selected device
+        for serial in selected_serials or [None]:
+            subprocess.Popen(["scrcpy"] + (["-s", serial] if serial else []), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
         messagebox.showinfo("Screenshare", "Scrcpy launched. A new window should appear.")
     except FileNotFoundError:
         messagebox.showerror("Error", "scrcpy is not installed or not in PATH. Please refer to README.md for installation instructions.")
@@ -282,26 +529,20 @@ def start_scrcpy():
 def browse_files():
     path = simpledialog.askstring("File Browser", "Enter path to browse (e.g., /sdcard/):")
     if path:
-        try:
-            output = subprocess.check_output(["adb", "shell", "ls", "-F", path], text=True)
-            messagebox.showinfo(f"Contents of {path}", output)
-        except subprocess.CalledProcessError as e:
-            messagebox.showerror("Error", f"Failed to list directory:\n{e.stderr}")
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred:\n{e}")
+        run_on_devices(f"Browse {path}", lambda task, serial: adb.shell(["ls", "-F", path], serial=serial, check=True),
+                       on_success=lambda output: messagebox.showinfo(f"Contents of {path}", output),
+                       show_each=lambda serial, output: show_large_output_window(f"Contents of {path} - {serial}", output),
+                       error_message="Failed to list directory")
 
 def pull_file():
     remote_path = simpledialog.askstring("Pull File", "Enter remote path on device (e.g., /sdcard/my_file.txt):")
     if remote_path:
         local_path = simpledialog.askstring("Pull File", "Enter local path to save to (e.g., ./my_file.txt):", initialvalue=os.path.basename(remote_path))
         if local_path:
-            try:
-                subprocess.run(["adb", "pull", remote_path, local_path], check=True)
-                messagebox.showinfo("Success", f"File pulled to {local_path}")
-            except subprocess.CalledProcessError as e:
-                messagebox.showerror("Error", f"Failed to pull file:\n{e.stderr}")
-            except Exception as e:
-                messagebox.showerror("Error", f"An error occurred:\n{e}")
+            run_on_devices(f"Pull {remote_path}",
+                           lambda task, serial: sync_pull_file(adb, remote_path, per_device_path(local_path, serial), serial),
+                           on_success=lambda saved_path: messagebox.showinfo("Success", f"File pulled to {saved_path}"),
+                           error_message="Failed to pull file")
 
 def push_file():
     local_path = filedialog.askopenfilename(
@@ -318,119 +559,228 @@ def push_file():
         )
 
         if remote_path:
-            subprocess.run(["adb", "push", local_path, remote_path], check=True, capture_output=True, text=True)
+            run_on_devices(f"Push {os.path.basename(local_path)}",
+                           lambda task, serial: sync_push_file(adb, local_path, remote_path, serial),
+                           error_message="Failed to push file")
         else:
             messagebox.showinfo("Отмена", "Отправка файла отменена: удаленный путь не указан.")
     else:
         messagebox.showinfo("Отмена", "Отправка файла отменена: файл не выбран.")
 
+def sync_folder(direction):
+    local_root = filedialog.askdirectory(title="Select local folder")
+    if not local_root:
+        return
+    # No default folder: with delete, a bare /sdcard/ would mirror the whole shared storage
+    remote_root = simpledialog.askstring("Sync Folder", "Enter the folder on the device (e.g. /sdcard/test-data):")
+    if not remote_root:
+        return
+    source, target = (local_root, remote_root) if direction == "push" else (remote_root, local_root)
+    delete = messagebox.askyesno("Sync Folder", f"Also delete files in {target} that are not in {source}?")
+    if delete and direction == "push" and dir_sync.is_protected(remote_root):
+        messagebox.showerror("Sync Folder", f"Refusing to delete files under {remote_root}; pick a subfolder.")
+        return
+
+    def work(task, serial):
+        # Only files whose hash differs are copied; hashes are remembered in the local folder
+        result = dir_sync.sync_dir(adb, per_device_path(local_root, serial) if direction == "pull" else local_root,
+                                   remote_root, direction, serial, delete,
+                                   progress=lambda *args: task.progress(format_transfer_progress(*args)),
+                                   cancel_event=task.cancel_event)
+        for name, error in result["errors"]:
+            print(Fore.LIGHTRED_EX + f"[!] Failed to sync {name}: {error}")
+        return (f"{result['copied']} copied ({result['bytes'] / (1024 * 1024):.1f} MB), {result['unchanged']} unchanged, "
+                f"{result['deleted']} deleted, {result['failed']} failed in {result['elapsed']:.1f}s")
+
+    arrow = "->" if direction == "push" else "<-"
+    run_on_devices(f"Sync {local_root} {arrow} {remote_root}", work,
+                   on_success=lambda summary: messagebox.showinfo("Success", summary),
+                   error_message="Failed to sync folder")
+
+def transfer_folder_tar(direction):
+    local_root = filedialog.askdirectory(title="Select local folder")
+    if not local_root:
+        return
+    remote_root = simpledialog.askstring("Tar Transfer", "Enter the folder on the device (e.g. /sdcard/DCIM):", initialvalue="/sdcard/")
+    if not remote_root:
+        return
+    # Only worth it for compressible data (logs, databases); media is already compressed
+    compress = messagebox.askyesno("Tar Transfer", "Compress the stream with gzip?")
+
+    def work(task, serial):
+        use_gzip = compress and tar_transfer.device_has_gzip(adb, serial)
+
+        def on_progress(transferred, elapsed):
+            rate = transferred / elapsed / (1024 * 1024) if elapsed > 0 else 0.0
+            task.progress(f"{transferred / (1024 * 1024):.1f} MB, {rate:.1f} MB/s")
+
+        if direction == "push":
+            result = tar_transfer.push_tar(adb, local_root, remote_root, serial, use_gzip, on_progress, task.cancel_event)
+        else:
+            result = tar_transfer.pull_tar(adb, remote_root, per_device_path(local_root, serial), serial, use_gzip,
+                                           on_progress, task.cancel_event)
+        return (f"{result['files']} files, {result['bytes'] / (1024 * 1024):.1f} MB"
+                f"{' (gzip)' if use_gzip else ''} in {result['elapsed']:.1f}s")
+
+    arrow = "->" if direction == "push" else "<-"
+    run_on_devices(f"Tar {local_root} {arrow} {remote_root}", work,
+                   on_success=lambda summary: messagebox.showinfo("Success", summary),
+                   error_message="Failed to transfer folder")
+
+def pull_large_file():
+    remote_path = simpledialog.askstring("Pull Large File", "Enter the file on the device (e.g. /sdcard/bugreport.zip):", initialvalue="/sdcard/")
+    if not remote_path:
+        return
+    local_path = filedialog.asksaveasfilename(title="Save as", initialfile=os.path.basename(remote_path.rstrip("/")))
+    if not local_path:
+        return
+    streams = simpledialog.askinteger("Pull Large File", "Parallel streams:", initialvalue=chunked_pull.DEFAULT_STREAMS, minvalue=1, maxvalue=16)
+    if not streams:
+        return
+
+    def work(task, serial):
+        def on_progress(done, total, elapsed, rates):
+            task.progress(f"{done * 100 // max(total, 1)}%, {sum(rates):.1f} MB/s "
+                          f"[{' / '.join(f'{rate:.1f}' for rate in rates)}]")
+
+        # An interrupted pull leaves a .part checkpoint; running it again resumes from there
+        result = chunked_pull.pull_large(adb, remote_path, per_device_path(local_path, serial), serial, streams,
+                                         progress=on_progress, cancel_event=task.cancel_event)
+        summary = f"{result['size'] / (1024 * 1024):.1f} MB in {result['elapsed']:.1f}s"
+        if result['resumed']:
+            summary += f", resumed after {result['resumed'] / (1024 * 1024):.1f} MB"
+        if result['retries']:
+            summary += f", {result['retries']} chunks retried"
+        return summary + "\nStreams: " + chunked_pull.format_streams(result['streams'])
+
+    run_on_devices(f"Pull {remote_path}", work,
+                   on_success=lambda summary: messagebox.showinfo("Success", summary),
+                   error_message="Failed to pull file")
+
 def get_device_network_info():
-    try:
-        ip_output = subprocess.check_output(["adb", "shell", "ip", "addr", "show"], text=True)
-        netstat_output = subprocess.check_output(["adb", "shell", "netstat", "-tupn"], text=True)
-        
-        info = texts[current_language]['network_info'] + "\n\n" + ip_output + "\n\n" + netstat_output
-        show_large_output_window(texts[current_language]['output_title'], info)
-    except subprocess.CalledProcessError as e:
-        messagebox.showerror(texts[current_language]['error'], f"Failed to get network info:\n{e.stderr}")
-    except Exception as e:
-        messagebox.showerror(texts[current_language]['error'], f"An error occurred:\n{e}")
+    def work(task, serial):
+        # Interfaces, sockets, battery and properties all come back from one shell invocation
+        snapshot = device_snapshot.take_snapshot(adb, serial, properties)
+        return texts[current_language]['network_info'] + "\n\n" + device_snapshot.format_snapshot(snapshot)
+
+    run_on_devices("Network info", work,
+                   on_success=lambda info: show_large_output_window(texts[current_language]['output_title'], info),
+                   show_each=lambda serial, info: show_large_output_window(f"{texts[current_language]['output_title']} - {serial}", info),
+                   error_message="Failed to get network info")
 
 def list_running_processes():
-    try:
-        output = subprocess.check_output(["adb", "shell", "ps", "-A"], text=True)
-        show_large_output_window(texts[current_language]['output_title'], output)
-    except subprocess.CalledProcessError as e:
-        messagebox.showerror(texts[current_language]['error'], f"Failed to list processes:\n{e.stderr}")
-    except Exception as e:
-        messagebox.showerror(texts[current_language]['error'], f"An error occurred:\n{e}")
+    # One live monitor window per selected device; each samples once a second until closed
+    for serial in selected_serials or [None]:
+        title = texts[current_language]['running_processes'] + (f" - {serial}" if serial else "")
+        ProcessMonitorWindow(app, ProcessMonitor(adb, serial, interval=1.0).start(), title)
 
 def view_app_permissions():
-    package = simpledialog.askstring(texts[current_language]['app_permissions'], texts[current_language]['input_prompt'])
+    package = ask_package(texts[current_language]['app_permissions'], texts[current_language]['input_prompt'])
     if package:
-        try:
-            output = subprocess.check_output(["adb", "shell", "dumpsys", "package", package], text=True)
-            permissions = [line for line in output.splitlines() if "Permission" in line or "perm" in line]
-            show_large_output_window(texts[current_language]['output_title'], "\n".join(permissions))
-        except subprocess.CalledProcessError as e:
-            messagebox.showerror(texts[current_language]['error'], f"Failed to get permissions:\n{e.stderr}")
-        except Exception as e:
-            messagebox.showerror(texts[current_language]['error'], f"An error occurred:\n{e}")
+        def work(task, serial):
+            output = adb.shell(["dumpsys", "package", package], serial=serial, check=True)
+            state = app_permissions.parse_permissions(output).get(package)
+            if state is None:
+                raise AdbError(f"Package not found: {package}")
+            return app_permissions.format_permissions(state)
+
+        run_on_devices(f"Permissions of {package}", work,
+                       on_success=lambda output: show_large_output_window(texts[current_language]['output_title'], output),
+                       show_each=lambda serial, output: show_large_output_window(f"{texts[current_language]['output_title']} - {serial}", output),
+                       error_message="Failed to get permissions")
 
 def grant_app_permission():
-    package = simpledialog.askstring("Grant Permission", "Enter package name:")
+    package = ask_package("Grant Permission", "Enter package name:")
     if package:
         permission = simpledialog.askstring("Grant Permission", "Enter permission name (e.g., android.permission.READ_CONTACTS):")
         if permission:
-            try:
-                subprocess.run(["adb", "shell", "pm", "grant", package, permission], check=True)
-                messagebox.showinfo("Success", f"Granted {permission} to {package}")
-            except subprocess.CalledProcessError as e:
-                messagebox.showerror("Error", f"Failed to grant permission:\n{e.stderr}")
-            except Exception as e:
-                messagebox.showerror("Error", f"An error occurred:\n{e}")
+            run_on_devices(f"Grant {permission}", lambda task, serial: adb.shell(["pm", "grant", package, permission], serial=serial, check=True),
+                           on_success=lambda _: messagebox.showinfo("Success", f"Granted {permission} to {package}"),
+                           error_message="Failed to grant permission")
 
 def revoke_app_permission():
-    package = simpledialog.askstring("Revoke Permission", "Enter package name:")
+    package = ask_package("Revoke Permission", "Enter package name:")
     if package:
         permission = simpledialog.askstring("Revoke Permission", "Enter permission name (e.g., android.permission.READ_CONTACTS):")
         if permission:
-            try:
-                subprocess.run(["adb", "shell", "pm", "revoke", package, permission], check=True)
-                messagebox.showinfo("Success", f"Revoked {permission} from {package}")
-            except subprocess.CalledProcessError as e:
-                messagebox.showerror("Error", f"Failed to revoke permission:\n{e.stderr}")
-            except Exception as e:
-                messagebox.showerror("Error", f"An error occurred:\n{e}")
+            run_on_devices(f"Revoke {permission}", lambda task, serial: adb.shell(["pm", "revoke", package, permission], serial=serial, check=True),
+                           on_success=lambda _: messagebox.showinfo("Success", f"Revoked {permission} from {package}"),
+                           error_message="Failed to revoke permission")
+
+def apply_permission_matrix():
+    path = filedialog.askopenfilename(title="Permission matrix (package permission grant|revoke per line)",
+                                      filetypes=[("Text or CSV", "*.txt *.csv"), ("All files", "*.*")])
+    if not path:
+        return
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            changes = app_permissions.parse_matrix(f.read())
+    except (OSError, ValueError) as e:
+        messagebox.showerror(texts[current_language]['error'], str(e))
+        return
+
+    def work(task, serial):
+        # Current state and all pm grant/revoke calls are pipelined on the device's shell session
+        return app_permissions.format_results(app_permissions.apply_matrix(shells.get(serial), changes))
+
+    run_on_devices(f"Apply {len(changes)} permission changes", work,
+                   on_success=lambda output: show_large_output_window(texts[current_language]['output_title'], output),
+                   show_each=lambda serial, output: show_large_output_window(f"{texts[current_language]['output_title']} - {serial}", output),
+                   error_message="Failed to apply permissions")
 
 def get_extended_device_info():
-    try:
-        output = subprocess.check_output(["adb", "shell", "getprop"], text=True)
-        show_large_output_window(texts[current_language]['output_title'], output)
-    except subprocess.CalledProcessError as e:
-        messagebox.showerror(texts[current_language]['error'], f"Failed to get device info:\n{e.stderr}")
-    except Exception as e:
-        messagebox.showerror(texts[current_language]['error'], f"An error occurred:\n{e}")
+    run_on_devices("Extended device info", lambda task, serial: properties.get(serial).format(),
+                   on_success=lambda output: show_large_output_window(texts[current_language]['output_title'], output),
+                   show_each=lambda serial, output: show_large_output_window(f"{texts[current_language]['output_title']} - {serial}", output),
+                   error_message="Failed to get device info")
 
 def install_apk():
-    apk_path = simpledialog.askstring("Install APK", "Enter full path to APK file on your PC (e.g., C:/Users/YourUser/app.apk):")
-    if apk_path and os.path.exists(apk_path):
-        try:
-            subprocess.run(["adb", "install", apk_path], check=True)
-            messagebox.showinfo("Success", f"APK installed: {apk_path}")
-        except subprocess.CalledProcessError as e:
-            messagebox.showerror("Error", f"Failed to install APK:\n{e.stderr}")
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred:\n{e}")
-    elif apk_path:
-        messagebox.showerror("Error", "File not found. Please check the path.")
+    # Selecting several files installs them together as one split APK set
+    apk_paths = filedialog.askopenfilenames(title="Install APK", filetypes=[("APK files", "*.apk"), ("All files", "*.*")])
+    if apk_paths:
+        apk_paths = list(apk_paths)
+
+        def work(task, serial):
+            try:
+                info = apk_cache.base_info(apk_paths)
+            except (ApkMetadataError, OSError) as e:
+                print(Fore.LIGHTRED_EX + f"[!] Cannot read APK metadata, installing unconditionally: {e}")
+                info = None
+            if info is not None and info.package and info.version_code is not None:
+                installed = packages.index(serial).refresh_package(info.package)
+                # A rebuild can keep the versionCode, so equal versions must also have the same base.apk
+                if installed is not None and installed.version_code == info.version_code and installed.path \
+                        and apk_installer.remote_sha256(adb, installed.path, serial) == info.sha256:
+                    return f"skipped: {info.package} {info.version_code} is already installed"
+
+            def on_progress(sent, total):
+                task.progress(f"{serial or 'device'}: {sent * 100 // max(total, 1)}%")
+            result = apk_installer.install_apk(adb, apk_paths, serial, progress=on_progress, cancel_event=task.cancel_event)
+            if info is not None and info.package:
+                packages.index(serial).refresh_package(info.package)
+            else:
+                packages.mark_stale(serial)
+            summary = apk_installer.format_result(result)
+            print(Fore.LIGHTGREEN_EX + f"[*] Installed on {serial or 'device'}: {summary}")
+            return summary
+
+        name = os.path.basename(apk_paths[0]) + (f" (+{len(apk_paths) - 1} splits)" if len(apk_paths) > 1 else "")
+        run_on_devices(f"Install {name}", work,
+                       on_success=lambda summary: messagebox.showinfo("Success", f"APK installed: {name}\n{summary}"),
+                       error_message="Failed to install APK")
+
+def show_running_tasks():
+    TaskListWindow(app, tasks)
+
+def on_app_close():
+    tracker.stop()
+    tasks.shutdown()
+    shells.close_all()
+    app.destroy()
 
 def show_large_output_window(title, content):
-    """Создает новое окно для отображения большого объема текста."""
-    output_window = tk.Toplevel(app)
-    output_window.title(title)
-    output_window.geometry("700x500") # Можно настроить размер
-    output_window.configure(bg="#282c34")
-
-    # Создаем текстовый виджет
-    text_widget = tk.Text(output_window, wrap="word", bg="#1e1e1e", fg="white", 
-                          insertbackground="white", font=("Consolas", 10), state="normal")
-    text_widget.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=10, pady=10)
-
-    # Добавляем скроллбар
-    scrollbar = tk.Scrollbar(output_window, command=text_widget.yview)
-    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-    text_widget.config(yscrollcommand=scrollbar.set)
-
-    # Вставляем контент и делаем виджет только для чтения
-    text_widget.insert(tk.END, content)
-    text_widget.config(state="disabled")
-
-    # Переводим фокус на это окно
-    output_window.grab_set()
-    output_window.focus_set()
-    output_window.transient(app) # Делаем его дочерним к основному окну
-    output_window.wait_window() # Ждем закрытия этого окна
+    """Открывает немодальное окно с виртуализированным просмотром большого текста."""
+    return OutputViewer(app, title, content)
 
 def update_all_texts():
     global current_language
@@ -460,12 +810,23 @@ def update_all_texts():
     device_menu.entryconfig(3, label=texts[current_language]['extended_device_info'])
     device_menu.entryconfig(5, label=texts[current_language]['tcp_connect_wifi'])  # Skip separator at index 4
     device_menu.entryconfig(6, label=texts[current_language]['tcp_disconnect'])
+    # Skip separator at index 7
+    device_menu.entryconfig(8, label=texts[current_language]['select_devices'])
+    # Skip separator at index 9
+    device_menu.entryconfig(10, label=texts[current_language]['save_settings_snapshot'])
+    device_menu.entryconfig(11, label=texts[current_language]['apply_settings_profile'])
 
     # File menu (corrected indices)
     file_menu.entryconfig(0, label=texts[current_language]['install_apk'])
     file_menu.entryconfig(1, label=texts[current_language]['browse_files'])
     file_menu.entryconfig(3, label=texts[current_language]['pull_file'])  # Skip separator at index 2
     file_menu.entryconfig(4, label=texts[current_language]['push_file'])
+    # Skip separator at index 5
+    file_menu.entryconfig(6, label=texts[current_language]['sync_folder_to_device'])
+    file_menu.entryconfig(7, label=texts[current_language]['sync_folder_from_device'])
+    file_menu.entryconfig(8, label=texts[current_language]['push_folder_tar'])
+    file_menu.entryconfig(9, label=texts[current_language]['pull_folder_tar'])
+    file_menu.entryconfig(10, label=texts[current_language]['pull_large_file'])
 
     # Actions menu (corrected indices - must match creation order)
     actions_menu.entryconfig(0, label=texts[current_language]['take_screenshot'], command=take_screenshot)
@@ -494,11 +855,16 @@ def update_all_texts():
     actions_menu.entryconfig(23, label=texts[current_language]['show_logcat'], command=view_logcat)
     actions_menu.entryconfig(24, label=texts[current_language]['toggle_wifi'], command=toggle_wifi)
     actions_menu.entryconfig(25, label=texts[current_language]['toggle_mobile_data'], command=toggle_data)
+    # Skip separator at index 26
+    actions_menu.entryconfig(27, label=texts[current_language]['live_screen_preview'], command=open_live_preview)
+    actions_menu.entryconfig(28, label=texts[current_language]['running_tasks'], command=show_running_tasks)
+    actions_menu.entryconfig(29, label=texts[current_language]['battery_telemetry'], command=record_battery_telemetry)
 
     # Permissions menu (unchanged)
     permissions_menu.entryconfig(0, label=texts[current_language]['view_app_permissions'])
     permissions_menu.entryconfig(1, label=texts[current_language]['grant_app_permission'])
     permissions_menu.entryconfig(2, label=texts[current_language]['revoke_app_permission'])
+    permissions_menu.entryconfig(3, label=texts[current_language]['apply_permission_matrix'])
 
     # Camera menu (unchanged)
     camera_menu.entryconfig(0, label=texts[current_language]['stream_front_camera'])
@@ -518,9 +884,10 @@ def switch_language():
     update_all_texts()
 
 def stream_camera(facing):
+    serial = primary_serial()
     try:
         subprocess.Popen([
-            "scrcpy",
+            "scrcpy"] + (["-s", serial] if serial else []) + [
             "--video-source=camera",
             f"--camera-facing={facing}"
         ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
@@ -673,6 +1040,12 @@ app.title("ADB Toolkit")
 app.geometry("1200x800")
 app.configure(bg="#000000")
 
+# ADB work runs on this pool; results are handed back to the Tk thread
+tasks = TaskExecutor(app)
+tracker.add_listener(on_device_event)
+properties.add_reboot_listener(on_device_reboot)
+tracker.start()
+
 
 font_title = ("Consolas", 18, "bold")
 font_button = ("Consolas", 12, "bold")
@@ -698,6 +1071,11 @@ device_menu.add_command(label=texts[current_language]['extended_device_info'], c
 device_menu.add_separator()
 device_menu.add_command(label=texts[current_language]['tcp_connect_wifi'], command=tcp_connect_wifi)
 device_menu.add_command(label=texts[current_language]['tcp_disconnect'], command=tcp_disconnect_wifi)
+device_menu.add_separator()
+device_menu.add_command(label=texts[current_language]['select_devices'], command=select_devices)
+device_menu.add_separator()
+device_menu.add_command(label=texts[current_language]['save_settings_snapshot'], command=save_settings_snapshot)
+device_menu.add_command(label=texts[current_language]['apply_settings_profile'], command=apply_settings_profile)
 menubar.add_cascade(label=texts[current_language]['device'], menu=device_menu)
 
 # File menu
@@ -707,6 +1085,12 @@ file_menu.add_command(label=texts[current_language]['browse_files'], command=bro
 file_menu.add_separator()
 file_menu.add_command(label=texts[current_language]['pull_file'], command=pull_file)
 file_menu.add_command(label=texts[current_language]['push_file'], command=push_file)
+file_menu.add_separator()
+file_menu.add_command(label=texts[current_language]['sync_folder_to_device'], command=lambda: sync_folder("push"))
+file_menu.add_command(label=texts[current_language]['sync_folder_from_device'], command=lambda: sync_folder("pull"))
+file_menu.add_command(label=texts[current_language]['push_folder_tar'], command=lambda: transfer_folder_tar("push"))
+file_menu.add_command(label=texts[current_language]['pull_folder_tar'], command=lambda: transfer_folder_tar("pull"))
+file_menu.add_command(label=texts[current_language]['pull_large_file'], command=pull_large_file)
 menubar.add_cascade(label=texts[current_language]['file_management'], menu=file_menu)
 
 # Actions menu
@@ -737,6 +1121,10 @@ actions_menu.add_separator()
 actions_menu.add_command(label=texts[current_language]['show_logcat'], command=view_logcat)
 actions_menu.add_command(label=texts[current_language]['toggle_wifi'], command=toggle_wifi)
 actions_menu.add_command(label=texts[current_language]['toggle_mobile_data'], command=toggle_data)
+actions_menu.add_separator()
+actions_menu.add_command(label=texts[current_language]['live_screen_preview'], command=open_live_preview)
+actions_menu.add_command(label=texts[current_language]['running_tasks'], command=show_running_tasks)
+actions_menu.add_command(label=texts[current_language]['battery_telemetry'], command=record_battery_telemetry)
 menubar.add_cascade(label=texts[current_language]['actions'], menu=actions_menu)
 
 # Permissions menu
@@ -744,6 +1132,7 @@ permissions_menu = tk.Menu(menubar, tearoff=0, bg="black", fg="white")
 permissions_menu.add_command(label=texts[current_language]['view_app_permissions'], command=view_app_permissions)
 permissions_menu.add_command(label=texts[current_language]['grant_app_permission'], command=grant_app_permission)
 permissions_menu.add_command(label=texts[current_language]['revoke_app_permission'], command=revoke_app_permission)
+permissions_menu.add_command(label=texts[current_language]['apply_permission_matrix'], command=apply_permission_matrix)
 menubar.add_cascade(label=texts[current_language]['permissions'], menu=permissions_menu)
 
 # Add Camera menu after other menus
@@ -772,5 +1161,6 @@ menu_refs['terminal'] = 5
 menu_refs['language'] = 6
 
 app.config(menu=menubar)
+app.protocol("WM_DELETE_WINDOW", on_app_close)
 
 app.mainloop()
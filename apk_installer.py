@@ -0,0 +1,157 @@
+"""APK installation over the ADB server without the adb binary.
+
+Devices with the "cmd" feature (Android 7+) install straight from the socket:
+`cmd package install -S <size>` reads the APK from stdin, so nothing is staged on
+/sdcard. Split APK sets go through an install session (install-create, one
+install-write per file, install-commit). When the device also has "abb_exec", the
+same commands go to the package service via abb_exec, which skips the device shell.
+Older devices fall back to pushing the file to /data/local/tmp and running pm install.
+"""
+import collections
+import os
+import time
+
+from adb_client import AdbError, quote_command
+from adb_sync import SyncConnection
+
+InstallResult = collections.namedtuple("InstallResult", "serial method bytes elapsed output")
+
+CHUNK_SIZE = 256 * 1024
+STAGING_DIR = "/data/local/tmp"
+
+
+class InstallError(AdbError):
+    pass
+
+
+def format_result(result):
+    rate = result.bytes / result.elapsed / (1024 * 1024) if result.elapsed > 0 else 0.0
+    return (f"{result.method}: {result.bytes / (1024 * 1024):.1f} MB in {result.elapsed:.1f}s "
+            f"({rate:.1f} MB/s)")
+
+
+class ApkInstaller:
+    def __init__(self, client, serial=None, options=("-r",), progress=None, cancel_event=None):
+        self.client = client
+        self.serial = serial
+        self.options = list(options)
+        self.progress = progress
+        self.cancel_event = cancel_event
+        self.sent = 0
+        self.total = 0
+        self._use_abb = False
+
+    def install(self, apks):
+        """Install one APK path or a list of split APK paths; returns an InstallResult."""
+        if isinstance(apks, str):
+            apks = [apks]
+        if not apks:
+            raise InstallError("No APK given")
+        for path in apks:
+            if not os.path.isfile(path):
+                raise InstallError(f"File not found: {path}")
+        self.total = sum(os.path.getsize(path) for path in apks)
+        self.sent = 0
+        started = time.monotonic()
+        features = self.client.features(self.serial)
+        if "cmd" in features or "abb_exec" in features:
+            self._use_abb = "abb_exec" in features
+            if len(apks) == 1:
+                output = self._stream_single(apks[0])
+                method = "streamed"
+            else:
+                output = self._stream_session(apks)
+                method = f"streamed session ({len(apks)} splits)"
+        else:
+            output = self._legacy(apks)
+            method = "legacy push"
+        return InstallResult(self.serial, method, self.total, time.monotonic() - started, output)
+
+    # --- Streamed install ---
+
+    def _open(self, args):
+        if self._use_abb:
+            # abb_exec arguments are NUL separated and go straight to the package service
+            return self.client.open_service("abb_exec:" + "\0".join(["package"] + args), self.serial)
+        return self.client.open_service("exec:" + quote_command(["cmd", "package"] + args), self.serial)
+
+    def _call(self, args):
+        with self._open(args) as conn:
+            return conn.read_all().decode("utf-8", "replace").strip()
+
+    def _send_file(self, conn, path):
+        with open(path, "rb") as f:
+            while True:
+                if self.cancel_event is not None and self.cancel_event.is_set():
+                    raise InstallError("Install cancelled")
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                conn.sock.sendall(chunk)
+                self.sent += len(chunk)
+                if self.progress is not None:
+                    self.progress(self.sent, self.total)
+
+    def _stream_single(self, path):
+        size = os.path.getsize(path)
+        with self._open(["install", "-S", str(size)] + self.options) as conn:
+            self._send_file(conn, path)
+            output = conn.read_all().decode("utf-8", "replace").strip()
+        if "Success" not in output:
+            raise InstallError(output or "Install failed")
+        return output
+
+    def _stream_session(self, apks):
+        output = self._call(["install-create", "-S", str(self.total)] + self.options)
+        if "[" not in output or "]" not in output:
+            raise InstallError(output or "Failed to create install session")
+        session = output[output.index("[") + 1:output.index("]")]
+        try:
+            for position, path in enumerate(apks):
+                size = os.path.getsize(path)
+                name = f"{position}_{os.path.basename(path)}"
+                with self._open(["install-write", "-S", str(size), session, name, "-"]) as conn:
+                    self._send_file(conn, path)
+                    output = conn.read_all().decode("utf-8", "replace").strip()
+                if "Success" not in output:
+                    raise InstallError(output or f"Failed to write {os.path.basename(path)}")
+            output = self._call(["install-commit", session])
+            if "Success" not in output:
+                raise InstallError(output or "Install commit failed")
+            return output
+        except BaseException:
+            try:
+                self._call(["install-abandon", session])
+            except (AdbError, OSError):
+                pass
+            raise
+
+    # --- Fallback for devices without `cmd` ---
+
+    def _legacy(self, apks):
+        if len(apks) > 1:
+            raise InstallError("Split APKs need Android 7.0 or newer")
+        remote = f"{STAGING_DIR}/{os.path.basename(apks[0])}"
+        with SyncConnection(self.client, self.serial) as sync:
+            def on_progress(done):
+                self.sent = done
+                if self.progress is not None:
+                    self.progress(done, self.total)
+            sync.push(apks[0], remote, progress=on_progress)
+        try:
+            output = self.client.shell(["pm", "install"] + self.options + [remote], serial=self.serial)
+        finally:
+            self.client.shell(["rm", "-f", remote], serial=self.serial)
+        if "Success" not in output:
+            raise InstallError(output.strip() or "Install failed")
+        return output.strip()
+
+
+def install_apk(client, apks, serial=None, options=("-r",), progress=None, cancel_event=None):
+    return ApkInstaller(client, serial, options, progress, cancel_event).install(apks)
+
+
+def remote_sha256(client, remote_path, serial=None):
+    """SHA-256 of a file on the device, or None if it cannot be hashed there."""
+    fields = client.shell(f"sha256sum {quote_command([remote_path])} 2>/dev/null", serial=serial).split()
+    return fields[0].lower() if fields and len(fields[0]) == 64 else None
@@ -0,0 +1,203 @@
+"""Package name and version of an APK, read locally from its binary AndroidManifest.xml.
+
+The manifest inside an APK is compiled to Android's binary XML: a string pool, a
+resource id map and a stream of element chunks. Only the first element (<manifest>) is
+needed, so parsing stops there. Results are cached on disk by file size and mtime,
+and by SHA-256 as a second key. Re-deploying an unchanged artifact then costs a stat()
+call, and a copied or touched file costs one hash.
+"""
+import collections
+import hashlib
+import json
+import os
+import struct
+import threading
+import zipfile
+
+ApkInfo = collections.namedtuple("ApkInfo", "package version_code version_name split sha256")
+
+CACHE_FILE = ".apk_metadata_cache.json"
+
+_RES_STRING_POOL_TYPE = 0x0001
+_RES_XML_RESOURCE_MAP_TYPE = 0x0180
+_RES_XML_START_ELEMENT_TYPE = 0x0102
+_UTF8_FLAG = 0x100
+
+_TYPE_STRING = 0x03
+_TYPE_INT_DEC = 0x10
+_TYPE_INT_HEX = 0x11
+
+_ATTR_VERSION_CODE = 0x0101021b
+_ATTR_VERSION_NAME = 0x0101021c
+_ATTR_VERSION_CODE_MAJOR = 0x01010576
+
+_CHUNK = struct.Struct("<HHI")
+_ATTRIBUTE = struct.Struct("<IIIHBBI")
+
+
+class ApkMetadataError(Exception):
+    pass
+
+
+def _read_length(data, offset, utf8):
+    if utf8:
+        length = data[offset]
+        if length & 0x80:
+            return ((length & 0x7f) << 8) | data[offset + 1], offset + 2
+        return length, offset + 1
+    length = struct.unpack_from("<H", data, offset)[0]
+    if length & 0x8000:
+        return ((length & 0x7fff) << 16) | struct.unpack_from("<H", data, offset + 2)[0], offset + 4
+    return length, offset + 2
+
+
+def _parse_string_pool(data, start):
+    _, header_size, _ = _CHUNK.unpack_from(data, start)
+    count, _, flags, strings_start = struct.unpack_from("<IIII", data, start + 8)
+    utf8 = bool(flags & _UTF8_FLAG)
+    offsets = struct.unpack_from(f"<{count}I", data, start + header_size)
+    base = start + strings_start
+    strings = []
+    for offset in offsets:
+        position = base + offset
+        if utf8:
+            _, position = _read_length(data, position, True)  # length in characters
+            length, position = _read_length(data, position, True)  # length in bytes
+            strings.append(data[position:position + length].decode("utf-8", "replace"))
+        else:
+            length, position = _read_length(data, position, False)
+            strings.append(data[position:position + length * 2].decode("utf-16-le", "replace"))
+    return strings
+
+
+def parse_manifest(data):
+    """Return the attributes of the <manifest> element as {name: value} from binary XML."""
+    if len(data) < 8 or _CHUNK.unpack_from(data, 0)[0] != 0x0003:
+        raise ApkMetadataError("Not a binary XML document")
+    strings = []
+    resource_ids = []
+    position = _CHUNK.unpack_from(data, 0)[1]
+    while position + _CHUNK.size <= len(data):
+        chunk_type, header_size, size = _CHUNK.unpack_from(data, position)
+        if size < _CHUNK.size:
+            break
+        if chunk_type == _RES_STRING_POOL_TYPE:
+            strings = _parse_string_pool(data, position)
+        elif chunk_type == _RES_XML_RESOURCE_MAP_TYPE:
+            resource_ids = struct.unpack_from(f"<{(size - header_size) // 4}I", data, position + header_size)
+        elif chunk_type == _RES_XML_START_ELEMENT_TYPE:
+            return _read_attributes(data, position + header_size, strings, resource_ids)
+        position += size
+    raise ApkMetadataError("No <manifest> element found")
+
+
+def _read_attributes(data, start, strings, resource_ids):
+    _, _, attribute_start, attribute_size, count = struct.unpack_from("<IIHHH", data, start)
+    attributes = {}
+    for index in range(count):
+        _, name, raw, _, _, data_type, value = _ATTRIBUTE.unpack_from(
+            data, start + attribute_start + index * attribute_size)
+        # Obfuscated builds may blank android: attribute names; the resource id still identifies them
+        resource_id = resource_ids[name] if name < len(resource_ids) else None
+        key = {_ATTR_VERSION_CODE: "versionCode", _ATTR_VERSION_NAME: "versionName",
+               _ATTR_VERSION_CODE_MAJOR: "versionCodeMajor"}.get(resource_id)
+        if key is None:
+            key = strings[name] if name < len(strings) else str(name)
+        if data_type == _TYPE_STRING:
+            attributes[key] = strings[value]
+        elif data_type in (_TYPE_INT_DEC, _TYPE_INT_HEX):
+            attributes[key] = value
+        elif raw != 0xffffffff and raw < len(strings):
+            attributes[key] = strings[raw]
+        else:
+            attributes[key] = value
+    return attributes
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_apk_info(path, sha256=None):
+    try:
+        with zipfile.ZipFile(path) as apk:
+            manifest = parse_manifest(apk.read("AndroidManifest.xml"))
+    except (zipfile.BadZipFile, KeyError, struct.error, IndexError) as e:
+        raise ApkMetadataError(f"{os.path.basename(path)}: cannot read AndroidManifest.xml ({e})") from e
+    version_code = manifest.get("versionCode")
+    if not isinstance(version_code, int):
+        try:
+            version_code = int(version_code)
+        except (TypeError, ValueError):
+            version_code = None
+    if version_code is not None and isinstance(manifest.get("versionCodeMajor"), int):
+        version_code |= manifest["versionCodeMajor"] << 32
+    return ApkInfo(manifest.get("package"), version_code, manifest.get("versionName"),
+                   manifest.get("split"), sha256 or file_sha256(path))
+
+
+class ApkMetadataCache:
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        # Parallel installs of the same file should hash it once, not once per device
+        self._compute_lock = threading.Lock()
+        self._by_file = {}
+        self._by_hash = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self._by_file = data.get("files", {})
+        self._by_hash = {sha: ApkInfo(*info) for sha, info in data.get("hashes", {}).items()}
+
+    def _save(self):
+        data = {"files": self._by_file, "hashes": {sha: list(info) for sha, info in self._by_hash.items()}}
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    def get(self, path):
+        """ApkInfo for path; only hashes or parses when size/mtime changed or the content is new."""
+        path = os.path.abspath(path)
+        with self._compute_lock:
+            return self._get(path)
+
+    def _get(self, path):
+        st = os.stat(path)
+        with self._lock:
+            entry = self._by_file.get(path)
+            if entry is not None and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime_ns:
+                info = self._by_hash.get(entry["sha256"])
+                if info is not None:
+                    return info
+        sha256 = file_sha256(path)
+        with self._lock:
+            info = self._by_hash.get(sha256)
+        if info is None:
+            info = read_apk_info(path, sha256)
+        with self._lock:
+            self._by_hash[sha256] = info
+            self._by_file[path] = {"size": st.st_size, "mtime": st.st_mtime_ns, "sha256": sha256}
+            self._save()
+        return info
+
+    def base_info(self, paths):
+        """ApkInfo of the base APK of a split set (the one without a split name)."""
+        infos = [self.get(path) for path in paths]
+        for info in infos:
+            if not info.split:
+                return info
+        return infos[0]
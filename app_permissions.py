@@ -0,0 +1,181 @@
+"""Permission state parsed from `dumpsys package`, and batched grant/revoke.
+
+parse_permissions() turns the package dump into requested, install-time granted and
+runtime granted/denied sets per package. A permission matrix (one line per
+`package permission grant|revoke`) is compared against that state so only the entries
+that would change anything are sent. Those go to the device as pipelined commands on a
+single shell session and come back with one result per item. Setting up a test device
+then costs two round trips instead of one adb call per permission.
+"""
+import collections
+import re
+
+from adb_client import quote_command
+
+PermissionState = collections.namedtuple(
+    "PermissionState", "package requested install_granted runtime_granted runtime_denied")
+PermissionChange = collections.namedtuple("PermissionChange", "package permission grant")
+PermissionResult = collections.namedtuple("PermissionResult", "package permission grant ok message")
+
+_PACKAGE = re.compile(r"^\s*Package \[([^\]]+)\]")
+_USER = re.compile(r"^\s*User (\d+):")
+_SUBSECTIONS = {
+    "requested permissions:": "requested",
+    "install permissions:": "install",
+    "runtime permissions:": "runtime",
+}
+
+
+def _indent(line):
+    return len(line) - len(line.lstrip())
+
+
+def parse_permissions(text, user=0):
+    """{package: PermissionState} from `dumpsys package <name>` or `dumpsys package packages`.
+
+    Runtime permissions are those of `user`. Hidden (pre-update) system packages are skipped.
+    """
+    states = {}
+    current = None
+    in_packages = False
+    user_id = None
+    mode = None
+    mode_indent = 0
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        indent = _indent(line)
+        if indent == 0:
+            # Top-level sections: only "Packages:" describes the installed packages
+            in_packages = line.startswith("Packages:")
+            current = mode = None
+            continue
+        if mode is not None and indent <= mode_indent:
+            mode = None
+        match = _PACKAGE.match(line)
+        if match:
+            current = None
+            mode = None
+            user_id = None
+            if in_packages:
+                name = match.group(1)
+                current = states[name] = PermissionState(name, set(), set(), set(), set())
+            continue
+        if current is None:
+            continue
+        match = _USER.match(line)
+        if match:
+            user_id = int(match.group(1))
+            mode = None
+            continue
+        stripped = line.strip()
+        if stripped in _SUBSECTIONS:
+            mode = _SUBSECTIONS[stripped]
+            mode_indent = indent
+            continue
+        if mode is None:
+            continue
+        name = stripped.split(":", 1)[0].split(",", 1)[0].strip()
+        granted = "granted=true" in stripped
+        if mode == "requested":
+            current.requested.add(name)
+        elif mode == "install":
+            if granted:
+                current.install_granted.add(name)
+        elif mode == "runtime" and (user_id is None or user_id == user):
+            (current.runtime_granted if granted else current.runtime_denied).add(name)
+    return states
+
+
+def format_permissions(state):
+    lines = [f"Package: {state.package}", ""]
+    for title, names in (("Requested", state.requested), ("Install-time granted", state.install_granted),
+                         ("Runtime granted", state.runtime_granted), ("Runtime denied", state.runtime_denied)):
+        lines.append(f"{title} ({len(names)}):")
+        lines.extend(f"  {name}" for name in sorted(names))
+        lines.append("")
+    return "\n".join(lines)
+
+
+def parse_matrix(text):
+    """PermissionChange per `package permission grant|revoke` line; '#' starts a comment.
+
+    Commas or tabs may separate the fields, so a CSV export of a spreadsheet works too.
+    A package/permission pair may only appear once, since two lines for it would conflict.
+    """
+    changes = []
+    seen = {}
+    for number, line in enumerate(text.splitlines(), 1):
+        fields = line.split("#", 1)[0].replace(",", " ").split()
+        if not fields:
+            continue
+        if len(fields) != 3 or fields[2].lower() not in ("grant", "revoke"):
+            raise ValueError(f"Line {number}: expected 'package permission grant|revoke', got {line.strip()!r}")
+        key = (fields[0], fields[1])
+        if key in seen:
+            raise ValueError(f"Line {number}: {fields[0]} {fields[1]} is already set on line {seen[key]}")
+        seen[key] = number
+        changes.append(PermissionChange(fields[0], fields[1], fields[2].lower() == "grant"))
+    return changes
+
+
+def plan_changes(states, changes):
+    """Split changes into (to_send, already_set). Unknown packages stay in to_send so
+    the device reports the error for them."""
+    to_send, already = [], []
+    for change in changes:
+        state = states.get(change.package)
+        if state is not None and change.grant and change.permission in state.runtime_granted:
+            already.append(change)
+        elif state is not None and not change.grant and change.permission in state.runtime_denied:
+            already.append(change)
+        else:
+            to_send.append(change)
+    return to_send, already
+
+
+def read_states(session, packages, user=0):
+    """Permission state of each package, all dumps pipelined on one shell session."""
+    states = {}
+    for result in session.run_many([quote_command(["dumpsys", "package", package]) for package in packages]):
+        states.update(parse_permissions(result.output, user))
+    return states
+
+
+def apply_changes(session, changes):
+    """Run pm grant/revoke for every change on one session; returns PermissionResult per change."""
+    commands = [quote_command(["pm", "grant" if change.grant else "revoke", change.package, change.permission])
+                for change in changes]
+    return [PermissionResult(change.package, change.permission, change.grant, result.returncode == 0,
+                             result.output.strip())
+            for change, result in zip(changes, session.run_many(commands))]
+
+
+def apply_matrix(session, changes, user=0):
+    """Read current state, send only the changes that matter, and report every item.
+
+    Items that were already in the wanted state are reported as ok with "unchanged".
+    Results are positional, one per item of changes.
+    """
+    packages = list(dict.fromkeys(change.package for change in changes))
+    to_send, _ = plan_changes(read_states(session, packages, user), changes)
+    # to_send keeps the order of changes, so its results line up as they are consumed
+    sent = collections.deque(zip(to_send, apply_changes(session, to_send)))
+    results = []
+    for change in changes:
+        if sent and sent[0][0] is change:
+            results.append(sent.popleft()[1])
+        else:
+            results.append(PermissionResult(change.package, change.permission, change.grant, True, "unchanged"))
+    return results
+
+
+def format_results(results):
+    failed = sum(1 for result in results if not result.ok)
+    lines = [f"{len(results) - failed} ok, {failed} failed", ""]
+    for result in results:
+        action = "grant" if result.grant else "revoke"
+        status = "OK" if result.ok else "FAILED"
+        lines.append(f"{status:<7}{action:<7}{result.package} {result.permission}"
+                     + (f"  ({result.message.splitlines()[-1]})" if result.message else ""))
+    return "\n".join(lines)
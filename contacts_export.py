@@ -0,0 +1,179 @@
+"""Streaming export of content provider rows (contacts by default) to CSV or JSONL.
+
+`content query` prints one `Row: N key=value, key=value` line per row. The query runs
+through exec: and its output is parsed line by line as it arrives, so a device with
+tens of thousands of contacts never has its whole dump in memory. Asking only for the
+needed columns (--projection) keeps the output small. Since the columns are known in
+order, values that contain ", " are still split correctly. Values that contain newlines
+continue on the following lines until the next `Row:`.
+
+Incremental exports remember the highest value of a key column (_id, or the contact's
+last-updated timestamp) in FILE.state.json and ask only for rows beyond it. The new rows
+are appended, so the file is a log: a later row with the same _id supersedes an earlier
+one.
+"""
+import codecs
+import csv
+import json
+import os
+import re
+import time
+
+from adb_client import AdbError, quote_command
+
+CONTACTS_URI = "content://com.android.contacts/data/phones"
+CONTACT_COLUMNS = ("_id", "contact_id", "display_name", "data1", "data2", "data3",
+                   "contact_last_updated_timestamp")
+# Friendlier headers for the phone data columns
+COLUMN_TITLES = {"data1": "number", "data2": "type", "data3": "label"}
+MODIFIED_KEY = "contact_last_updated_timestamp"
+
+_ROW = re.compile(r"Row: \d+ ")
+_ANY_COLUMN = re.compile(r", (?=[A-Za-z_][A-Za-z0-9_]*=)")
+
+
+def parse_row(text, columns=None):
+    """Parse the part of a Row: line after "Row: N " into {column: value or None}."""
+    values = {}
+    if columns:
+        position = 0
+        for index, column in enumerate(columns):
+            prefix = column + "="
+            if not text.startswith(prefix, position):
+                break
+            start = position + len(prefix)
+            if index + 1 < len(columns):
+                end = text.find(f", {columns[index + 1]}=", start)
+                end = len(text) if end < 0 else end
+            else:
+                end = len(text)
+            values[column] = text[start:end]
+            position = end + 2
+    else:
+        for field in _ANY_COLUMN.split(text):
+            key, _, value = field.partition("=")
+            values[key] = value
+    return {key: (None if value == "NULL" else value) for key, value in values.items()}
+
+
+def iter_lines(chunks):
+    """Decode a byte stream into lines without holding more than one line in memory."""
+    decoder = codecs.getincrementaldecoder("utf-8")("replace")
+    pending = ""
+    for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+def query_rows(client, uri, columns=None, serial=None, where=None, sort=None, cancel_event=None):
+    """Yield each row of `content query` as a dict while the output is still arriving."""
+    cmd = ["content", "query", "--uri", uri]
+    if columns:
+        cmd += ["--projection", ":".join(columns)]
+    if where:
+        cmd += ["--where", where]
+    if sort:
+        cmd += ["--sort", sort]
+    with client.open_service(f"exec:{quote_command(cmd)} 2>&1", serial) as conn:
+        row = None
+        messages = []
+        for line in iter_lines(conn.iter_chunks()):
+            if cancel_event is not None and cancel_event.is_set():
+                raise AdbError("Export cancelled")
+            match = _ROW.match(line)
+            if match:
+                if row is not None:
+                    yield parse_row(row, columns)
+                row = line[match.end():]
+            elif row is not None:
+                row += "\n" + line
+            elif line.strip() and line.strip() != "No result found.":
+                messages.append(line)
+        if row is not None:
+            yield parse_row(row, columns)
+        elif messages:
+            raise AdbError("\n".join(messages))
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def load_state(path):
+    try:
+        with open(path + ".state.json", "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def export_rows(client, path, serial=None, uri=CONTACTS_URI, columns=CONTACT_COLUMNS,
+                incremental_key=None, progress=None, cancel_event=None):
+    """Write rows of uri to path as CSV, or JSONL when path ends in .jsonl/.json.
+
+    With incremental_key (an integer column such as _id or MODIFIED_KEY) and an earlier
+    export of the same query at path, only rows whose key is greater than the last one
+    exported are fetched and appended. A failed or cancelled export leaves the file as
+    it was. Returns a dict with rows, appended, last and elapsed.
+    """
+    started = time.monotonic()
+    fmt = "jsonl" if path.lower().endswith((".jsonl", ".json")) else "csv"
+    state = load_state(path) if incremental_key else None
+    append = (state is not None and os.path.isfile(path)
+              and (state.get("uri"), state.get("key"), state.get("columns")) == (uri, incremental_key, list(columns)))
+    last = state.get("last") if append else None
+    where = f"{incremental_key}>{int(last)}" if last is not None else None
+    sort = f"{incremental_key} ASC" if incremental_key else None
+
+    # A full export goes to a temp file first so a failure never touches the previous one
+    out_path = path if append else path + ".tmp"
+    original_size = os.path.getsize(path) if append else 0
+    count = 0
+    try:
+        with open(out_path, "a" if append else "w", encoding="utf-8", newline="") as f:
+            titles = [COLUMN_TITLES.get(column, column) for column in columns]
+            writer = csv.writer(f) if fmt == "csv" else None
+            if writer is not None and not append:
+                writer.writerow(titles)
+            for row in query_rows(client, uri, columns, serial, where, sort, cancel_event):
+                if writer is not None:
+                    writer.writerow(["" if row.get(column) is None else row[column] for column in columns])
+                else:
+                    f.write(json.dumps({title: row.get(column) for title, column in zip(titles, columns)},
+                                       ensure_ascii=False) + "\n")
+                count += 1
+                if incremental_key:
+                    value = _int_or_none(row.get(incremental_key))
+                    if value is not None and (last is None or value > last):
+                        last = value
+                if progress is not None and count % 500 == 0:
+                    progress(count)
+    except BaseException:
+        # Roll back to what the previous export wrote so the remembered position stays valid
+        if append:
+            with open(path, "r+b") as f:
+                f.truncate(original_size)
+        else:
+            try:
+                os.remove(out_path)
+            except OSError:
+                pass
+        raise
+    if not append:
+        os.replace(out_path, path)
+    if incremental_key:
+        tmp_path = path + ".state.json.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"uri": uri, "key": incremental_key, "columns": list(columns), "last": last}, f)
+        os.replace(tmp_path, path + ".state.json")
+    if progress is not None:
+        progress(count)
+    return {"rows": count, "appended": append, "last": last, "elapsed": time.monotonic() - started}
@@ -0,0 +1,162 @@
+"""Device selection and fan-out of one action across several devices.
+
+broadcast() runs an action once per serial on its own worker pool. The pool size caps
+overall parallelism, and a DeviceLimiter shared between broadcasts caps how many
+operations may hit the same phone at once, so a bench of phones progresses together
+without one device being flooded by overlapping actions.
+"""
+import collections
+import threading
+import time
+import tkinter as tk
+import tkinter.ttk as ttk
+from concurrent.futures import ThreadPoolExecutor
+
+BroadcastResult = collections.namedtuple("BroadcastResult", "serial ok value error elapsed")
+
+
+class DeviceLimiter:
+    def __init__(self, per_device=2):
+        self.per_device = per_device
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def slot(self, serial):
+        with self._lock:
+            semaphore = self._semaphores.get(serial)
+            if semaphore is None:
+                semaphore = self._semaphores[serial] = threading.BoundedSemaphore(self.per_device)
+            return semaphore
+
+
+def broadcast(serials, fn, max_workers=16, limiter=None, cancel_event=None, on_result=None):
+    """Run fn(serial) for every serial concurrently.
+
+    Returns one BroadcastResult per serial in input order; errors are captured
+    instead of raised. on_result(result, completed) is called from the worker thread
+    as each device finishes.
+    """
+    serials = list(serials)
+    results = {}
+    lock = threading.Lock()
+
+    def run_one(serial):
+        started = time.monotonic()
+        slot = limiter.slot(serial) if limiter is not None else None
+        try:
+            if slot is not None:
+                # Poll so a cancelled broadcast does not wait for a busy device
+                while not slot.acquire(timeout=0.2):
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise Exception("Cancelled")
+            try:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise Exception("Cancelled")
+                result = BroadcastResult(serial, True, fn(serial), None, time.monotonic() - started)
+            finally:
+                if slot is not None:
+                    slot.release()
+        except Exception as e:
+            result = BroadcastResult(serial, False, None, e, time.monotonic() - started)
+        with lock:
+            results[serial] = result
+            completed = len(results)
+        if on_result is not None:
+            on_result(result, completed)
+
+    if serials:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(serials)), thread_name_prefix="adb-broadcast") as pool:
+            list(pool.map(run_one, serials))
+    return [results[serial] for serial in serials]
+
+
+def describe_device(info):
+    """One-line label for an entry from AdbClient.devices_long()."""
+    model = info.get("model", "").replace("_", " ")
+    return f"{info['serial']}  [{info['state']}]  {model}".rstrip()
+
+
+class DeviceSelectorWindow:
+    """Multi-select list of attached devices; on_apply gets the chosen serials.
+
+    The list comes from a DeviceTracker, so it follows plugs and unplugs without
+    querying the ADB server.
+    """
+
+    def __init__(self, parent, tracker, selected, on_apply, title="Select a device:", refresh_ms=300):
+        self.tracker = tracker
+        self.on_apply = on_apply
+        self.refresh_ms = refresh_ms
+        self.selected = set(selected)
+        self.devices = []
+        self.generation = None
+
+        self.window = tk.Toplevel(parent)
+        self.window.title(title)
+        self.window.geometry("500x450")
+        self.window.configure(bg="#282c34")
+
+        tk.Label(self.window, text=title, bg="#282c34", fg="white").pack(anchor="w", padx=10, pady=(10, 0))
+        self.listbox = tk.Listbox(self.window, selectmode=tk.EXTENDED, bg="#1e1e1e", fg="white",
+                                  selectbackground="#61afef", font=("Consolas", 10), exportselection=False)
+        self.listbox.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        buttons = tk.Frame(self.window, bg="#282c34")
+        buttons.pack(pady=(0, 10))
+        tk.Button(buttons, text="All", command=lambda: self.listbox.selection_set(0, tk.END)).pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons, text="None", command=lambda: self.listbox.selection_clear(0, tk.END)).pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons, text="Apply", command=self.apply).pack(side=tk.LEFT, padx=5)
+        self.refresh()
+
+    def refresh(self):
+        if not self.window.winfo_exists():
+            return
+        if self.tracker.generation != self.generation:
+            self.generation = self.tracker.generation
+            self.show_devices(sorted(self.tracker.devices(), key=lambda info: info["serial"]))
+        self.window.after(self.refresh_ms, self.refresh)
+
+    def show_devices(self, devices):
+        current = {self.devices[i]["serial"] for i in self.listbox.curselection()} if self.devices else self.selected
+        self.devices = devices
+        self.listbox.delete(0, tk.END)
+        for position, info in enumerate(devices):
+            self.listbox.insert(tk.END, describe_device(info))
+            if info["serial"] in current:
+                self.listbox.selection_set(position)
+
+    def apply(self):
+        serials = [self.devices[i]["serial"] for i in self.listbox.curselection()]
+        self.on_apply(serials)
+        self.window.destroy()
+
+
+class BroadcastResultWindow:
+    """Table of per-device outcomes of one broadcast action."""
+
+    def __init__(self, parent, title, results):
+        self.results = {result.serial: result for result in results}
+        self.window = tk.Toplevel(parent)
+        self.window.title(title)
+        self.window.geometry("750x400")
+        self.window.configure(bg="#282c34")
+
+        failed = sum(1 for result in results if not result.ok)
+        tk.Label(self.window, text=f"{len(results) - failed} succeeded, {failed} failed",
+                 bg="#282c34", fg="white").pack(anchor="w", padx=10, pady=(10, 0))
+
+        columns = ("serial", "status", "time", "details")
+        self.tree = ttk.Treeview(self.window, columns=columns, show="headings")
+        for column, width in zip(columns, (180, 70, 70, 400)):
+            self.tree.heading(column, text=column.capitalize())
+            self.tree.column(column, width=width, anchor="w")
+        for result in results:
+            if result.ok:
+                # Only text output is summarized; images and windows are shown elsewhere
+                details = result.value.strip() if isinstance(result.value, str) else ""
+            else:
+                details = str(result.error)
+            self.tree.insert("", "end", iid=result.serial, values=(
+                result.serial, "OK" if result.ok else "FAILED", f"{result.elapsed:.1f}s",
+                details.splitlines()[0] if details else ""))
+        self.tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
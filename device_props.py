@@ -0,0 +1,219 @@
+"""Parsed and cached `getprop` output per device.
+
+One shell round trip returns every property together with the kernel boot id and
+uptime. The parsed result is kept per serial for a TTL, so repeated lookups of model, SDK
+level or ABI never reach the device. Older entries are checked against a fresh boot id
+first: a new boot id, or an uptime lower than the cached one, means the device rebooted
+and the old values are thrown away.
+"""
+import bisect
+import re
+import threading
+import time
+
+_PROP_LINE = re.compile(r"^\[([^\]]*)\]: \[(.*?)\]$", re.MULTILINE | re.DOTALL)
+_BOOT_MARKER = "--adb-toolkit-boot--"
+_BOOT_COMMAND = "cat /proc/sys/kernel/random/boot_id /proc/uptime"
+_FETCH_COMMAND = f"getprop; echo {_BOOT_MARKER}; {_BOOT_COMMAND}"
+
+
+def parse_getprop(text):
+    """Turn `getprop` output ("[key]: [value]" lines) into a dict."""
+    return {key: value for key, value in _PROP_LINE.findall(text)}
+
+
+def parse_boot(text):
+    """(boot_id, uptime) from `cat /proc/sys/kernel/random/boot_id /proc/uptime`."""
+    fields = text.split()
+    boot_id = fields[0] if fields else ""
+    try:
+        uptime = float(fields[1])
+    except (IndexError, ValueError):
+        uptime = 0.0
+    return boot_id, uptime
+
+
+class DeviceProperties:
+    """Read-only view of one device's properties with typed and prefix lookups."""
+
+    def __init__(self, props, boot_id="", uptime=0.0, fetched=None):
+        self.props = props
+        self.boot_id = boot_id
+        self.uptime = uptime
+        self.fetched = time.monotonic() if fetched is None else fetched
+        self._keys = sorted(props)
+
+    def __contains__(self, key):
+        return key in self.props
+
+    def __getitem__(self, key):
+        return self.props[key]
+
+    def __len__(self):
+        return len(self.props)
+
+    def get(self, key, default=None):
+        value = self.props.get(key)
+        return default if value in (None, "") else value
+
+    def get_int(self, key, default=None):
+        try:
+            return int(self.props[key])
+        except (KeyError, ValueError):
+            return default
+
+    def get_bool(self, key, default=None):
+        value = self.props.get(key)
+        if value in ("1", "true", "y", "yes", "on"):
+            return True
+        if value in ("0", "false", "n", "no", "off"):
+            return False
+        return default
+
+    def prefix(self, prefix):
+        """All properties under prefix, e.g. prefix("ro.product.") (a trailing * is ignored)."""
+        prefix = prefix.rstrip("*")
+        start = bisect.bisect_left(self._keys, prefix)
+        result = {}
+        for key in self._keys[start:]:
+            if not key.startswith(prefix):
+                break
+            result[key] = self.props[key]
+        return result
+
+    def age(self):
+        return time.monotonic() - self.fetched
+
+    @property
+    def model(self):
+        return self.get("ro.product.model", "")
+
+    @property
+    def manufacturer(self):
+        return self.get("ro.product.manufacturer", "")
+
+    @property
+    def android_version(self):
+        return self.get("ro.build.version.release", "")
+
+    @property
+    def sdk(self):
+        return self.get_int("ro.build.version.sdk", 0)
+
+    @property
+    def abis(self):
+        abilist = self.get("ro.product.cpu.abilist") or self.get("ro.product.cpu.abi", "")
+        return [abi for abi in abilist.split(",") if abi]
+
+    @property
+    def abi(self):
+        abis = self.abis
+        return abis[0] if abis else ""
+
+    def format(self):
+        """Text in the same "[key]: [value]" layout as getprop, sorted by key."""
+        return "\n".join(f"[{key}]: [{self.props[key]}]" for key in self._keys)
+
+
+class PropertyStore:
+    """Properties per device serial, cached for `ttl` seconds.
+
+    Once an entry is older than `verify_after` seconds, get() first probes the boot id and
+    uptime (one small read) and refetches if the device rebooted. Reboot listeners are
+    called with the serial so caches keyed to the old boot can be dropped too.
+    """
+
+    def __init__(self, client, ttl=300.0, verify_after=30.0):
+        self.client = client
+        self.ttl = ttl
+        self.verify_after = verify_after
+        self._cache = {}
+        self._checked = {}
+        self._locks = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def _serial_lock(self, serial):
+        with self._lock:
+            lock = self._locks.get(serial)
+            if lock is None:
+                lock = self._locks[serial] = threading.Lock()
+            return lock
+
+    def add_reboot_listener(self, callback):
+        """callback(serial) is called from whichever thread noticed the reboot."""
+        self._listeners.append(callback)
+
+    def _rebooted_device(self, serial):
+        for callback in list(self._listeners):
+            try:
+                callback(serial)
+            except Exception as e:
+                print(f"[!] Reboot listener failed: {e}")
+
+    def fetch(self, serial=None):
+        """Query the device now, bypassing and refreshing the cache."""
+        output = self.client.shell(_FETCH_COMMAND, serial=serial)
+        props_text, _, boot_text = output.partition(_BOOT_MARKER)
+        return self.update(serial, DeviceProperties(parse_getprop(props_text), *parse_boot(boot_text)))
+
+    def update(self, serial, props):
+        """Cache properties that were read some other way (e.g. as part of a snapshot)."""
+        with self._lock:
+            old = self._cache.get(serial)
+            self._cache[serial] = props
+            self._checked.pop(serial, None)
+        if old is not None and self._rebooted(old, props):
+            self._rebooted_device(serial)
+        return props
+
+    @staticmethod
+    def _rebooted(old, new):
+        if old.boot_id and new.boot_id:
+            return old.boot_id != new.boot_id
+        # No boot id (very old kernels): uptime going backwards also means a reboot
+        return new.uptime < old.uptime
+
+    def get(self, serial=None, refresh=False):
+        """Cached properties of a device, fetched on first use, after a reboot or once the TTL expires."""
+        with self._serial_lock(serial):
+            with self._lock:
+                props = self._cache.get(serial)
+                checked = self._checked.get(serial, 0.0)
+            if (not refresh and props is not None and props.age() <= self.ttl
+                    and time.monotonic() - max(props.fetched, checked) > self.verify_after):
+                if self.check_reboot(serial):
+                    props = None
+            if refresh or props is None or props.age() > self.ttl:
+                props = self.fetch(serial)
+            return props
+
+    def peek(self, serial=None):
+        """Cached properties without ever touching the device (None if not cached)."""
+        with self._lock:
+            return self._cache.get(serial)
+
+    def check_reboot(self, serial=None):
+        """Cheap probe of boot id and uptime; drops the cache if the device rebooted."""
+        with self._lock:
+            props = self._cache.get(serial)
+        if props is None:
+            return False
+        current = DeviceProperties({}, *parse_boot(self.client.shell(_BOOT_COMMAND, serial=serial)))
+        if self._rebooted(props, current):
+            self.invalidate(serial)
+            self._rebooted_device(serial)
+            return True
+        with self._lock:
+            self._checked[serial] = current.fetched
+        return False
+
+    def invalidate(self, serial=None):
+        with self._lock:
+            self._cache.pop(serial, None)
+            self._checked.pop(serial, None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._checked.clear()
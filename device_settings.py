@@ -0,0 +1,157 @@
+"""Cached `settings` tables with diffing against a profile and one-shot apply.
+
+The system, secure and global tables are read with one shell round trip and cached per
+device. A profile is a JSON object in the same shape, {"global": {"key": "value"}, ...},
+where null deletes a key. Only keys whose value differs from the cache are changed,
+all in a single shell script that prints one exit status per change. Provisioning a
+device to a standard profile then takes two round trips however many keys it sets.
+"""
+import collections
+import json
+import threading
+
+from adb_client import AdbError, quote_command
+
+NAMESPACES = ("system", "secure", "global")
+SettingChange = collections.namedtuple("SettingChange", "namespace key old new")
+SettingResult = collections.namedtuple("SettingResult", "change ok")
+
+_SECTION = "--adb-toolkit-section--"
+_STATUS = "__adb_toolkit_setting_status"
+_LIST_COMMAND = f"; echo {_SECTION}; ".join(f"settings list {namespace}" for namespace in NAMESPACES)
+
+
+def parse_settings_list(text):
+    """{key: value} from `settings list`; lines without '=' continue the previous value."""
+    values = {}
+    key = None
+    for line in text.splitlines():
+        name, sep, value = line.partition("=")
+        if sep and name and " " not in name:
+            key = name
+            values[key] = value
+        elif key is not None:
+            values[key] += "\n" + line
+    return values
+
+
+def _setting_value(value):
+    # settings stores booleans as 1/0, and json.load gives True/False for them
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return str(value)
+
+
+def load_profile(path):
+    """Read a profile file; raises ValueError if it is not shaped like {namespace: {key: value}}."""
+    with open(path, "r", encoding="utf-8") as f:
+        profile = json.load(f)
+    if not isinstance(profile, dict):
+        raise ValueError("A settings profile must be a JSON object of namespaces")
+    unknown = [namespace for namespace in profile if namespace not in NAMESPACES]
+    if unknown:
+        raise ValueError(f"Unknown settings namespace(s): {', '.join(unknown)}")
+    for namespace, keys in profile.items():
+        if not isinstance(keys, dict):
+            raise ValueError(f"Settings namespace '{namespace}' must map to an object of key/value pairs")
+    return {namespace: {key: _setting_value(value) for key, value in keys.items()}
+            for namespace, keys in profile.items()}
+
+
+def diff(current, profile):
+    """SettingChange for every profile key whose value differs from current."""
+    changes = []
+    for namespace in NAMESPACES:
+        existing = current.get(namespace, {})
+        for key, value in sorted(profile.get(namespace, {}).items()):
+            old = existing.get(key)
+            if old != value:
+                changes.append(SettingChange(namespace, key, old, value))
+    return changes
+
+
+def _command(change):
+    if change.new is None:
+        return quote_command(["settings", "delete", change.namespace, change.key])
+    return quote_command(["settings", "put", change.namespace, change.key, change.new])
+
+
+def format_changes(results):
+    failed = sum(1 for result in results if not result.ok)
+    lines = [f"{len(results) - failed} changed, {failed} failed", ""]
+    for result in results:
+        change = result.change
+        old = "(unset)" if change.old is None else change.old.replace("\n", "\\n")
+        new = "(deleted)" if change.new is None else change.new.replace("\n", "\\n")
+        lines.append(f"{'OK' if result.ok else 'FAILED':<7}{change.namespace}/{change.key}: {old} -> {new}")
+    return "\n".join(lines)
+
+
+class SettingsStore:
+    """settings tables per device serial, read once and kept in sync with our own writes."""
+
+    def __init__(self, client):
+        self.client = client
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def fetch(self, serial=None):
+        output = self.client.shell(_LIST_COMMAND, serial=serial)
+        sections = output.split(_SECTION)
+        sections += [""] * (len(NAMESPACES) - len(sections))
+        tables = {namespace: parse_settings_list(section.strip("\n"))
+                  for namespace, section in zip(NAMESPACES, sections)}
+        with self._lock:
+            self._cache[serial] = tables
+        return tables
+
+    def get(self, serial=None, refresh=False):
+        with self._lock:
+            tables = self._cache.get(serial)
+        if tables is None or refresh:
+            tables = self.fetch(serial)
+        return tables
+
+    def lookup(self, serial, namespace, key, default=None):
+        return self.get(serial)[namespace].get(key, default)
+
+    def invalidate(self, serial=None):
+        with self._lock:
+            self._cache.pop(serial, None)
+
+    def apply(self, serial, changes):
+        """Send every change in one shell script; returns a SettingResult per change."""
+        if not changes:
+            return []
+        script = "\n".join(f"{_command(change)} >/dev/null 2>&1; echo {_STATUS} $?" for change in changes)
+        output = self.client.shell(script, serial=serial)
+        codes = [line.split()[1] for line in output.splitlines()
+                 if line.startswith(_STATUS) and len(line.split()) == 2]
+        if len(codes) != len(changes):
+            self.invalidate(serial)
+            raise AdbError(f"settings script ended early:\n{output.strip()}")
+        results = [SettingResult(change, code == "0") for change, code in zip(changes, codes)]
+        with self._lock:
+            tables = self._cache.get(serial)
+            if tables is not None:
+                for result in results:
+                    if result.ok:
+                        table = tables.setdefault(result.change.namespace, {})
+                        if result.change.new is None:
+                            table.pop(result.change.key, None)
+                        else:
+                            table[result.change.key] = result.change.new
+        return results
+
+    def apply_profile(self, serial, profile, refresh=True):
+        """Diff profile against the device (re-read unless refresh=False) and apply the difference."""
+        return self.apply(serial, diff(self.get(serial, refresh), profile))
+
+    def save_snapshot(self, serial, path):
+        """Write the current tables as JSON; the file can be edited and used as a profile."""
+        tables = self.get(serial, refresh=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(tables, f, indent=2, sort_keys=True, ensure_ascii=False)
+        return sum(len(table) for table in tables.values())
@@ -0,0 +1,183 @@
+"""Network, socket, property and battery state of a device from one shell invocation.
+
+`ip addr show`, `netstat -tupn`, `dumpsys battery`, the boot id and `getprop` run as one
+script behind the exec: service, each section starting with a marker line. Sections are
+handed to a parser thread as soon as their marker closes them, so parsing overlaps with
+the device still producing the rest of the output. The result is a single
+DeviceSnapshot record, and a health check of many devices costs one round trip each.
+"""
+import codecs
+import collections
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from device_props import DeviceProperties, parse_boot, parse_getprop
+
+Interface = collections.namedtuple("Interface", "name state mac ipv4 ipv6")
+Socket = collections.namedtuple("Socket", "proto local remote state pid program")
+DeviceSnapshot = collections.namedtuple("DeviceSnapshot", "serial taken elapsed interfaces sockets props battery")
+
+_MARKER = "--adb-toolkit-snapshot--"
+_SECTIONS = {
+    "interfaces": "ip addr show",
+    "sockets": "netstat -tupn",
+    "battery": "dumpsys battery",
+    "boot": "cat /proc/sys/kernel/random/boot_id /proc/uptime",
+    "props": "getprop",
+}
+SECTIONS = tuple(_SECTIONS)
+
+
+def snapshot_command(sections=SECTIONS):
+    """Shell script printing each named section after its marker line."""
+    return "; ".join(f"echo {_MARKER} {name}; {_SECTIONS[name]} 2>/dev/null" for name in sections)
+
+
+SNAPSHOT_COMMAND = snapshot_command()
+
+_parsers = ThreadPoolExecutor(max_workers=4)
+
+
+def parse_interfaces(text):
+    """Interfaces from `ip addr show`; addresses keep their /prefix length."""
+    interfaces = []
+    current = None
+    for line in text.splitlines():
+        if line and not line[0].isspace():
+            parts = line.split(":", 2)
+            if len(parts) < 3 or not parts[0].strip().isdigit():
+                continue
+            fields = parts[2].split()
+            state = fields[fields.index("state") + 1] if "state" in fields[:-1] else ""
+            current = Interface(parts[1].strip().split("@")[0], state, "", [], [])
+            interfaces.append(current)
+        elif current is not None:
+            fields = line.split()
+            if len(fields) < 2:
+                continue
+            if fields[0].startswith("link/"):
+                current = current._replace(mac=fields[1])
+                interfaces[-1] = current
+            elif fields[0] == "inet":
+                current.ipv4.append(fields[1])
+            elif fields[0] == "inet6":
+                current.ipv6.append(fields[1])
+    return interfaces
+
+
+def parse_sockets(text):
+    """Sockets from `netstat -tupn`; udp lines have no state column."""
+    sockets = []
+    for line in text.splitlines():
+        fields = line.split()
+        if len(fields) < 5 or not fields[0].startswith(("tcp", "udp")):
+            continue
+        if fields[0].startswith("tcp") and len(fields) >= 6:
+            state, rest = fields[5], fields[6:]
+        else:
+            state, rest = "", fields[5:]
+        pid, program = None, ""
+        if rest and "/" in rest[0]:
+            pid_text, _, program = rest[0].partition("/")
+            pid = int(pid_text) if pid_text.isdigit() else None
+        sockets.append(Socket(fields[0], fields[3], fields[4], state, pid, program))
+    return sockets
+
+
+def parse_dumpsys_fields(text):
+    """"key: value" lines of a dumpsys service as a dict of strings."""
+    fields = {}
+    for line in text.splitlines():
+        key, sep, value = line.strip().partition(": ")
+        if sep:
+            fields[key] = value.strip()
+    return fields
+
+
+_PARSERS = {
+    "interfaces": parse_interfaces,
+    "sockets": parse_sockets,
+    "battery": parse_dumpsys_fields,
+    "boot": parse_boot,
+    "props": parse_getprop,
+}
+
+
+def take_snapshot(client, serial=None, properties=None, sections=SECTIONS):
+    """Run the sections of SNAPSHOT_COMMAND (all by default) and return a DeviceSnapshot.
+
+    Sections left out are empty in the result. If a PropertyStore is given, the fresh
+    properties are cached in it as well.
+    """
+    unknown = [section for section in sections if section not in _SECTIONS]
+    if unknown:
+        raise ValueError(f"Unknown snapshot section(s): {', '.join(unknown)}")
+    if "props" in sections and "boot" not in sections:
+        # Cached properties need the boot id to tell a reboot apart
+        sections = tuple(sections) + ("boot",)
+    started = time.monotonic()
+    futures = {}
+    name = None
+    lines = []
+
+    def close_section():
+        if name in _PARSERS:
+            futures[name] = _parsers.submit(_PARSERS[name], "\n".join(lines))
+
+    with client.open_service(f"exec:{snapshot_command(sections)}", serial) as conn:
+        decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        pending = ""
+        for chunk in conn.iter_chunks():
+            pending += decoder.decode(chunk)
+            *complete, pending = pending.split("\n")
+            for line in complete:
+                if line.startswith(_MARKER):
+                    close_section()
+                    name = line[len(_MARKER):].strip()
+                    lines = []
+                else:
+                    lines.append(line.rstrip("\r"))
+        if pending:
+            lines.append(pending)
+        close_section()
+
+    results = {section: future.result() for section, future in futures.items()}
+    boot_id, uptime = results.get("boot", ("", 0.0))
+    props = DeviceProperties(results.get("props", {}), boot_id, uptime)
+    if properties is not None and "props" in results:
+        properties.update(serial, props)
+    return DeviceSnapshot(serial, time.time(), time.monotonic() - started, results.get("interfaces", []),
+                          results.get("sockets", []), props, results.get("battery", {}))
+
+
+def primary_ipv4(snapshot):
+    """First non-loopback IPv4 address without its prefix length, or None."""
+    for interface in snapshot.interfaces:
+        for address in interface.ipv4:
+            ip = address.split("/")[0]
+            if not ip.startswith("127."):
+                return ip
+    return None
+
+
+def format_snapshot(snapshot):
+    props = snapshot.props
+    battery = snapshot.battery
+    temperature = battery.get("temperature", "")
+    lines = [
+        f"Device: {props.manufacturer} {props.model}, Android {props.android_version} (SDK {props.sdk})",
+        f"Uptime: {props.uptime / 3600:.1f} h, snapshot took {snapshot.elapsed * 1000:.0f} ms",
+        f"Battery: {battery.get('level', '?')}%, "
+        f"{int(temperature) / 10 if temperature.lstrip('-').isdigit() else '?'} °C, "
+        f"{battery.get('voltage', '?')} mV",
+        "",
+        "Interfaces:",
+    ]
+    for interface in snapshot.interfaces:
+        addresses = ", ".join(interface.ipv4 + interface.ipv6) or "-"
+        lines.append(f"  {interface.name:<12} {interface.state:<8} {interface.mac:<18} {addresses}")
+    lines += ["", "Sockets:"]
+    for sock in snapshot.sockets:
+        owner = f"{sock.pid}/{sock.program}" if sock.pid is not None else "-"
+        lines.append(f"  {sock.proto:<5} {sock.local:<24} {sock.remote:<24} {sock.state:<12} {owner}")
+    return "\n".join(lines)
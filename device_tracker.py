@@ -0,0 +1,155 @@
+"""Push-based device presence from the ADB server's host:track-devices-l stream.
+
+The server sends the full device list once when the stream opens and again every time
+anything changes, each as a length-prefixed block in `adb devices -l` format. The tracker
+keeps that list in memory so the UI can read device states without asking the server,
+and listeners hear about attach, detach and state changes as soon as they happen.
+"""
+import threading
+
+from adb_client import AdbError, parse_device_list
+
+ATTACHED = "attached"
+DETACHED = "detached"
+CHANGED = "changed"
+
+
+class DeviceTracker:
+    def __init__(self, client, retry_delay=1.0, max_retry_delay=10.0):
+        self.client = client
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.connected = False
+        self.error = None
+        # Bumped on every change so views can cheaply tell whether to redraw
+        self.generation = 0
+        self._devices = {}
+        self._listeners = []
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._conn = None
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="adb-track-devices", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        conn = self._conn
+        if conn is not None:
+            # Unblocks the reader thread waiting for the next update
+            conn.close()
+
+    def add_listener(self, callback):
+        """callback(event, info) is called from the tracker thread for every change."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    # --- Registry ---
+
+    def devices(self):
+        """Snapshot of the known devices as a list of info dicts."""
+        with self._condition:
+            return [dict(info) for info in self._devices.values()]
+
+    def get(self, serial):
+        with self._condition:
+            info = self._devices.get(serial)
+            return dict(info) if info is not None else None
+
+    def state(self, serial):
+        with self._condition:
+            info = self._devices.get(serial)
+            return info["state"] if info is not None else None
+
+    def ready(self, serial=None):
+        """Serials in the "device" state, or whether the given serial is in it."""
+        with self._condition:
+            if serial is not None:
+                info = self._devices.get(serial)
+                return info is not None and info["state"] == "device"
+            return [s for s, info in self._devices.items() if info["state"] == "device"]
+
+    def wait_for(self, serial=None, state="device", timeout=None, cancel_event=None):
+        """Block until serial (or any device) reaches state; returns the serial or None on timeout."""
+        def match():
+            for s, info in self._devices.items():
+                if (serial is None or s == serial) and info["state"] == state:
+                    return s
+            return None
+
+        with self._condition:
+            if cancel_event is None:
+                self._condition.wait_for(lambda: match() is not None, timeout)
+                return match()
+            # Wake up periodically so a cancelled caller is not stuck until the timeout
+            remaining = timeout
+            while match() is None and not cancel_event.is_set():
+                step = 0.2 if remaining is None else min(0.2, remaining)
+                if step <= 0:
+                    break
+                self._condition.wait(step)
+                if remaining is not None:
+                    remaining -= step
+            return match()
+
+    # --- Stream ---
+
+    def _run(self):
+        delay = self.retry_delay
+        while not self._stop.is_set():
+            try:
+                self._conn = self.client.open()
+                self._conn.send("host:track-devices-l")
+                # Updates can be hours apart; only a closed stream ends the read
+                self._conn.settimeout(None)
+                self.connected = True
+                self.error = None
+                delay = self.retry_delay
+                while not self._stop.is_set():
+                    self._apply(parse_device_list(self._conn.read_string()))
+            except (AdbError, OSError) as e:
+                if not self._stop.is_set():
+                    self.error = e
+            finally:
+                self.connected = False
+                conn, self._conn = self._conn, None
+                if conn is not None:
+                    conn.close()
+            if self._stop.is_set():
+                break
+            # Server went away (e.g. `adb kill-server`): nothing is known to be attached
+            self._apply([])
+            self._stop.wait(delay)
+            delay = min(delay * 2, self.max_retry_delay)
+
+    def _apply(self, entries):
+        current = {info["serial"]: info for info in entries}
+        events = []
+        with self._condition:
+            for serial, info in current.items():
+                old = self._devices.get(serial)
+                if old is None:
+                    events.append((ATTACHED, info))
+                elif old["state"] != info["state"]:
+                    events.append((CHANGED, info))
+            for serial, old in self._devices.items():
+                if serial not in current:
+                    events.append((DETACHED, old))
+            self._devices = current
+            if events:
+                self.generation += 1
+            self._condition.notify_all()
+        for event, info in events:
+            for callback in list(self._listeners):
+                try:
+                    callback(event, dict(info))
+                except Exception as e:
+                    print(f"[!] Device listener failed: {e}")
@@ -0,0 +1,231 @@
+"""Incremental directory sync between the PC and a device, based on file hashes.
+
+Both sides are described as {relative path: (size, mtime, md5)}. The device side costs
+one shell session: a single `find ... stat` lists the tree, and md5sum runs only on files
+whose size or mtime differs from the previous sync, in pipelined batches. Local hashes
+are cached the same way. Only files whose hash differs are transferred, over one
+pipelined sync connection. With delete=True, files missing from the source are removed
+from the target. Everything remembered between runs lives in STATE_NAME inside the
+local folder.
+"""
+import hashlib
+import json
+import os
+import posixpath
+import threading
+import time
+
+from adb_client import AdbError, quote_command
+from adb_sync import SyncConnection
+from shell_session import ShellSession
+
+STATE_NAME = ".adb_toolkit_sync.json"
+HASH_BATCH = 100
+DELETE_BATCH = 100
+# Device folders too broad to mirror with delete=True; a wrong source folder would empty them
+PROTECTED_REMOTE_ROOTS = ("/", "/data", "/sdcard", "/storage", "/storage/emulated",
+                          "/storage/emulated/0", "/storage/self/primary", "/system")
+
+# Several devices may sync against the same local folder at once
+_state_lock = threading.Lock()
+
+
+def load_state(local_root):
+    try:
+        with open(os.path.join(local_root, STATE_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"local": {}, "remote": {}}
+
+
+def save_state(local_root, state):
+    path = os.path.join(local_root, STATE_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def md5_file(path):
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def local_tree(local_root, known):
+    """Hash every file under local_root, reusing known hashes when size and mtime match."""
+    tree = {}
+    for folder, _, files in os.walk(local_root):
+        for name in files:
+            path = os.path.join(folder, name)
+            rel = os.path.relpath(path, local_root).replace(os.sep, "/")
+            if rel == STATE_NAME or rel.endswith(".part"):
+                continue
+            st = os.stat(path)
+            entry = known.get(rel)
+            if entry is not None and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+                tree[rel] = tuple(entry)
+            else:
+                tree[rel] = (st.st_size, st.st_mtime_ns, md5_file(path))
+    return tree
+
+
+def remote_tree(session, remote_root, known):
+    """Same as local_tree for the device, using one stat listing plus batched md5sum."""
+    root = quote_command([remote_root])
+    result = session.submit(f"cd {root} 2>/dev/null || exit 42; find . -type f -exec stat -c '%s %Y %n' {{}} +").result()
+    if result.returncode == 42:
+        return None  # Folder does not exist
+    tree = {}
+    to_hash = []
+    for line in result.output.splitlines():
+        parts = line.split(" ", 2)
+        if len(parts) < 3 or not parts[0].isdigit() or not parts[2].startswith("./"):
+            continue
+        size, mtime, rel = int(parts[0]), int(parts[1]), parts[2][2:]
+        entry = known.get(rel)
+        if entry is not None and entry[0] == size and entry[1] == mtime:
+            tree[rel] = tuple(entry)
+        else:
+            tree[rel] = (size, mtime, None)
+            to_hash.append(rel)
+    batches = [to_hash[i:i + HASH_BATCH] for i in range(0, len(to_hash), HASH_BATCH)]
+    commands = [f"cd {root} && md5sum " + quote_command(["./" + rel for rel in batch]) for batch in batches]
+    for output, _ in session.run_many(commands):
+        for line in output.splitlines():
+            digest, _, path = line.partition("  ")
+            rel = path[2:] if path.startswith("./") else path
+            if rel in tree and len(digest) == 32:
+                size, mtime, _ = tree[rel]
+                tree[rel] = (size, mtime, digest)
+    return tree
+
+
+def plan(source, target):
+    """Files to copy (new or different hash) and files only present in target."""
+    copy = sorted(rel for rel, entry in source.items()
+                  if rel not in target or target[rel][2] is None or target[rel][2] != entry[2])
+    extra = sorted(rel for rel in target if rel not in source)
+    return copy, extra
+
+
+def is_protected(remote_root):
+    """True for device folders that sync_dir refuses to delete from."""
+    return posixpath.normpath("/" + remote_root.strip().lstrip("/")) in PROTECTED_REMOTE_ROOTS
+
+
+def _state_key(serial, remote_root):
+    return f"{serial or ''}:{remote_root.rstrip('/')}"
+
+
+def sync_dir(client, local_root, remote_root, direction, serial=None, delete=False,
+             progress=None, cancel_event=None):
+    """Sync local_root and remote_root in direction "push" (PC to device) or "pull".
+
+    Returns a dict with copied, deleted, unchanged, failed, bytes, errors and elapsed.
+    A cancel keeps the files copied so far; they are counted and remembered in the state.
+    """
+    if direction not in ("push", "pull"):
+        raise ValueError(f"Unknown sync direction: {direction}")
+    if delete and direction == "push" and is_protected(remote_root):
+        raise AdbError(f"Refusing to delete files under {remote_root}; pick a subfolder")
+    started = time.monotonic()
+    remote_root = remote_root.rstrip("/") or "/"
+    os.makedirs(local_root, exist_ok=True)
+    state = load_state(local_root)
+    key = _state_key(serial, remote_root)
+    known_local = state["local"]
+    known_remote = state["remote"].get(key, {})
+
+    local = local_tree(local_root, known_local)
+    with ShellSession.open(client, serial) as session:
+        remote = remote_tree(session, remote_root, known_remote)
+        if remote is None:
+            if direction == "pull":
+                raise AdbError(f"{remote_root}: no such directory on the device")
+            remote = {}
+        source, target = (local, remote) if direction == "push" else (remote, local)
+        copy, extra = plan(source, target)
+
+        errors = []
+        done = {}
+        transferred = 0
+        if copy and not (cancel_event is not None and cancel_event.is_set()):
+            if direction == "push":
+                pairs = [(os.path.join(local_root, *rel.split("/")), posixpath.join(remote_root, rel)) for rel in copy]
+            else:
+                pairs = [(posixpath.join(remote_root, rel), os.path.join(local_root, *rel.split("/"))) for rel in copy]
+                for _, local_path in pairs:
+                    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+
+            def on_progress(count, total, bytes_done):
+                if progress is not None:
+                    progress(count, total, bytes_done, time.monotonic() - started)
+                if cancel_event is not None and cancel_event.is_set():
+                    raise AdbError("Sync cancelled")
+
+            results = []
+            with SyncConnection(client, serial) as sync:
+                try:
+                    if direction == "push":
+                        sync.push_many(pairs, progress=on_progress, results=results)
+                    else:
+                        sync.pull_many(pairs, progress=on_progress, results=results)
+                except AdbError:
+                    if cancel_event is None or not cancel_event.is_set():
+                        raise
+            for (src, dst, error), rel in zip(results, copy):
+                if error is not None:
+                    errors.append((rel, error))
+                    continue
+                done[rel] = source[rel]
+                transferred += source[rel][0]
+            # Record what the other side now holds so the next run does not re-hash it
+            for rel, (size, mtime, digest) in done.items():
+                if direction == "push":
+                    local_mtime = os.stat(os.path.join(local_root, *rel.split("/"))).st_mtime
+                    remote[rel] = (size, int(local_mtime), digest)
+                else:
+                    local_path = os.path.join(local_root, *rel.split("/"))
+                    os.utime(local_path, (mtime, mtime))
+                    local[rel] = (size, os.stat(local_path).st_mtime_ns, digest)
+
+        deleted = 0
+        if delete and extra and not (cancel_event is not None and cancel_event.is_set()):
+            if direction == "push":
+                batches = [extra[i:i + DELETE_BATCH] for i in range(0, len(extra), DELETE_BATCH)]
+                commands = [f"cd {quote_command([remote_root])} && rm -f " + quote_command(["./" + rel for rel in batch])
+                            for batch in batches]
+                for batch, (output, code) in zip(batches, session.run_many(commands)):
+                    if code:
+                        errors.extend((rel, output.strip()) for rel in batch)
+                    else:
+                        deleted += len(batch)
+                        for rel in batch:
+                            remote.pop(rel, None)
+            else:
+                for rel in extra:
+                    try:
+                        os.remove(os.path.join(local_root, *rel.split("/")))
+                        local.pop(rel, None)
+                        deleted += 1
+                    except OSError as e:
+                        errors.append((rel, e))
+
+    with _state_lock:
+        # Re-read so parallel syncs of other devices keep their entries
+        state = load_state(local_root)
+        state["local"] = local
+        state["remote"][key] = remote
+        save_state(local_root, state)
+    return {
+        "copied": len(done),
+        "deleted": deleted,
+        "unchanged": len(source) - len(copy),
+        "failed": len(errors),
+        "bytes": transferred,
+        "errors": errors,
+        "elapsed": time.monotonic() - started,
+    }
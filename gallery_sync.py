@@ -0,0 +1,144 @@
+"""Incremental, parallel copy of a device folder (the camera roll by default).
+
+The remote folder is listed once with sync LIST (name, size, mtime for every file),
+compared with a JSON manifest kept next to the downloaded files, and only new or
+changed files are pulled by a small pool of workers, each with its own sync session.
+Files land as *.part and are renamed when complete, so an interrupted run resumes
+where it stopped.
+"""
+import json
+import os
+import queue
+import stat as stat_mod
+import threading
+import time
+
+from adb_sync import SyncConnection
+
+CAMERA_FOLDER = "/sdcard/DCIM/Camera/"
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+MANIFEST_NAME = ".adb_toolkit_manifest.json"
+CHUNK_SIZE = 32
+SAVE_INTERVAL = 2.0
+
+
+def load_manifest(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(path, manifest):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def is_current(entry, manifest, local_path):
+    """True when the local copy already matches the remote size and mtime."""
+    known = manifest.get(entry.name)
+    try:
+        local = os.stat(local_path)
+    except OSError:
+        return False
+    if known is not None:
+        return known == [entry.size, entry.mtime] and local.st_size == entry.size
+    # Finished before the manifest was last saved (e.g. the app was killed)
+    return local.st_size == entry.size and int(local.st_mtime) == entry.mtime
+
+
+def plan_sync(entries, manifest, save_folder, extensions=IMAGE_EXTENSIONS):
+    """Split a remote listing into (to_pull, up_to_date) lists of SyncEntry."""
+    to_pull, up_to_date = [], []
+    for entry in entries:
+        if not stat_mod.S_ISREG(entry.mode) or not entry.name.lower().endswith(extensions):
+            continue
+        if is_current(entry, manifest, os.path.join(save_folder, entry.name)):
+            up_to_date.append(entry)
+        else:
+            to_pull.append(entry)
+    return to_pull, up_to_date
+
+
+def sync_folder(client, save_folder, remote_folder=CAMERA_FOLDER, serial=None, workers=4,
+                extensions=IMAGE_EXTENSIONS, progress=None, cancel_event=None):
+    """Pull new or changed files from remote_folder into save_folder.
+
+    progress(done, total, bytes, elapsed) is called as files complete. Returns a dict
+    with pulled/skipped/failed counts, bytes and elapsed seconds.
+    """
+    os.makedirs(save_folder, exist_ok=True)
+    manifest_path = os.path.join(save_folder, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+    remote_folder = remote_folder.rstrip("/") + "/"
+
+    with SyncConnection(client, serial) as sync:
+        entries = sync.list(remote_folder)
+    to_pull, up_to_date = plan_sync(entries, manifest, save_folder, extensions)
+    for entry in up_to_date:
+        manifest[entry.name] = [entry.size, entry.mtime]
+
+    jobs = queue.Queue()
+    for i in range(0, len(to_pull), CHUNK_SIZE):
+        jobs.put(to_pull[i:i + CHUNK_SIZE])
+
+    lock = threading.Lock()
+    stats = {"pulled": 0, "failed": 0, "bytes": 0, "errors": []}
+    started = time.monotonic()
+    last_save = [started]
+
+    def record(entry, local_path, error):
+        with lock:
+            if error is None:
+                os.replace(local_path + ".part", local_path)
+                os.utime(local_path, (entry.mtime, entry.mtime))
+                manifest[entry.name] = [entry.size, entry.mtime]
+                stats["pulled"] += 1
+                stats["bytes"] += entry.size
+            else:
+                stats["failed"] += 1
+                stats["errors"].append((entry.name, error))
+            now = time.monotonic()
+            if now - last_save[0] >= SAVE_INTERVAL:
+                save_manifest(manifest_path, manifest)
+                last_save[0] = now
+            if progress:
+                progress(stats["pulled"] + stats["failed"], len(to_pull), stats["bytes"], now - started)
+
+    def worker():
+        sync = None
+        try:
+            while not (cancel_event and cancel_event.is_set()):
+                try:
+                    chunk = jobs.get_nowait()
+                except queue.Empty:
+                    return
+                if sync is None:
+                    sync = SyncConnection(client, serial)
+                by_remote = {remote_folder + entry.name: entry for entry in chunk}
+                pairs = [(remote, os.path.join(save_folder, entry.name) + ".part")
+                         for remote, entry in by_remote.items()]
+                for remote, part_path, error in sync.pull_many(pairs):
+                    record(by_remote[remote], part_path[:-len(".part")], error)
+        except Exception as e:
+            with lock:
+                stats["errors"].append(("worker", e))
+        finally:
+            if sync is not None:
+                sync.close()
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, min(workers, jobs.qsize())))]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        save_manifest(manifest_path, manifest)
+
+    stats["skipped"] = len(up_to_date)
+    stats["elapsed"] = time.monotonic() - started
+    return stats
@@ -72,6 +72,18 @@ texts = {
         'stream_rear_camera': 'Stream Rear Camera',
         'stream_front_camera': 'Stream Front Camera',
         'camera': 'Camera',
+        'live_screen_preview': 'Live Screen Preview',
+        'running_tasks': 'Running Tasks',
+        'select_devices': 'Select Devices',
+        'sync_folder_to_device': 'Sync Folder to Device',
+        'sync_folder_from_device': 'Sync Folder from Device',
+        'push_folder_tar': 'Send Folder as Tar Stream',
+        'pull_folder_tar': 'Get Folder as Tar Stream',
+        'pull_large_file': 'Pull Large File (Resumable)',
+        'battery_telemetry': 'Battery Telemetry',
+        'apply_permission_matrix': 'Apply Permission Matrix',
+        'save_settings_snapshot': 'Save Settings Snapshot',
+        'apply_settings_profile': 'Apply Settings Profile',
     },
     'ru': {
         'title': 'ADB Инструментарий',
@@ -144,5 +156,17 @@ texts = {
         'stream_rear_camera': 'Потоковая передача данных с задней камеры',
         'stream_front_camera': 'Потоковая передняя камера',
         'camera': 'Камера',
+        'live_screen_preview': 'Живой просмотр экрана',
+        'running_tasks': 'Выполняемые задачи',
+        'select_devices': 'Выбрать устройства',
+        'sync_folder_to_device': 'Синхронизировать папку на устройство',
+        'sync_folder_from_device': 'Синхронизировать папку с устройства',
+        'push_folder_tar': 'Отправить папку tar-потоком',
+        'pull_folder_tar': 'Получить папку tar-потоком',
+        'pull_large_file': 'Получить большой файл (с докачкой)',
+        'battery_telemetry': 'Телеметрия батареи',
+        'apply_permission_matrix': 'Применить матрицу разрешений',
+        'save_settings_snapshot': 'Сохранить снимок настроек',
+        'apply_settings_profile': 'Применить профиль настроек',
     }
 } 
\ No newline at end of file
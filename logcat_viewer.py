@@ -0,0 +1,346 @@
+"""Streaming logcat window with a bounded buffer and live filters.
+
+A reader thread decodes logcat into compact slotted records and hands them over in
+batches. By default it reads the binary logger_entry stream (`logcat -B`), so pid, tid,
+priority, tag and timestamp come straight out of a fixed header instead of a regex;
+`logcat -v threadtime` text parsing is kept as a fallback. The window drains each batch
+on a Tk timer, stores entries in a fixed-size ring buffer, and appends only the lines
+matching the current filter. Changing a filter re-scans the ring buffer, which is
+bounded, so memory and redraw cost stay flat no matter how long logcat runs.
+"""
+import collections
+import csv
+import re
+import struct
+import threading
+import time as time_mod
+import tkinter as tk
+import tkinter.ttk as ttk
+from tkinter import filedialog
+
+PRIORITIES = "??VDIWEF"
+PRIORITY_LEVELS = {letter: level for level, letter in enumerate(PRIORITIES) if letter != "?"}
+
+# 01-31 12:34:56.789  1234  1250 I ActivityManager: message
+_THREADTIME = re.compile(r"^(\d\d-\d\d \d\d:\d\d:\d\d\.\d+)\s+(\d+)\s+(\d+)\s+([VDIWEF])\s+(.*?)\s*: (.*)$")
+
+
+class LogEntry:
+    __slots__ = ("time", "pid", "tid", "priority", "tag", "message")
+
+    def __init__(self, time, pid, tid, priority, tag, message):
+        self.time = time
+        self.pid = pid
+        self.tid = tid
+        self.priority = priority
+        self.tag = tag
+        self.message = message
+
+    def format(self):
+        return format_entry(self)
+
+
+class BinaryLogEntry:
+    """Entry decoded from logcat -B; the display time is only formatted when needed."""
+    __slots__ = ("sec", "nsec", "pid", "tid", "uid", "log_id", "priority", "tag", "message")
+
+    def __init__(self, sec, nsec, pid, tid, uid, log_id, priority, tag, message):
+        self.sec = sec
+        self.nsec = nsec
+        self.pid = pid
+        self.tid = tid
+        self.uid = uid
+        self.log_id = log_id
+        self.priority = priority
+        self.tag = tag
+        self.message = message
+
+    @property
+    def time(self):
+        return time_mod.strftime("%m-%d %H:%M:%S", time_mod.localtime(self.sec)) + f".{self.nsec // 1000000:03d}"
+
+    def format(self):
+        return format_entry(self)
+
+
+def format_entry(entry):
+    # One header per message line, the same way logcat prints multi-line messages
+    header = f"{entry.time} {entry.pid:5d} {entry.tid:5d} {PRIORITIES[entry.priority]} {entry.tag}: "
+    return "\n".join(header + line for line in entry.message.split("\n"))
+
+
+def parse_threadtime_line(line):
+    match = _THREADTIME.match(line)
+    if match is None:
+        # Continuation lines and "--------- beginning of main" banners
+        return None
+    time, pid, tid, priority, tag, message = match.groups()
+    return LogEntry(time, int(pid), int(tid), PRIORITY_LEVELS[priority], tag, message)
+
+
+class TextLogParser:
+    def __init__(self):
+        self.tail = b""
+
+    def feed(self, chunk):
+        lines = (self.tail + chunk).split(b"\n")
+        self.tail = lines.pop()
+        entries = []
+        for raw in lines:
+            entry = parse_threadtime_line(raw.decode("utf-8", "replace").rstrip("\r"))
+            if entry is not None:
+                entries.append(entry)
+        return entries
+
+
+# struct logger_entry: len, hdr_size, pid, tid, sec, nsec; v2 adds euid and v3 lid in the
+# same 4 bytes, v4 has lid and uid
+_LOGGER_ENTRY = struct.Struct("<HHiIII")
+_LOGGER_ENTRY_EXTRA = struct.Struct("<II")
+
+
+class BinaryLogParser:
+    """Incremental decoder for the logger_entry records written by `logcat -B`."""
+
+    def __init__(self):
+        self.buf = bytearray()
+
+    def feed(self, chunk):
+        self.buf += chunk
+        buf = self.buf
+        entries = []
+        offset = 0
+        while len(buf) - offset >= _LOGGER_ENTRY.size:
+            payload_len, hdr_size, pid, tid, sec, nsec = _LOGGER_ENTRY.unpack_from(buf, offset)
+            # v1 headers have no hdr_size field (it was padding and reads as 0)
+            hdr_size = hdr_size or _LOGGER_ENTRY.size
+            end = offset + hdr_size + payload_len
+            if end > len(buf):
+                break
+            # 0 means unknown: v1 has neither field, and a 24-byte header may be v2 (euid)
+            # or v3 (lid) with nothing to tell them apart
+            log_id = uid = 0
+            if hdr_size >= _LOGGER_ENTRY.size + _LOGGER_ENTRY_EXTRA.size:
+                log_id, uid = _LOGGER_ENTRY_EXTRA.unpack_from(buf, offset + _LOGGER_ENTRY.size)
+            payload = bytes(buf[offset + hdr_size:end])
+            offset = end
+            if not payload:
+                continue
+            tag_end = payload.find(b"\0", 1)
+            if tag_end < 0:
+                tag_end = len(payload)
+            message = payload[tag_end + 1:].rstrip(b"\0").rstrip(b"\n")
+            priority = payload[0] if 2 <= payload[0] <= 7 else 2
+            entries.append(BinaryLogEntry(sec, nsec, pid, tid, uid, log_id, priority,
+                                          payload[1:tag_end].decode("utf-8", "replace"),
+                                          message.decode("utf-8", "replace")))
+        del buf[:offset]
+        return entries
+
+
+def export_csv(entries, path):
+    """Write entries field by field (not re-parsed text) to a CSV file."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["time", "pid", "tid", "priority", "tag", "message"])
+        for entry in entries:
+            writer.writerow([entry.time, entry.pid, entry.tid, PRIORITIES[entry.priority], entry.tag, entry.message])
+
+
+class LogFilter:
+    def __init__(self, tag="", min_priority=2, pid=None, pattern=""):
+        self.tag = tag.lower()
+        self.min_priority = min_priority
+        self.pid = pid
+        self.regex = re.compile(pattern) if pattern else None
+
+    def matches(self, entry):
+        if entry.priority < self.min_priority:
+            return False
+        if self.pid is not None and entry.pid != self.pid:
+            return False
+        if self.tag and self.tag not in entry.tag.lower():
+            return False
+        if self.regex is not None and not self.regex.search(entry.message):
+            return False
+        return True
+
+
+class LogcatReader:
+    """Background thread reading logcat from the device and queueing parsed entries."""
+
+    def __init__(self, client, serial=None, binary=True):
+        self.client = client
+        self.serial = serial
+        self.binary = binary
+        self.error = None
+        self.received = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._conn = None
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._conn is not None:
+            self._conn.close()
+
+    def drain(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        return batch
+
+    def _run(self):
+        try:
+            if self.binary:
+                service, parser = "exec:logcat -B", BinaryLogParser()
+            else:
+                service, parser = "exec:logcat -v threadtime", TextLogParser()
+            self._conn = self.client.open_service(service, self.serial)
+            for chunk in self._conn.iter_chunks():
+                if self._stop.is_set():
+                    break
+                entries = parser.feed(chunk)
+                with self._lock:
+                    self._pending.extend(entries)
+                    self.received += len(entries)
+        except Exception as e:
+            if not self._stop.is_set():
+                self.error = e
+
+
+class LogcatWindow:
+    """Toplevel logcat viewer; entries beyond `capacity` fall off the front of the buffer."""
+
+    def __init__(self, parent, client, serial=None, capacity=50000, display_limit=5000, refresh_ms=100, binary=True):
+        self.client = client
+        self.serial = serial
+        self.binary = binary
+        self.buffer = collections.deque(maxlen=capacity)
+        self.display_limit = display_limit
+        self.refresh_ms = refresh_ms
+        self.filter = LogFilter()
+        self.displayed = 0
+        self.paused = tk.BooleanVar(value=False)
+
+        self.window = tk.Toplevel(parent)
+        self.window.title("Logcat")
+        self.window.geometry("1000x600")
+        self.window.configure(bg="#282c34")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        controls = tk.Frame(self.window, bg="#282c34")
+        controls.pack(side=tk.TOP, fill=tk.X, padx=10, pady=5)
+        self.tag_var = tk.StringVar()
+        self.pid_var = tk.StringVar()
+        self.regex_var = tk.StringVar()
+        self.priority_var = tk.StringVar(value="V")
+        for label, var, width in (("Tag:", self.tag_var, 16), ("PID:", self.pid_var, 8), ("Regex:", self.regex_var, 30)):
+            tk.Label(controls, text=label, bg="#282c34", fg="white").pack(side=tk.LEFT)
+            entry = tk.Entry(controls, textvariable=var, width=width)
+            entry.pack(side=tk.LEFT, padx=(0, 10))
+            entry.bind("<KeyRelease>", lambda _event: self.apply_filter())
+        tk.Label(controls, text="Level:", bg="#282c34", fg="white").pack(side=tk.LEFT)
+        priority_box = ttk.Combobox(controls, textvariable=self.priority_var, values=list("VDIWEF"), width=3, state="readonly")
+        priority_box.pack(side=tk.LEFT, padx=(0, 10))
+        priority_box.bind("<<ComboboxSelected>>", lambda _event: self.apply_filter())
+        tk.Checkbutton(controls, text="Pause", variable=self.paused, bg="#282c34", fg="white",
+                       selectcolor="#1e1e1e", command=self.on_pause_toggle).pack(side=tk.LEFT)
+        tk.Button(controls, text="Clear", command=self.clear).pack(side=tk.LEFT, padx=5)
+        tk.Button(controls, text="Export CSV", command=self.export).pack(side=tk.LEFT, padx=5)
+        self.status = tk.Label(controls, bg="#282c34", fg="gray")
+        self.status.pack(side=tk.RIGHT)
+
+        self.text = tk.Text(self.window, wrap="none", bg="#1e1e1e", fg="white",
+                            font=("Consolas", 9), state="disabled")
+        scrollbar = tk.Scrollbar(self.window, command=self.text.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.text.config(yscrollcommand=scrollbar.set)
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        self.reader = self.start_reader()
+        self.window.after(self.refresh_ms, self.refresh)
+
+    def start_reader(self):
+        return LogcatReader(self.client, self.serial, self.binary).start()
+
+    def read_filter(self):
+        pid = self.pid_var.get().strip()
+        try:
+            new_filter = LogFilter(self.tag_var.get().strip(), PRIORITY_LEVELS[self.priority_var.get()],
+                                   int(pid) if pid else None, self.regex_var.get())
+        except (ValueError, re.error):
+            # Half-typed regex or PID: keep the previous filter until it parses
+            return None
+        return new_filter
+
+    def apply_filter(self):
+        new_filter = self.read_filter()
+        if new_filter is None:
+            return
+        self.filter = new_filter
+        matched = [entry for entry in self.buffer if new_filter.matches(entry)]
+        self.text.config(state="normal")
+        self.text.delete("1.0", tk.END)
+        self.displayed = 0
+        self._append(matched)
+
+    def _append(self, entries):
+        entries = entries[-self.display_limit:]
+        if not entries:
+            self.text.config(state="disabled")
+            return
+        self.text.config(state="normal")
+        at_bottom = self.text.yview()[1] >= 0.999
+        chunk = "\n".join(entry.format() for entry in entries) + "\n"
+        self.text.insert(tk.END, chunk)
+        self.displayed += chunk.count("\n")
+        overflow = self.displayed - self.display_limit
+        if overflow > 0:
+            self.text.delete("1.0", f"{overflow + 1}.0")
+            self.displayed -= overflow
+        self.text.config(state="disabled")
+        if at_bottom:
+            self.text.see(tk.END)
+
+    def refresh(self):
+        if not self.window.winfo_exists():
+            return
+        batch = self.reader.drain()
+        if batch:
+            self.buffer.extend(batch)
+            if not self.paused.get():
+                self._append([entry for entry in batch if self.filter.matches(entry)])
+        status = f"{len(self.buffer)} buffered / {self.reader.received} received"
+        if self.reader.error is not None:
+            status += f" | {self.reader.error}"
+        self.status.config(text=status)
+        self.window.after(self.refresh_ms, self.refresh)
+
+    def on_pause_toggle(self):
+        if not self.paused.get():
+            # Catch up on everything that arrived while paused
+            self.apply_filter()
+
+    def clear(self):
+        self.buffer.clear()
+        self.text.config(state="normal")
+        self.text.delete("1.0", tk.END)
+        self.text.config(state="disabled")
+        self.displayed = 0
+
+    def export(self):
+        path = filedialog.asksaveasfilename(parent=self.window, defaultextension=".csv",
+                                            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if path:
+            export_csv([entry for entry in self.buffer if self.filter.matches(entry)], path)
+
+    def close(self):
+        self.reader.stop()
+        self.window.destroy()
@@ -0,0 +1,179 @@
+"""Virtualized, non-modal viewer for large command output.
+
+The text is indexed once into an array of line start offsets. The Text widget only ever
+holds the lines that fit on screen; scrolling re-renders that slice from the index, so
+opening a multi-megabyte dumpsys costs the same as a short one.
+"""
+import bisect
+import re
+import tkinter as tk
+from array import array
+
+
+class LineIndex:
+    def __init__(self, content):
+        self.content = content
+        starts = array("q", [0])
+        find = content.find
+        pos = find("\n")
+        while pos >= 0:
+            starts.append(pos + 1)
+            pos = find("\n", pos + 1)
+        # A trailing newline does not start another line
+        if len(starts) > 1 and starts[-1] == len(content):
+            starts.pop()
+        self.starts = starts
+
+    def __len__(self):
+        return len(self.starts)
+
+    def line(self, number):
+        start = self.starts[number]
+        if number + 1 < len(self.starts):
+            end = self.starts[number + 1] - 1
+        else:
+            end = len(self.content) - 1 if self.content.endswith("\n") else len(self.content)
+        # CRLF text (pulled files, exec-out) would otherwise show a stray \r per line
+        if end > start and self.content[end - 1] == "\r":
+            end -= 1
+        return self.content[start:end]
+
+    def lines(self, first, count):
+        return [self.line(n) for n in range(first, min(first + count, len(self.starts)))]
+
+    def line_of(self, offset):
+        return bisect.bisect_right(self.starts, offset) - 1
+
+
+class OutputViewer:
+    def __init__(self, parent, title, content):
+        self.index = LineIndex(content)
+        self.first = 0
+        self.match = None  # (offset, length) of the current search hit
+
+        self.window = tk.Toplevel(parent)
+        self.window.title(title)
+        self.window.geometry("700x500")
+        self.window.configure(bg="#282c34")
+
+        search_bar = tk.Frame(self.window, bg="#282c34")
+        search_bar.pack(side=tk.TOP, fill=tk.X, padx=10, pady=(10, 0))
+        tk.Label(search_bar, text="Search:", bg="#282c34", fg="white").pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        search_entry = tk.Entry(search_bar, textvariable=self.search_var)
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        search_entry.bind("<KeyRelease>", self.on_search_key)
+        self.regex_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(search_bar, text="Regex", variable=self.regex_var, bg="#282c34", fg="white",
+                       selectcolor="#1e1e1e").pack(side=tk.LEFT)
+        tk.Button(search_bar, text="<", command=lambda: self.search(backwards=True)).pack(side=tk.LEFT)
+        tk.Button(search_bar, text=">", command=lambda: self.search(from_next=True)).pack(side=tk.LEFT)
+        self.status = tk.Label(search_bar, bg="#282c34", fg="gray", text=f"{len(self.index)} lines")
+        self.status.pack(side=tk.LEFT, padx=5)
+
+        body = tk.Frame(self.window, bg="#282c34")
+        body.pack(side=tk.TOP, fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.scrollbar = tk.Scrollbar(body, command=self.on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        xscrollbar = tk.Scrollbar(body, orient=tk.HORIZONTAL)
+        xscrollbar.pack(side=tk.BOTTOM, fill=tk.X)
+        self.text = tk.Text(body, wrap="none", bg="#1e1e1e", fg="white", insertbackground="white",
+                            font=("Consolas", 10), state="disabled", xscrollcommand=xscrollbar.set)
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        xscrollbar.config(command=self.text.xview)
+        self.text.tag_configure("match", background="#e5c07b", foreground="black")
+
+        self.text.bind("<Configure>", lambda _event: self.render())
+        for widget in (self.text, self.window):
+            widget.bind("<MouseWheel>", self.on_wheel)
+            widget.bind("<Button-4>", lambda _event: self.scroll_to(self.first - 3))
+            widget.bind("<Button-5>", lambda _event: self.scroll_to(self.first + 3))
+        self.text.bind("<Prior>", lambda _event: self.scroll_to(self.first - self.visible_lines()))
+        self.text.bind("<Next>", lambda _event: self.scroll_to(self.first + self.visible_lines()))
+        self.text.bind("<Home>", lambda _event: self.scroll_to(0))
+        self.text.bind("<End>", lambda _event: self.scroll_to(len(self.index)))
+        self.render()
+
+    def visible_lines(self):
+        line_height = max(1, self.text.tk.call("font", "metrics", self.text.cget("font"), "-linespace"))
+        return max(1, self.text.winfo_height() // line_height)
+
+    def scroll_to(self, first):
+        last_first = max(0, len(self.index) - self.visible_lines())
+        self.first = max(0, min(int(first), last_first))
+        self.render()
+        return "break"
+
+    def on_wheel(self, event):
+        return self.scroll_to(self.first - event.delta // 40)
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(float(amount) * len(self.index))
+        elif action == "scroll":
+            step = self.visible_lines() if unit == "pages" else 1
+            self.scroll_to(self.first + int(amount) * step)
+
+    def render(self):
+        count = self.visible_lines()
+        lines = self.index.lines(self.first, count)
+        self.text.config(state="normal")
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", "\n".join(lines))
+        if self.match is not None:
+            offset, length = self.match
+            line = self.index.line_of(offset)
+            if self.first <= line < self.first + count:
+                column = offset - self.index.starts[line]
+                start = f"{line - self.first + 1}.{column}"
+                self.text.tag_add("match", start, f"{start}+{length}c")
+        self.text.config(state="disabled")
+        total = max(1, len(self.index))
+        self.scrollbar.set(self.first / total, min(1.0, (self.first + count) / total))
+
+    def on_search_key(self, event):
+        if event.keysym == "Return":
+            self.search(backwards=bool(event.state & 0x1), from_next=True)
+        elif event.keysym not in ("Shift_L", "Shift_R", "Control_L", "Control_R"):
+            # Typing refines the current hit instead of jumping past it
+            self.search()
+
+    def search(self, backwards=False, from_next=False):
+        query = self.search_var.get()
+        if not query:
+            self.match = None
+            self.status.config(text=f"{len(self.index)} lines")
+            self.render()
+            return
+        content = self.index.content
+        start = self.index.starts[self.first] if self.match is None else self.match[0]
+        try:
+            if self.regex_var.get():
+                pattern = re.compile(query)
+            else:
+                pattern = re.compile(re.escape(query), re.IGNORECASE)
+        except re.error:
+            return
+        if backwards:
+            found = None
+            for found in pattern.finditer(content, 0, start):
+                pass
+            if found is None:
+                for found in pattern.finditer(content, start):
+                    pass
+        else:
+            found = pattern.search(content, start + 1 if from_next and self.match else start)
+            if found is None:
+                found = pattern.search(content, 0)
+        if found is None or found.end() == found.start():
+            self.match = None
+            self.status.config(text="Not found")
+            self.render()
+            return
+        self.match = (found.start(), found.end() - found.start())
+        line = self.index.line_of(found.start())
+        self.status.config(text=f"Line {line + 1} of {len(self.index)}")
+        count = self.visible_lines()
+        if not self.first <= line < self.first + count:
+            self.first = max(0, line - count // 3)
+        self.render()
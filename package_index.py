@@ -0,0 +1,346 @@
+"""In-memory catalog of installed packages with prefix and fuzzy search.
+
+The catalog is built from one shell round trip that lists every package with its APK
+path, UID and version code, plus the disabled and system subsets. Devices whose pm is
+too old for the UID and version code flags are listed without them. After that all lookups
+and autocomplete are answered from memory. Refreshes are applied as a diff against the
+existing entries, and the toolkit's own install/uninstall actions update single packages
+without listing everything again.
+"""
+import bisect
+import collections
+import threading
+import time
+import tkinter as tk
+
+from adb_client import quote_command
+
+PackageInfo = collections.namedtuple("PackageInfo", "name path uid version_code enabled system")
+
+_SECTION = "--adb-toolkit-section--"
+# pm only knows --show-versioncode from API 28 and -U from API 26; older devices get the
+# next entry, leaving uid and version code unknown
+_LIST_FLAGS = ("-f -U --show-versioncode", "-f -U", "-f")
+
+
+def list_command(flags=_LIST_FLAGS[0], pattern=""):
+    """Packages with details, then the disabled and system subsets, separated by _SECTION."""
+    suffix = f" {pattern}" if pattern else ""
+    # pm reports an unknown option on stderr, which AdbClient.shell drops on shell v2
+    return (f"pm list packages {flags}{suffix} 2>&1; echo {_SECTION}; "
+            f"pm list packages -d{suffix}; echo {_SECTION}; pm list packages -s{suffix}")
+
+
+def unknown_option(text):
+    """True if pm rejected a flag of the first listing ("Error: Unknown option: -U")."""
+    return "Unknown option" in text.split(_SECTION, 1)[0]
+
+
+def parse_package_line(line):
+    """Parse "package:/path/base.apk=name versionCode:N uid:U" into (name, path, uid, version_code)."""
+    if not line.startswith("package:"):
+        return None
+    fields = line[len("package:"):].split()
+    if not fields:
+        return None
+    path, sep, name = fields[0].rpartition("=")
+    if not sep:
+        path, name = "", fields[0]
+    extra = dict(field.partition(":")[::2] for field in fields[1:])
+    try:
+        uid = int(extra.get("uid", "").split(",")[0])
+    except ValueError:
+        uid = None
+    try:
+        version_code = int(extra.get("versionCode", ""))
+    except ValueError:
+        version_code = None
+    return name, path, uid, version_code
+
+
+def parse_package_names(text):
+    return {line[len("package:"):].strip() for line in text.splitlines() if line.startswith("package:")}
+
+
+def parse_package_list(text):
+    """Parse the output of list_command() into {name: PackageInfo}."""
+    sections = text.split(_SECTION)
+    sections += [""] * (3 - len(sections))
+    disabled = parse_package_names(sections[1])
+    system = parse_package_names(sections[2])
+    packages = {}
+    for line in sections[0].splitlines():
+        parsed = parse_package_line(line.strip())
+        if parsed is not None:
+            name = parsed[0]
+            packages[name] = PackageInfo(*parsed, name not in disabled, name in system)
+    return packages
+
+
+def fuzzy_score(query, name):
+    """Score a subsequence match of query in name; None if the letters are not all present in order.
+
+    Consecutive letters and letters right after a '.' or '_' score higher, so "chrm" ranks
+    com.android.chrome above names that only scatter the same letters.
+    """
+    score = 0
+    position = 0
+    previous = -2
+    for char in query:
+        found = name.find(char, position)
+        if found < 0:
+            return None
+        if found == previous + 1:
+            score += 3
+        elif found == 0 or name[found - 1] in "._":
+            score += 2
+        else:
+            score += 1
+        previous = found
+        position = found + 1
+    # Prefer shorter names when the match quality is equal
+    return score - len(name) / 1000.0
+
+
+class PackageIndex:
+    def __init__(self, client, serial=None):
+        self.client = client
+        self.serial = serial
+        self.packages = {}
+        self.loaded = None
+        self.stale = True
+        self._names = []
+        self._segments = []  # (last name segment, full name), sorted
+        self._flags = 0  # index into _LIST_FLAGS of what this device's pm accepts
+        self._lock = threading.RLock()
+
+    def _list(self, pattern=""):
+        while True:
+            output = self.client.shell(list_command(_LIST_FLAGS[self._flags], pattern), serial=self.serial)
+            if self._flags == len(_LIST_FLAGS) - 1 or not unknown_option(output):
+                return output
+            self._flags += 1
+
+    def _reindex(self):
+        self._names = sorted(self.packages)
+        self._segments = sorted((name.rsplit(".", 1)[-1], name) for name in self._names)
+
+    def refresh(self):
+        """Re-list the device and apply the difference; returns (added, removed, changed) names."""
+        current = parse_package_list(self._list())
+        with self._lock:
+            added = [name for name in current if name not in self.packages]
+            removed = [name for name in self.packages if name not in current]
+            changed = [name for name, info in current.items()
+                       if name in self.packages and self.packages[name] != info]
+            self.packages = current
+            if added or removed:
+                self._reindex()
+            self.loaded = time.monotonic()
+            self.stale = False
+        return added, removed, changed
+
+    def ensure_loaded(self):
+        if self.stale:
+            self.refresh()
+        return self
+
+    def refresh_package(self, name):
+        """Re-query one package (after installing or changing it) without listing the rest."""
+        # pm filters by substring, so keep only the exact package
+        info = parse_package_list(self._list(quote_command([name]))).get(name)
+        with self._lock:
+            if info is None:
+                self._remove(name)
+            else:
+                is_new = name not in self.packages
+                self.packages[name] = info
+                if is_new:
+                    self._reindex()
+        return info
+
+    def _remove(self, name):
+        if self.packages.pop(name, None) is not None:
+            self._reindex()
+
+    def remove(self, name):
+        with self._lock:
+            self._remove(name)
+
+    def mark_stale(self):
+        self.stale = True
+
+    # --- Lookups (memory only) ---
+
+    def get(self, name):
+        return self.packages.get(name)
+
+    def __contains__(self, name):
+        return name in self.packages
+
+    def __len__(self):
+        return len(self.packages)
+
+    def prefix(self, prefix, limit=None):
+        with self._lock:
+            names = self._names
+            start = bisect.bisect_left(names, prefix)
+            result = []
+            for name in names[start:]:
+                if not name.startswith(prefix) or (limit is not None and len(result) >= limit):
+                    break
+                result.append(name)
+            return result
+
+    def search(self, query, limit=20):
+        """Best matches for query: full-name prefixes, then last-segment prefixes
+        (e.g. "chro" finds com.android.chrome), substrings, then fuzzy subsequences."""
+        query = query.strip().lower()
+        with self._lock:
+            names = self._names
+            segments = self._segments
+        if not query:
+            return names[:limit]
+        results = []
+        seen = set()
+
+        def add(name):
+            if name not in seen and len(results) < limit:
+                seen.add(name)
+                results.append(name)
+
+        for name in self.prefix(query, limit):
+            add(name)
+        start = bisect.bisect_left(segments, (query, ""))
+        for segment, name in segments[start:]:
+            if not segment.startswith(query) or len(results) >= limit:
+                break
+            add(name)
+        if len(results) < limit:
+            for name in names:
+                if query in name.lower():
+                    add(name)
+        if len(results) < limit:
+            scored = []
+            for name in names:
+                if name not in seen:
+                    score = fuzzy_score(query, name.lower())
+                    if score is not None:
+                        scored.append((-score, name))
+            for _, name in sorted(scored):
+                add(name)
+        return results
+
+    def format(self):
+        lines = []
+        for name in self._names:
+            info = self.packages[name]
+            flags = ("system" if info.system else "user") + ("" if info.enabled else ", disabled")
+            lines.append(f"{name}  v{info.version_code if info.version_code is not None else '?'}"
+                         f"  uid {info.uid if info.uid is not None else '?'}  [{flags}]  {info.path}")
+        return "\n".join(lines)
+
+
+class PackageCatalog:
+    """One PackageIndex per device serial."""
+
+    def __init__(self, client):
+        self.client = client
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def index(self, serial=None):
+        with self._lock:
+            index = self._indexes.get(serial)
+            if index is None:
+                index = self._indexes[serial] = PackageIndex(self.client, serial)
+            return index
+
+    def get(self, serial=None):
+        """Loaded index for the device; lists packages only on first use or when stale."""
+        return self.index(serial).ensure_loaded()
+
+    def peek(self, serial=None):
+        """Index if it has been loaded, without touching the device."""
+        with self._lock:
+            index = self._indexes.get(serial)
+        return index if index is not None and index.loaded is not None else None
+
+    def mark_stale(self, serial=None):
+        self.index(serial).mark_stale()
+
+    def discard(self, serial=None):
+        with self._lock:
+            self._indexes.pop(serial, None)
+
+
+class PackageDialog:
+    """Modal prompt for a package name with live suggestions from search(query)."""
+
+    def __init__(self, parent, title, prompt, search, initialvalue=""):
+        self.search = search
+        self.result = None
+        self.window = tk.Toplevel(parent)
+        self.window.title(title)
+        self.window.geometry("450x350")
+        self.window.configure(bg="#282c34")
+        self.window.transient(parent)
+
+        tk.Label(self.window, text=prompt, bg="#282c34", fg="white").pack(anchor="w", padx=10, pady=(10, 0))
+        self.var = tk.StringVar(value=initialvalue)
+        self.entry = tk.Entry(self.window, textvariable=self.var)
+        self.entry.pack(fill=tk.X, padx=10, pady=5)
+        self.listbox = tk.Listbox(self.window, bg="#1e1e1e", fg="white", selectbackground="#61afef",
+                                  font=("Consolas", 10), exportselection=False)
+        self.listbox.pack(fill=tk.BOTH, expand=True, padx=10)
+        buttons = tk.Frame(self.window, bg="#282c34")
+        buttons.pack(pady=10)
+        tk.Button(buttons, text="OK", width=10, command=self.ok).pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons, text="Cancel", width=10, command=self.window.destroy).pack(side=tk.LEFT, padx=5)
+
+        self.entry.bind("<KeyRelease>", self.on_key)
+        self.entry.bind("<Return>", lambda _event: self.ok())
+        self.entry.bind("<Down>", lambda _event: self.move(1))
+        self.entry.bind("<Up>", lambda _event: self.move(-1))
+        self.listbox.bind("<Double-Button-1>", lambda _event: self.ok())
+        self.window.bind("<Escape>", lambda _event: self.window.destroy())
+        self.update_suggestions()
+        # The package list may still be loading; pick it up once it arrives
+        self.window.after(300, self.poll)
+        self.entry.focus_set()
+
+    def on_key(self, event):
+        if event.keysym not in ("Up", "Down", "Return"):
+            self.update_suggestions()
+
+    def poll(self):
+        if self.window.winfo_exists():
+            if self.listbox.size() == 0:
+                self.update_suggestions()
+            self.window.after(300, self.poll)
+
+    def update_suggestions(self):
+        self.listbox.delete(0, tk.END)
+        for name in self.search(self.var.get()):
+            self.listbox.insert(tk.END, name)
+
+    def move(self, step):
+        if self.listbox.size() == 0:
+            return "break"
+        current = self.listbox.curselection()
+        position = (current[0] + step) if current else (0 if step > 0 else self.listbox.size() - 1)
+        position = max(0, min(position, self.listbox.size() - 1))
+        self.listbox.selection_clear(0, tk.END)
+        self.listbox.selection_set(position)
+        self.listbox.see(position)
+        return "break"
+
+    def ok(self):
+        selection = self.listbox.curselection()
+        self.result = self.listbox.get(selection[0]) if selection else self.var.get().strip()
+        self.window.destroy()
+
+    def show(self):
+        self.window.grab_set()
+        self.window.wait_window()
+        return self.result or None
@@ -0,0 +1,254 @@
+"""Live process table with CPU% and memory deltas computed on the host.
+
+Each tick is one command on a persistent device shell: the aggregate line of /proc/stat
+followed by every /proc/<pid>/stat, all read by a single `cat`. The device does no
+arithmetic and starts no process per pid, so sampling at 1 Hz costs it almost nothing.
+The host parses the sample into column arrays, then computes CPU% and RSS changes
+against the previous sample in one pass. Only the previous sample and each process's
+first RSS are kept, so an hour-long session uses as much memory as the first minute.
+The window updates only the table rows whose values changed.
+"""
+import array
+import collections
+import threading
+import time
+import tkinter as tk
+import tkinter.ttk as ttk
+
+from adb_client import AdbError
+from shell_session import ShellSession
+
+ProcessSample = collections.namedtuple("ProcessSample", "pid name state cpu rss rss_delta rss_growth")
+
+_SAMPLE_COMMAND = "head -n 1 /proc/stat; cat /proc/[0-9]*/stat 2>/dev/null"
+_SETUP_COMMAND = "grep -c '^cpu[0-9]' /proc/stat; getconf PAGESIZE 2>/dev/null || echo 4096"
+
+# Field positions after the ")" that closes the command name in /proc/<pid>/stat
+_STATE, _UTIME, _STIME, _STARTTIME, _RSS = 0, 11, 12, 19, 21
+
+
+class Columns:
+    """One parsed sample: parallel arrays indexed by row, plus the names."""
+
+    def __init__(self):
+        self.pid = array.array("q")
+        self.ticks = array.array("q")
+        self.start = array.array("q")
+        self.rss = array.array("q")
+        self.name = []
+        self.state = []
+
+
+def parse_sample(text):
+    """Parse _SAMPLE_COMMAND output into (total CPU jiffies, Columns)."""
+    total = 0
+    columns = Columns()
+    for line in text.splitlines():
+        if line.startswith("cpu "):
+            total = sum(int(value) for value in line.split()[1:8])
+            continue
+        close = line.rfind(")")
+        open_ = line.find(" (")
+        if close < 0 or open_ < 0:
+            continue
+        fields = line[close + 2:].split()
+        if len(fields) <= _RSS:
+            continue
+        try:
+            pid = int(line[:open_])
+            ticks = int(fields[_UTIME]) + int(fields[_STIME])
+            start = int(fields[_STARTTIME])
+            rss = int(fields[_RSS])
+        except ValueError:
+            continue
+        columns.pid.append(pid)
+        columns.ticks.append(ticks)
+        columns.start.append(start)
+        columns.rss.append(rss)
+        columns.name.append(line[open_ + 2:close])
+        columns.state.append(fields[_STATE])
+    return total, columns
+
+
+class ProcessMonitor:
+    """Samples the device every `interval` seconds on a background thread.
+
+    `latest` holds the newest list of ProcessSample (CPU% is of one core, as in top),
+    `cpu` the whole-device CPU%, and `generation` grows with every sample.
+    """
+
+    def __init__(self, client, serial=None, interval=1.0):
+        self.client = client
+        self.serial = serial
+        self.interval = interval
+        self.latest = []
+        self.cpu = 0.0
+        self.generation = 0
+        self.sample_time = 0.0
+        self.error = None
+        self._previous_total = None
+        self._previous = {}  # pid -> (start time, cpu ticks, rss pages)
+        self._first_rss = {}  # (pid, start time) -> rss pages when first seen
+        self._cpus = 1
+        self._page_size = 4096
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        try:
+            with ShellSession.open(self.client, self.serial) as session:
+                setup = session.run(_SETUP_COMMAND).split()
+                if len(setup) >= 2 and setup[0].isdigit() and setup[1].isdigit():
+                    self._cpus = max(1, int(setup[0]))
+                    self._page_size = int(setup[1])
+                while not self._stop.is_set():
+                    started = time.monotonic()
+                    self.update(session.run(_SAMPLE_COMMAND))
+                    self.sample_time = time.monotonic() - started
+                    self._stop.wait(max(0.0, self.interval - self.sample_time))
+        except (AdbError, OSError) as e:
+            self.error = e
+
+    def update(self, text):
+        """Fold one raw sample into the deltas; returns the new list of ProcessSample."""
+        total, columns = parse_sample(text)
+        elapsed = total - self._previous_total if self._previous_total is not None else 0
+        # Jiffies of one core over the interval; process ticks are measured against it
+        per_core = elapsed / self._cpus if elapsed > 0 else 0
+        page_kb = self._page_size // 1024
+        previous = self._previous
+        current = {}
+        samples = []
+        busy = 0
+        for pid, ticks, start, rss, name, state in zip(columns.pid, columns.ticks, columns.start,
+                                                       columns.rss, columns.name, columns.state):
+            before = previous.get(pid)
+            if before is not None and before[0] != start:
+                before = None  # pid was reused by a new process
+            delta_ticks = ticks - before[1] if before is not None else 0
+            busy += delta_ticks
+            key = (pid, start)
+            first = self._first_rss.setdefault(key, rss)
+            samples.append(ProcessSample(
+                pid, name, state,
+                100.0 * delta_ticks / per_core if per_core else 0.0,
+                rss * page_kb,
+                (rss - before[2]) * page_kb if before is not None else 0,
+                (rss - first) * page_kb))
+            current[pid] = (start, ticks, rss)
+        # Forget processes that have exited
+        if len(self._first_rss) > len(current):
+            self._first_rss = {key: value for key, value in self._first_rss.items()
+                               if current.get(key[0], (None,))[0] == key[1]}
+        self._previous = current
+        self._previous_total = total
+        self.cpu = 100.0 * min(busy, elapsed) / elapsed if elapsed > 0 else 0.0
+        self.latest = samples
+        self.generation += 1
+        return samples
+
+
+def format_kb(kb):
+    return f"{kb / 1024:.1f} MB" if abs(kb) >= 1024 else f"{kb} KB"
+
+
+class ProcessMonitorWindow:
+    """Sortable live table fed by a ProcessMonitor; stops the monitor when closed."""
+
+    COLUMNS = ("pid", "name", "state", "cpu", "rss", "rss_delta", "rss_growth")
+    HEADINGS = ("PID", "Name", "S", "CPU %", "RSS", "Δ RSS", "Growth")
+
+    def __init__(self, parent, monitor, title="Processes", refresh_ms=250):
+        self.monitor = monitor
+        self.refresh_ms = refresh_ms
+        self.seen_generation = -1
+        self.sort_column = "cpu"
+        self.sort_reverse = True
+        self.rows = {}  # pid -> displayed values
+        self.order = []
+
+        self.window = tk.Toplevel(parent)
+        self.window.title(title)
+        self.window.geometry("800x600")
+        self.window.configure(bg="#282c34")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        controls = tk.Frame(self.window, bg="#282c34")
+        controls.pack(side=tk.TOP, fill=tk.X, padx=10, pady=5)
+        tk.Label(controls, text="Filter:", bg="#282c34", fg="white").pack(side=tk.LEFT)
+        self.filter_var = tk.StringVar()
+        entry = tk.Entry(controls, textvariable=self.filter_var, width=25)
+        entry.pack(side=tk.LEFT, padx=(0, 10))
+        entry.bind("<KeyRelease>", lambda _event: self.redraw())
+        self.status = tk.Label(controls, bg="#282c34", fg="gray")
+        self.status.pack(side=tk.RIGHT)
+
+        self.tree = ttk.Treeview(self.window, columns=self.COLUMNS, show="headings")
+        for column, heading, width in zip(self.COLUMNS, self.HEADINGS, (70, 250, 40, 70, 90, 90, 90)):
+            self.tree.heading(column, text=heading, command=lambda column=column: self.sort_by(column))
+            self.tree.column(column, width=width, anchor="w" if column == "name" else "e")
+        scrollbar = tk.Scrollbar(self.window, command=self.tree.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.config(yscrollcommand=scrollbar.set)
+        self.tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        self.window.after(self.refresh_ms, self.refresh)
+
+    def sort_by(self, column):
+        if column == self.sort_column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            # Numbers read best largest-first, names alphabetically
+            self.sort_column, self.sort_reverse = column, column not in ("name", "state")
+        self.redraw()
+
+    def refresh(self):
+        if not self.window.winfo_exists():
+            return
+        if self.monitor.error is not None:
+            self.status.config(text=f"Stopped: {self.monitor.error}", fg="red")
+            return
+        if self.monitor.generation != self.seen_generation:
+            self.seen_generation = self.monitor.generation
+            self.redraw()
+        self.window.after(self.refresh_ms, self.refresh)
+
+    def redraw(self):
+        query = self.filter_var.get().strip().lower()
+        samples = [sample for sample in self.monitor.latest
+                   if not query or query in sample.name.lower() or query == str(sample.pid)]
+        samples.sort(key=lambda sample: getattr(sample, self.sort_column), reverse=self.sort_reverse)
+
+        visible = set()
+        for sample in samples:
+            iid = str(sample.pid)
+            visible.add(iid)
+            values = (sample.pid, sample.name, sample.state, f"{sample.cpu:.1f}", format_kb(sample.rss),
+                      format_kb(sample.rss_delta), format_kb(sample.rss_growth))
+            if iid not in self.rows:
+                self.tree.insert("", "end", iid=iid, values=values)
+            elif self.rows[iid] != values:
+                self.tree.item(iid, values=values)
+            self.rows[iid] = values
+        for iid in [iid for iid in self.rows if iid not in visible]:
+            self.tree.delete(iid)
+            del self.rows[iid]
+        order = [str(sample.pid) for sample in samples]
+        if order != self.order:
+            for position, iid in enumerate(order):
+                self.tree.move(iid, "", position)
+            self.order = order
+        self.status.config(text=f"{len(self.monitor.latest)} processes, CPU {self.monitor.cpu:.0f}%, "
+                                f"sample {self.monitor.sample_time * 1000:.0f} ms", fg="gray")
+
+    def close(self):
+        self.monitor.stop()
+        self.window.destroy()
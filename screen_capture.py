@@ -0,0 +1,67 @@
+"""Screenshots streamed straight into memory over the exec: service.
+
+Nothing is written to the device or to the host: `screencap -p` output is decoded from
+a BytesIO, and the raw framebuffer mode (plain `screencap`, no PNG encoding on the
+device) is converted with Image.frombuffer, which maps the pixel buffer without a
+per-pixel Python loop.
+"""
+import io
+import struct
+
+from PIL import Image
+
+from adb_client import AdbError
+
+try:
+    from PIL.Image import Resampling
+except ImportError:
+    Resampling = None
+
+# android.graphics.PixelFormat values reported in the screencap header
+_RAW_FORMATS = {
+    1: ("RGBA", "RGBA", 4),   # RGBA_8888
+    2: ("RGB", "RGBX", 4),    # RGBX_8888
+    3: ("RGB", "RGB", 3),     # RGB_888
+    4: ("RGB", "BGR;16", 2),  # RGB_565
+    5: ("RGBA", "BGRA", 4),   # BGRA_8888
+}
+
+
+def decode_raw(data):
+    """Decode raw `screencap` output (header + pixels) into a PIL image."""
+    if len(data) < 12:
+        raise AdbError("screencap returned no data")
+    width, height, pixel_format = struct.unpack_from("<III", data)
+    if pixel_format not in _RAW_FORMATS:
+        raise AdbError(f"Unsupported framebuffer format {pixel_format}")
+    mode, raw_mode, bpp = _RAW_FORMATS[pixel_format]
+    # Android 9+ appends a colour space field, making the header 16 bytes instead of 12
+    header = len(data) - width * height * bpp
+    if header not in (12, 16):
+        raise AdbError("Unexpected screencap size; the device may have rotated mid-capture")
+    img = Image.frombuffer(mode, (width, height), memoryview(data)[header:], "raw", raw_mode, 0, 1)
+    # Pillow keeps padded formats as RGBX when mapping the buffer directly
+    return img if img.mode == mode else img.convert(mode)
+
+
+def capture(client, serial=None, raw=True):
+    """Grab the screen into a PIL image without touching any file."""
+    if raw:
+        return decode_raw(client.exec_out(["screencap"], serial))
+    data = client.exec_out(["screencap", "-p"], serial)
+    if not data:
+        raise AdbError("screencap returned no data")
+    img = Image.open(io.BytesIO(data))
+    img.load()
+    return img
+
+
+def make_preview(img, size=(600, 800)):
+    """Return a downscaled copy for display; the original stays full resolution."""
+    preview = img.copy()
+    # reducing_gap lets Pillow do a cheap integer reduce before the LANCZOS pass
+    if Resampling is not None:
+        preview.thumbnail(size, Resampling.LANCZOS, reducing_gap=2.0)
+    else:
+        preview.thumbnail(size)
+    return preview
@@ -0,0 +1,188 @@
+"""Long-lived device shell that runs many commands over one ADB stream.
+
+Commands are written to a single `sh` running on the device (via the exec: service, so
+there is no PTY mangling the output). After each command the session prints a marker
+line carrying the exit status; a reader thread splits the stream on those markers and
+resolves the callers' futures in the order the commands were sent.
+"""
+import collections
+import secrets
+import subprocess
+import threading
+from concurrent.futures import Future
+
+from adb_client import AdbCommandError, AdbError, quote_command
+
+ShellResult = collections.namedtuple("ShellResult", "output returncode")
+
+
+class _SocketStream:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def write(self, data):
+        self.conn.sock.sendall(data)
+
+    def read(self):
+        return self.conn.sock.recv(65536)
+
+    def close(self):
+        self.conn.close()
+
+
+class _ProcessStream:
+    def __init__(self, proc):
+        self.proc = proc
+
+    def write(self, data):
+        self.proc.stdin.write(data)
+        self.proc.stdin.flush()
+
+    def read(self):
+        return self.proc.stdout.read1(65536)
+
+    def close(self):
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        self.proc.kill()
+        self.proc.wait()
+
+
+class ShellSession:
+    def __init__(self, stream):
+        self.stream = stream
+        self.marker = f"__ADBTK_{secrets.token_hex(8)}__".encode()
+        self.closed = False
+        self._pending = collections.deque()
+        self._write_lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+
+    @classmethod
+    def open(cls, client, serial=None):
+        """Start `sh` on the device through the exec: service."""
+        conn = client.open_service("exec:sh", serial)
+        return cls(_SocketStream(conn))
+
+    @classmethod
+    def local(cls, argv=("sh",)):
+        """Run the session against a local shell; handy for trying things without a device."""
+        proc = subprocess.Popen(list(argv), stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT)
+        return cls(_ProcessStream(proc))
+
+    def submit(self, cmd):
+        """Queue a command and return a Future resolving to ShellResult."""
+        future = Future()
+        # The subshell keeps a syntax error in cmd from killing the whole session, and
+        # </dev/null stops the command from eating the commands queued after it
+        script = (f"( eval {quote_command([quote_command(cmd)])} ) </dev/null 2>&1\n"
+                  f"printf '\\n%s %d\\n' {self.marker.decode()} $?\n").encode("utf-8")
+        with self._write_lock:
+            if self.closed:
+                raise AdbError("Shell session is closed")
+            self._pending.append(future)
+            try:
+                self.stream.write(script)
+            except OSError as e:
+                self._fail_pending(AdbError(f"Shell session lost: {e}"))
+                raise AdbError(f"Shell session lost: {e}") from e
+        return future
+
+    def run(self, cmd, check=False, timeout=None):
+        result = self.submit(cmd).result(timeout)
+        if check and result.returncode:
+            raise AdbCommandError(quote_command(cmd), result.returncode, result.output)
+        return result.output
+
+    def run_many(self, cmds, timeout=None):
+        """Send every command before waiting on any of them; returns ShellResults in order."""
+        futures = [self.submit(cmd) for cmd in cmds]
+        return [future.result(timeout) for future in futures]
+
+    def _read_loop(self):
+        buf = bytearray()
+        needle = b"\n" + self.marker + b" "
+        try:
+            while True:
+                chunk = self.stream.read()
+                if not chunk:
+                    break
+                buf += chunk
+                while True:
+                    start = buf.find(needle)
+                    if start < 0:
+                        break
+                    end = buf.find(b"\n", start + len(needle))
+                    if end < 0:
+                        break
+                    code = int(buf[start + len(needle):end] or 0)
+                    output = buf[:start].decode("utf-8", "replace")
+                    del buf[:end + 1]
+                    if self._pending:
+                        self._pending.popleft().set_result(ShellResult(output, code))
+        except OSError:
+            pass
+        with self._write_lock:
+            self._fail_pending(AdbError("Shell session closed by device"))
+
+    def _fail_pending(self, error):
+        self.closed = True
+        while self._pending:
+            future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(error)
+
+    def close(self):
+        with self._write_lock:
+            self.closed = True
+        self.stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ShellSessionPool:
+    """Keeps one ShellSession per device serial and reopens it if the device drops it."""
+
+    def __init__(self, client):
+        self.client = client
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, serial=None):
+        with self._lock:
+            session = self._sessions.get(serial)
+            if session is None or session.closed:
+                session = ShellSession.open(self.client, serial)
+                self._sessions[serial] = session
+            return session
+
+    def run(self, cmd, serial=None, check=False, timeout=None):
+        try:
+            future = self.get(serial).submit(cmd)
+        except AdbError:
+            # Stale session (e.g. after a reboot); the command never left the host
+            future = self.get(serial).submit(cmd)
+        result = future.result(timeout)
+        if check and result.returncode:
+            raise AdbCommandError(quote_command(cmd), result.returncode, result.output)
+        return result.output
+
+    def discard(self, serial):
+        """Close the session of a device that went away."""
+        with self._lock:
+            session = self._sessions.pop(serial, None)
+        if session is not None:
+            session.close()
+
+    def close_all(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
@@ -0,0 +1,220 @@
+"""Worker pool that keeps ADB work off the Tk main loop.
+
+Menu actions submit a function to TaskExecutor. It runs on a worker thread and
+receives its Task so it can report progress, check for cancellation or sleep in a
+cancellable way. Results, errors, progress and any UI calls are queued and run
+on the Tk thread by a short after() poll, because Tk widgets must only be touched
+from the thread that created them.
+"""
+import itertools
+import queue
+import threading
+import time
+import tkinter as tk
+import tkinter.ttk as ttk
+from concurrent.futures import Future, ThreadPoolExecutor
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class TaskCancelled(Exception):
+    pass
+
+
+class Task:
+    def __init__(self, task_id, name, executor):
+        self.id = task_id
+        self.name = name
+        self.status = PENDING
+        self.progress_text = ""
+        self.started = None
+        self.finished = None
+        self.future = None
+        self._executor = executor
+        self.cancel_event = threading.Event()
+        self._cancel_callbacks = []
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        if self.future is not None and self.future.cancel():
+            self.status = CANCELLED
+            self.finished = time.monotonic()
+            self._executor.forget(self)
+            return
+        self.cancel_event.set()
+        for callback in list(self._cancel_callbacks):
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def on_cancel(self, callback):
+        """Run callback (e.g. process.terminate) when the task is cancelled."""
+        self._cancel_callbacks.append(callback)
+        if self.cancelled:
+            callback()
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise TaskCancelled(self.name)
+
+    def sleep(self, seconds):
+        """time.sleep that wakes up and raises TaskCancelled on cancellation."""
+        if self.cancel_event.wait(seconds):
+            raise TaskCancelled(self.name)
+
+    def progress(self, text, callback=None):
+        self.progress_text = text
+        if callback is not None:
+            self.call_ui(callback, text)
+
+    def call_ui(self, fn, *args):
+        """Schedule fn(*args) on the Tk thread."""
+        self._executor.post(fn, *args)
+
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+
+class TaskExecutor:
+    def __init__(self, root, max_workers=4, on_error=None, poll_ms=50):
+        self.root = root
+        self.on_error = on_error
+        self.poll_ms = poll_ms
+        self.tasks = {}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="adb-task")
+        self._ui_queue = queue.SimpleQueue()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._keep_finished = 20
+        self.root.after(self.poll_ms, self._poll)
+
+    def submit(self, name, fn, *args, on_success=None, on_error=None, dedicated=False):
+        """Run fn(task, *args) on a worker; callbacks run on the Tk thread.
+
+        dedicated=True gives the task its own daemon thread instead of a pool worker, for
+        work that lives as long as an external process (e.g. reading scrcpy's output).
+        """
+        task = Task(next(self._ids), name, self)
+        with self._lock:
+            self.tasks[task.id] = task
+        if dedicated:
+            task.future = Future()
+            threading.Thread(target=self._run_dedicated, args=(task, fn, args, on_success, on_error),
+                             name=f"adb-task-{task.id}", daemon=True).start()
+        else:
+            task.future = self._pool.submit(self._run, task, fn, args, on_success, on_error)
+        return task
+
+    def _run_dedicated(self, task, fn, args, on_success, on_error):
+        if task.future.set_running_or_notify_cancel():
+            self._run(task, fn, args, on_success, on_error)
+            task.future.set_result(None)
+
+    def _run(self, task, fn, args, on_success, on_error):
+        task.status = RUNNING
+        task.started = time.monotonic()
+        try:
+            task.check_cancelled()
+            result = fn(task, *args)
+        except TaskCancelled:
+            task.status = CANCELLED
+        except Exception as e:
+            task.status = FAILED
+            handler = on_error or self.on_error
+            if handler is not None:
+                self.post(handler, task, e)
+        else:
+            task.status = CANCELLED if task.cancelled else DONE
+            if on_success is not None and not task.cancelled:
+                self.post(on_success, result)
+        finally:
+            task.finished = time.monotonic()
+            self.forget(task)
+
+    def forget(self, task):
+        # Keep a handful of finished tasks visible in the task list
+        with self._lock:
+            finished = [t for t in self.tasks.values() if t.finished is not None]
+            for old in finished[:-self._keep_finished]:
+                self.tasks.pop(old.id, None)
+
+    def post(self, fn, *args):
+        self._ui_queue.put((fn, args))
+
+    def _poll(self):
+        while True:
+            try:
+                fn, args = self._ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"[!] UI callback failed: {e}")
+        self.root.after(self.poll_ms, self._poll)
+
+    def active(self):
+        with self._lock:
+            return [task for task in self.tasks.values() if task.status in (PENDING, RUNNING)]
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.tasks.values())
+
+    def shutdown(self):
+        for task in self.active():
+            task.cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class TaskListWindow:
+    """Live table of queued/running/recent tasks with a Cancel button."""
+
+    def __init__(self, parent, executor, refresh_ms=500):
+        self.executor = executor
+        self.refresh_ms = refresh_ms
+        self.window = tk.Toplevel(parent)
+        self.window.title("Tasks")
+        self.window.geometry("700x300")
+        self.window.configure(bg="#282c34")
+
+        columns = ("name", "status", "progress", "elapsed")
+        self.tree = ttk.Treeview(self.window, columns=columns, show="headings")
+        for column, width in zip(columns, (200, 80, 300, 80)):
+            self.tree.heading(column, text=column.capitalize())
+            self.tree.column(column, width=width, anchor="w")
+        self.tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 0))
+        tk.Button(self.window, text="Cancel Selected", command=self.cancel_selected).pack(pady=10)
+        self.refresh()
+
+    def refresh(self):
+        if not self.window.winfo_exists():
+            return
+        tasks = {str(task.id): task for task in self.executor.snapshot()}
+        for item in self.tree.get_children():
+            if item not in tasks:
+                self.tree.delete(item)
+        for item, task in tasks.items():
+            values = (task.name, task.status, task.progress_text, f"{task.elapsed():.1f}s")
+            if self.tree.exists(item):
+                if self.tree.item(item, "values") != values:
+                    self.tree.item(item, values=values)
+            else:
+                self.tree.insert("", "end", iid=item, values=values)
+        self.window.after(self.refresh_ms, self.refresh)
+
+    def cancel_selected(self):
+        tasks = {str(task.id): task for task in self.executor.snapshot()}
+        for item in self.tree.selection():
+            if item in tasks:
+                tasks[item].cancel()
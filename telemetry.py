@@ -0,0 +1,311 @@
+"""Battery and thermal telemetry recorded over long soak tests.
+
+A background thread samples one device on a persistent shell: `dumpsys battery` for
+level, temperature, voltage and plug state, plus current_now and every thermal zone
+from sysfs, all in one command per tick. Each metric is stored in its own float32
+array, so twelve hours at 1 Hz with a dozen zones stays within a few megabytes.
+Plots read bucket-averaged views sized to the canvas instead of the raw samples.
+Recordings export to CSV, or to Parquet when pyarrow is installed.
+"""
+import array
+import csv
+import math
+import threading
+import time
+import tkinter as tk
+import tkinter.ttk as ttk
+from tkinter import filedialog, messagebox
+
+from adb_client import AdbError
+from shell_session import ShellSession
+
+_SECTION = "--adb-toolkit-section--"
+_SAMPLE_COMMAND = (f"dumpsys battery; echo {_SECTION}; "
+                   f"cat /sys/class/power_supply/battery/current_now 2>/dev/null; echo {_SECTION}; "
+                   f"grep -H . /sys/class/thermal/thermal_zone*/temp 2>/dev/null")
+_ZONES_COMMAND = "grep -H . /sys/class/thermal/thermal_zone*/type 2>/dev/null"
+
+BATTERY_COLUMNS = ("level", "temperature", "voltage", "current", "plugged")
+# BatteryManager.BATTERY_PLUGGED_* values
+_PLUGGED = {"AC powered": 1, "USB powered": 2, "Wireless powered": 4, "Dock powered": 8}
+
+
+def parse_battery(text):
+    """level (%), temperature (°C), voltage (V) and plugged (bit mask) from dumpsys battery."""
+    fields = {}
+    for line in text.splitlines():
+        key, sep, value = line.strip().partition(": ")
+        if sep:
+            fields[key] = value.strip()
+    values = {}
+    try:
+        if "level" in fields:
+            scale = int(fields.get("scale", "100")) or 100
+            values["level"] = int(fields["level"]) * 100.0 / scale
+        if "temperature" in fields:
+            values["temperature"] = int(fields["temperature"]) / 10.0
+        if "voltage" in fields:
+            voltage = int(fields["voltage"])
+            # Most devices report mV, a few report µV
+            values["voltage"] = voltage / 1000000.0 if voltage > 100000 else voltage / 1000.0
+    except ValueError:
+        pass
+    values["plugged"] = float(sum(bit for key, bit in _PLUGGED.items() if fields.get(key) == "true"))
+    return values
+
+
+def parse_zone_values(text):
+    """{zone number: raw value} from `grep -H . /sys/class/thermal/thermal_zone*/<file>`."""
+    zones = {}
+    for line in text.splitlines():
+        path, sep, value = line.partition(":")
+        if not sep or "thermal_zone" not in path:
+            continue
+        zone = path.split("thermal_zone", 1)[1].split("/", 1)[0]
+        if zone.isdigit():
+            zones[int(zone)] = value.strip()
+    return zones
+
+
+def zone_names(text):
+    """Column name per zone number, e.g. thermal_cpu0; repeated types get the zone number."""
+    types = parse_zone_values(text)
+    counts = {}
+    for kind in types.values():
+        counts[kind] = counts.get(kind, 0) + 1
+    return {zone: f"thermal_{kind}" if counts[kind] == 1 else f"thermal_{kind}_{zone}"
+            for zone, kind in types.items()}
+
+
+def _celsius(raw):
+    value = float(raw)
+    # Zones report millidegrees, except some vendor zones that report degrees
+    return value / 1000.0 if abs(value) >= 1000 else value
+
+
+class TelemetrySeries:
+    """Column store: one time array plus one float32 array per metric, NaN where missing."""
+
+    def __init__(self):
+        self.time = array.array("d")
+        self.columns = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.time)
+
+    def append(self, timestamp, values):
+        with self._lock:
+            for name in values:
+                if name not in self.columns:
+                    # A metric that shows up late is NaN for the rows before it
+                    self.columns[name] = array.array("f", [math.nan]) * len(self.time)
+            self.time.append(timestamp)
+            for name, column in self.columns.items():
+                column.append(values.get(name, math.nan))
+
+    def names(self):
+        with self._lock:
+            return list(self.columns)
+
+    def latest(self):
+        with self._lock:
+            return {name: column[-1] for name, column in self.columns.items()} if self.time else {}
+
+    def downsample(self, name, max_points=1000):
+        """(times, values) averaged into at most max_points buckets, skipping NaN."""
+        with self._lock:
+            count = len(self.time)
+            times = self.time[:count]
+            column = self.columns.get(name, array.array("f"))[:count]
+        if count <= max_points:
+            return ([t for t, v in zip(times, column) if not math.isnan(v)],
+                    [v for v in column if not math.isnan(v)])
+        step = count / max_points
+        out_times, out_values = [], []
+        for bucket in range(max_points):
+            start, end = int(bucket * step), int((bucket + 1) * step)
+            values = [v for v in column[start:end] if not math.isnan(v)]
+            if values:
+                out_times.append(times[(start + end - 1) // 2])
+                out_values.append(sum(values) / len(values))
+        return out_times, out_values
+
+    def _snapshot(self):
+        with self._lock:
+            count = len(self.time)
+            return self.time[:count], {name: column[:count] for name, column in self.columns.items()}
+
+    def to_csv(self, path):
+        times, columns = self._snapshot()
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["time"] + list(columns))
+            for row, timestamp in enumerate(times):
+                writer.writerow([f"{timestamp:.3f}"] + ["" if math.isnan(column[row]) else f"{column[row]:.4g}"
+                                                        for column in columns.values()])
+
+    def to_parquet(self, path):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow") from e
+        times, columns = self._snapshot()
+        table = pyarrow.table({"time": pyarrow.array(times, pyarrow.float64()),
+                               **{name: pyarrow.array(column, pyarrow.float32()).fill_null(math.nan)
+                                  for name, column in columns.items()}})
+        pyarrow.parquet.write_table(table, path)
+
+    def export(self, path):
+        if path.lower().endswith(".parquet"):
+            self.to_parquet(path)
+        else:
+            self.to_csv(path)
+
+
+class TelemetryRecorder:
+    """Samples one device every `interval` seconds into a TelemetrySeries until stopped.
+
+    A lost connection does not end the recording: the error is kept in `error` and the
+    shell is reopened on the next tick.
+    """
+
+    def __init__(self, client, serial=None, interval=5.0, thermal=True):
+        self.client = client
+        self.serial = serial
+        self.interval = interval
+        self.thermal = thermal
+        self.series = TelemetrySeries()
+        self.error = None
+        self.generation = 0
+        self._zones = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                with ShellSession.open(self.client, self.serial) as session:
+                    if self.thermal and self._zones is None:
+                        self._zones = zone_names(session.run(_ZONES_COMMAND))
+                    while not self._stop.is_set():
+                        started = time.monotonic()
+                        self.record(session.run(_SAMPLE_COMMAND))
+                        self.error = None
+                        self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+            except (AdbError, OSError) as e:
+                self.error = e
+                self._stop.wait(self.interval)
+
+    def record(self, text, timestamp=None):
+        sections = text.split(_SECTION)
+        sections += [""] * (3 - len(sections))
+        values = parse_battery(sections[0])
+        current = sections[1].strip()
+        if current.lstrip("-").isdigit():
+            values["current"] = int(current) / 1000.0  # µA to mA
+        if self.thermal:
+            for zone, raw in parse_zone_values(sections[2]).items():
+                try:
+                    values[(self._zones or {}).get(zone, f"thermal_{zone}")] = _celsius(raw)
+                except ValueError:
+                    pass
+        self.series.append(time.time() if timestamp is None else timestamp, values)
+        self.generation += 1
+
+
+class TelemetryWindow:
+    """Live plot of one metric of a TelemetryRecorder; stops the recorder when closed."""
+
+    def __init__(self, parent, recorder, title="Battery Telemetry", refresh_ms=1000):
+        self.recorder = recorder
+        self.refresh_ms = refresh_ms
+        self.seen_generation = -1
+
+        self.window = tk.Toplevel(parent)
+        self.window.title(title)
+        self.window.geometry("800x450")
+        self.window.configure(bg="#282c34")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        controls = tk.Frame(self.window, bg="#282c34")
+        controls.pack(side=tk.TOP, fill=tk.X, padx=10, pady=5)
+        tk.Label(controls, text="Metric:", bg="#282c34", fg="white").pack(side=tk.LEFT)
+        self.metric_var = tk.StringVar(value="temperature")
+        self.metric_box = ttk.Combobox(controls, textvariable=self.metric_var, values=list(BATTERY_COLUMNS),
+                                       width=28, state="readonly")
+        self.metric_box.pack(side=tk.LEFT, padx=(0, 10))
+        self.metric_box.bind("<<ComboboxSelected>>", lambda _event: self.redraw())
+        tk.Button(controls, text="Export", command=self.export).pack(side=tk.LEFT, padx=5)
+        self.status = tk.Label(controls, bg="#282c34", fg="gray")
+        self.status.pack(side=tk.RIGHT)
+
+        self.canvas = tk.Canvas(self.window, bg="#1e1e1e", highlightthickness=0)
+        self.canvas.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.canvas.bind("<Configure>", lambda _event: self.redraw())
+        self.window.after(self.refresh_ms, self.refresh)
+
+    def refresh(self):
+        if not self.window.winfo_exists():
+            return
+        if self.recorder.generation != self.seen_generation:
+            self.seen_generation = self.recorder.generation
+            names = self.recorder.series.names()
+            if list(self.metric_box["values"]) != names and names:
+                self.metric_box["values"] = names
+            self.redraw()
+        self.window.after(self.refresh_ms, self.refresh)
+
+    def redraw(self):
+        series = self.recorder.series
+        metric = self.metric_var.get()
+        width, height = self.canvas.winfo_width(), self.canvas.winfo_height()
+        self.canvas.delete("all")
+        latest = series.latest()
+        status = f"{len(series)} samples"
+        if latest:
+            status += ", " + ", ".join(f"{name} {latest[name]:.1f}" for name in BATTERY_COLUMNS
+                                       if name in latest and not math.isnan(latest[name]))
+        if self.recorder.error is not None:
+            status += f" (retrying: {self.recorder.error})"
+        self.status.config(text=status)
+        times, values = series.downsample(metric, max(2, width // 2))
+        if len(values) < 2 or width < 50 or height < 50:
+            return
+        low, high = min(values), max(values)
+        if high - low < 1e-6:
+            low, high = low - 1, high + 1
+        start, end = times[0], times[-1]
+        margin = 40
+        points = []
+        for t, v in zip(times, values):
+            points.append(margin + (t - start) / ((end - start) or 1) * (width - 2 * margin))
+            points.append(height - margin - (v - low) / (high - low) * (height - 2 * margin))
+        self.canvas.create_line(*points, fill="#61afef", width=2)
+        for value, y in ((high, margin), (low, height - margin)):
+            self.canvas.create_text(5, y, text=f"{value:.1f}", fill="gray", anchor="w", font=("Consolas", 9))
+        self.canvas.create_text(width - 5, height - 10, text=f"{(end - start) / 60:.1f} min", fill="gray",
+                                anchor="e", font=("Consolas", 9))
+
+    def export(self):
+        path = filedialog.asksaveasfilename(parent=self.window, defaultextension=".csv",
+                                            filetypes=[("CSV", "*.csv"), ("Parquet", "*.parquet")])
+        if not path:
+            return
+        try:
+            self.recorder.series.export(path)
+        except (OSError, RuntimeError) as e:
+            messagebox.showerror("Export", str(e), parent=self.window)
+
+    def close(self):
+        self.recorder.stop()
+        self.window.destroy()
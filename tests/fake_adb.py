@@ -0,0 +1,162 @@
+"""A scripted adb server on localhost for exercising AdbClient and the services built on it.
+
+Each accepted connection reads requests in the host protocol; `handler(request, sock)`
+answers one request and returns True when the connection should read another one
+(as after host:transport), or False to close it.
+"""
+import socket
+import struct
+import threading
+
+_HEADER = struct.Struct("<4sI")
+_DENT = struct.Struct("<IIII")
+
+
+def read_exact(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise EOFError
+        data += chunk
+    return data
+
+
+def read_request(sock):
+    return read_exact(sock, int(read_exact(sock, 4), 16)).decode("utf-8")
+
+
+def okay_string(sock, data):
+    sock.sendall(b"OKAY" + b"%04x" % len(data) + data)
+
+
+def fail(sock, message):
+    data = message.encode("utf-8")
+    sock.sendall(b"FAIL" + b"%04x" % len(data) + data)
+
+
+def shell_v2_reply(sock, stdout=b"", stderr=b"", code=0):
+    sock.sendall(b"OKAY")
+    if stdout:
+        sock.sendall(struct.pack("<BI", 1, len(stdout)) + stdout)
+    if stderr:
+        sock.sendall(struct.pack("<BI", 2, len(stderr)) + stderr)
+    sock.sendall(struct.pack("<BI", 3, 1) + bytes([code]))
+
+
+class FakeAdbServer:
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+        self.connections = 0
+        self._listener = socket.socket()
+        self._listener.bind(("127.0.0.1", 0))
+        self._listener.listen(16)
+        self.port = self._listener.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                sock, _ = self._listener.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self._serve, args=(sock,), daemon=True).start()
+
+    def _serve(self, sock):
+        try:
+            while True:
+                request = read_request(sock)
+                self.requests.append(request)
+                if not self.handler(request, sock):
+                    break
+        except (EOFError, OSError, ValueError):
+            pass
+        finally:
+            sock.close()
+
+    def close(self):
+        self._listener.close()
+
+
+class FakeSyncService:
+    """sync: over an in-memory {path: bytes}; adbd-like, it ends the session after FAIL.
+
+    LIST reports every file as a regular file with its mtime from `mtimes` (default
+    MTIME); `received` records the paths of RECV requests.
+    """
+
+    MTIME = 1600000000
+
+    def __init__(self, files, mtimes=None):
+        self.files = files
+        self.mtimes = {} if mtimes is None else mtimes
+        self.received = []
+
+    def __call__(self, sock):
+        sock.sendall(b"OKAY")
+        while True:
+            cmd, length = _HEADER.unpack(read_exact(sock, _HEADER.size))
+            if cmd == b"QUIT":
+                return
+            path = read_exact(sock, length).decode("utf-8")
+            if cmd == b"LIST":
+                folder = path.rstrip("/") + "/"
+                for remote in sorted(self.files):
+                    name = remote[len(folder):].encode("utf-8")
+                    if remote.startswith(folder) and b"/" not in name:
+                        sock.sendall(b"DENT" + _DENT.pack(0o100644, len(self.files[remote]),
+                                                          self.mtimes.get(remote, self.MTIME), len(name)) + name)
+                sock.sendall(b"DONE" + bytes(_DENT.size))
+            elif cmd == b"RECV":
+                self.received.append(path)
+                if path not in self.files:
+                    self._fail(sock, "No such file or directory")
+                    return
+                data = self.files[path]
+                for offset in range(0, len(data), 65536):
+                    chunk = data[offset:offset + 65536]
+                    sock.sendall(_HEADER.pack(b"DATA", len(chunk)) + chunk)
+                sock.sendall(_HEADER.pack(b"DONE", 0))
+            elif cmd == b"SEND":
+                remote = path.rsplit(",", 1)[0]
+                data = b""
+                while True:
+                    cmd, length = _HEADER.unpack(read_exact(sock, _HEADER.size))
+                    if cmd == b"DONE":
+                        break
+                    data += read_exact(sock, length)
+                if remote.startswith("/system/"):
+                    self._fail(sock, "Read-only file system")
+                    return
+                self.files[remote] = data
+                sock.sendall(_HEADER.pack(b"OKAY", 0))
+            else:
+                self._fail(sock, f"unsupported {cmd!r}")
+                return
+
+    @staticmethod
+    def _fail(sock, message):
+        data = message.encode("utf-8")
+        sock.sendall(_HEADER.pack(b"FAIL", len(data)) + data)
+        # Half-close and drain: closing with pipelined requests unread would send a reset
+        # that can discard replies the client has not read yet
+        sock.shutdown(socket.SHUT_WR)
+        while sock.recv(65536):
+            pass
+
+
+def device_handler(services):
+    """Handler that accepts host:transport* and serves `services[name](sock)` after it."""
+    def handler(request, sock):
+        if request.startswith("host:transport"):
+            sock.sendall(b"OKAY")
+            return True
+        service = services.get(request)
+        if service is None:
+            fail(sock, f"unknown service {request}")
+            return False
+        service(sock)
+        return False
+    return handler
@@ -0,0 +1,79 @@
+import pytest
+
+from adb_client import AdbClient, AdbCommandError, AdbError, parse_device_list
+from fake_adb import FakeAdbServer, fail, okay_string, shell_v2_reply
+
+SERIAL = "emulator-5554"
+
+
+def handle(request, sock):
+    if request == "host:version":
+        okay_string(sock, b"0029")
+    elif request == "host:devices-l":
+        okay_string(sock, f"{SERIAL}          device product:sdk model:Pixel_7 transport_id:3\n".encode())
+    elif request == f"host-serial:{SERIAL}:features":
+        okay_string(sock, b"shell_v2,cmd,abb_exec")
+    elif request == f"host:transport:{SERIAL}":
+        sock.sendall(b"OKAY")
+        return True
+    elif request == "host:transport-any":
+        fail(sock, "more than one device/emulator")
+    elif request == "shell,v2,raw:echo hi":
+        shell_v2_reply(sock, b"hi\n", b"warning\n", 0)
+    elif request == "shell,v2,raw:false":
+        shell_v2_reply(sock, b"", b"failed\n", 1)
+    elif request == "exec:cat /data/blob":
+        sock.sendall(b"OKAY" + bytes(range(256)) * 4)
+    else:
+        fail(sock, f"closed: {request}")
+    return False
+
+
+@pytest.fixture
+def server():
+    server = FakeAdbServer(handle)
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def client(server):
+    return AdbClient(port=server.port, timeout=5)
+
+
+def test_host_query(client):
+    assert client.version() == 41
+    assert client.devices_long() == [{"serial": SERIAL, "state": "device", "product": "sdk",
+                                      "model": "Pixel_7", "transport_id": "3"}]
+
+
+def test_fail_reply_raises_with_message(client):
+    with pytest.raises(AdbError, match="more than one device"):
+        client.exec_out("true")
+
+
+def test_transport_is_selected_before_the_service(client, server):
+    assert client.exec_out("cat /data/blob", serial=SERIAL) == bytes(range(256)) * 4
+    assert server.requests[-2:] == [f"host:transport:{SERIAL}", "exec:cat /data/blob"]
+
+
+def test_unknown_service_fails_after_transport(client):
+    with pytest.raises(AdbError, match="closed: reboot:"):
+        client.open_service("reboot:", SERIAL)
+
+
+def test_shell_v2_packets(client):
+    assert client.shell_v2("echo hi", SERIAL) == (b"hi\n", b"warning\n", 0)
+    assert client.shell(["echo", "hi"], SERIAL) == "hi\n"
+
+
+def test_shell_check_raises_with_exit_code(client):
+    with pytest.raises(AdbCommandError) as info:
+        client.shell("false", SERIAL, check=True)
+    assert info.value.returncode == 1
+    assert info.value.stderr == "failed\n"
+
+
+def test_parse_device_list():
+    assert parse_device_list("0123 unauthorized usb:1-1 transport_id:2\n\n") == [
+        {"serial": "0123", "state": "unauthorized", "usb": "1-1", "transport_id": "2"}]
@@ -0,0 +1,111 @@
+import os
+
+import pytest
+
+from adb_client import AdbClient, AdbError
+from adb_sync import SyncConnection, SyncError
+from fake_adb import FakeAdbServer, FakeSyncService, device_handler
+
+
+@pytest.fixture
+def device():
+    files = {f"/sdcard/file{number}": bytes([number]) * (70000 + number) for number in range(4)}
+    server = FakeAdbServer(device_handler({"sync:": FakeSyncService(files)}))
+    yield AdbClient(port=server.port, timeout=5), server, files
+    server.close()
+
+
+def test_pull_many(device, tmp_path):
+    client, server, files = device
+    pairs = [(remote, str(tmp_path / os.path.basename(remote))) for remote in sorted(files)]
+    with SyncConnection(client) as sync:
+        results = sync.pull_many(pairs, window=4)
+    assert [error for _, _, error in results] == [None] * 4
+    for remote, local in pairs:
+        with open(local, "rb") as f:
+            assert f.read() == files[remote]
+    assert server.connections == 1
+
+
+def test_pull_many_local_failure_keeps_window_in_step(device, tmp_path):
+    client, server, files = device
+    pairs = [(remote, str(tmp_path / os.path.basename(remote))) for remote in sorted(files)]
+    pairs[1] = (pairs[1][0], str(tmp_path / "missing" / "file1"))
+    with SyncConnection(client) as sync:
+        results = sync.pull_many(pairs, window=4)
+    assert isinstance(results[1][2], FileNotFoundError)
+    for position in (0, 2, 3):
+        remote, local, error = results[position]
+        assert error is None
+        with open(local, "rb") as f:
+            assert f.read() == files[remote]
+
+
+def test_pull_many_remote_failure_reopens(device, tmp_path):
+    client, server, files = device
+    remotes = ["/sdcard/file0", "/sdcard/absent", "/sdcard/file2", "/sdcard/file3"]
+    pairs = [(remote, str(tmp_path / f"out{position}")) for position, remote in enumerate(remotes)]
+    with SyncConnection(client) as sync:
+        results = sync.pull_many(pairs, window=4)
+    assert isinstance(results[1][2], SyncError)
+    assert not os.path.exists(pairs[1][1])
+    assert [error for position, (_, _, error) in enumerate(results) if position != 1] == [None] * 3
+    with open(pairs[3][1], "rb") as f:
+        assert f.read() == files["/sdcard/file3"]
+    assert server.connections == 2
+
+
+def test_push_many_local_failures(device, tmp_path):
+    client, server, files = device
+    sources = []
+    for number in range(4):
+        path = tmp_path / f"in{number}"
+        path.write_bytes(b"x" * number)
+        sources.append(str(path))
+    os.remove(sources[1])
+    sources[2] = str(tmp_path)  # a directory cannot be opened for reading
+    pairs = [(local, f"/data/local/tmp/in{number}") for number, local in enumerate(sources)]
+    with SyncConnection(client) as sync:
+        results = sync.push_many(pairs, window=4)
+    assert isinstance(results[1][2], FileNotFoundError)
+    assert isinstance(results[2][2], OSError)
+    assert results[0][2] is None and results[3][2] is None
+    assert files["/data/local/tmp/in3"] == b"xxx"
+    # Local failures send nothing, so the session is never reopened
+    assert server.connections == 1
+
+
+def test_push_many_remote_failure(device, tmp_path):
+    client, server, files = device
+    local = tmp_path / "in"
+    local.write_bytes(b"data")
+    pairs = [(str(local), "/system/in"), (str(local), "/data/local/tmp/in")]
+    with SyncConnection(client) as sync:
+        results = sync.push_many(pairs, window=4)
+    assert isinstance(results[0][2], SyncError)
+    assert results[1][2] is None
+    assert files["/data/local/tmp/in"] == b"data"
+
+
+def test_single_pull_local_failure(device, tmp_path):
+    client, server, files = device
+    with SyncConnection(client) as sync:
+        with pytest.raises(FileNotFoundError):
+            sync.pull("/sdcard/file0", str(tmp_path / "missing" / "file0"))
+        # The reply was drained, so the same session keeps working
+        assert sync.pull("/sdcard/file1", str(tmp_path / "file1")) == len(files["/sdcard/file1"])
+
+
+def test_pull_many_keeps_results_when_progress_cancels(device, tmp_path):
+    client, server, files = device
+    pairs = [(remote, str(tmp_path / os.path.basename(remote))) for remote in sorted(files)]
+    results = []
+
+    def progress(done, total, transferred):
+        if done == 2:
+            raise AdbError("Sync cancelled")
+
+    with SyncConnection(client) as sync:
+        with pytest.raises(AdbError, match="cancelled"):
+            sync.pull_many(pairs, window=4, progress=progress, results=results)
+    assert results == [pairs[0] + (None,), pairs[1] + (None,)]
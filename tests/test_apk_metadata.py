@@ -0,0 +1,187 @@
+import hashlib
+import struct
+import zipfile
+from xml.etree import ElementTree
+
+import pytest
+
+from apk_installer import remote_sha256
+from apk_metadata import ApkMetadataCache, ApkMetadataError, parse_manifest, read_apk_info
+
+ANDROID = "http://schemas.android.com/apk/res/android"
+
+# The manifest of a small app, compiled below the way aapt lays out binary XML
+MANIFEST = f"""<?xml version="1.0" encoding="utf-8"?>
+<manifest xmlns:android="{ANDROID}"
+    android:versionCode="30401"
+    android:versionName="3.4.1"
+    android:compileSdkVersion="34"
+    package="org.example.notes"
+    platformBuildVersionCode="34">
+    <uses-sdk android:minSdkVersion="21" android:targetSdkVersion="34"/>
+    <application android:label="Notes" android:allowBackup="true">
+        <activity android:name=".MainActivity" android:exported="true"/>
+    </application>
+</manifest>
+"""
+
+RESOURCE_IDS = {
+    "label": 0x01010001, "name": 0x01010003, "exported": 0x01010010, "minSdkVersion": 0x0101020c,
+    "versionCode": 0x0101021b, "versionName": 0x0101021c, "targetSdkVersion": 0x01010270,
+    "allowBackup": 0x01010280, "compileSdkVersion": 0x01010572, "versionCodeMajor": 0x01010576,
+}
+
+
+def _length(value, utf8):
+    if utf8:
+        return bytes([value]) if value < 0x80 else bytes([0x80 | value >> 8, value & 0xff])
+    return struct.pack("<H", value) if value < 0x8000 else struct.pack("<HH", 0x8000 | value >> 16, value & 0xffff)
+
+
+def _string_pool(strings, utf8):
+    offsets, data = [], b""
+    for string in strings:
+        offsets.append(len(data))
+        if utf8:
+            encoded = string.encode("utf-8")
+            data += _length(len(string), True) + _length(len(encoded), True) + encoded + b"\0"
+        else:
+            data += _length(len(string), False) + string.encode("utf-16-le") + b"\0\0"
+    data += bytes(-len(data) % 4)
+    strings_start = 28 + 4 * len(strings)
+    return (struct.pack("<HHIIIII", 0x0001, 28, strings_start + len(data), len(strings), 0,
+                        0x100 if utf8 else 0, strings_start) + struct.pack("<I", 0)
+            + struct.pack(f"<{len(strings)}I", *offsets) + data)
+
+
+def compile_manifest(text, utf8=False, strip_names=False):
+    """Binary XML for text: string pool (android: attribute names first, matching the
+    resource map), resource map, namespace and element chunks."""
+    root = ElementTree.fromstring(text)
+    elements = list(root.iter())
+    android_names = sorted({key.split("}")[1] for element in elements for key in element.attrib
+                            if key.startswith("{" + ANDROID + "}")}, key=RESOURCE_IDS.get)
+    strings = ["" if strip_names else name for name in android_names]
+    index = {}
+
+    def ref(value):
+        if value not in index:
+            index[value] = len(strings)
+            strings.append(value)
+        return index[value]
+
+    for element in elements:
+        ref(element.tag)
+        for key, value in element.attrib.items():
+            if not key.startswith("{"):
+                ref(key)
+            if not value.isdigit() and value not in ("true", "false"):
+                ref(value)
+    prefix, uri = ref("android"), ref(ANDROID)
+
+    def attribute(key, value):
+        if key.startswith("{"):
+            namespace, name = uri, android_names.index(key.split("}")[1])
+        else:
+            namespace, name = 0xffffffff, index[key]
+        if value.isdigit():
+            return struct.pack("<IIIHBBI", namespace, name, 0xffffffff, 8, 0, 0x10, int(value))
+        if value in ("true", "false"):
+            return struct.pack("<IIIHBBI", namespace, name, 0xffffffff, 8, 0, 0x12,
+                               0xffffffff if value == "true" else 0)
+        return struct.pack("<IIIHBBI", namespace, name, index[value], 8, 0, 0x03, index[value])
+
+    def node(chunk_type, body, line=1):
+        return struct.pack("<HHIII", chunk_type, 16, 16 + len(body), line, 0xffffffff) + body
+
+    def element_chunks(element):
+        attributes = b"".join(attribute(key, value) for key, value in element.attrib.items())
+        start = struct.pack("<IIHHHHHH", 0xffffffff, index[element.tag], 20, 20, len(element.attrib), 0, 0, 0)
+        end = struct.pack("<II", 0xffffffff, index[element.tag])
+        return (node(0x0102, start + attributes) + b"".join(element_chunks(child) for child in element)
+                + node(0x0103, end))
+
+    resource_map = struct.pack(f"<HHI{len(android_names)}I", 0x0180, 8, 8 + 4 * len(android_names),
+                               *(RESOURCE_IDS[name] for name in android_names))
+    body = (_string_pool(strings, utf8) + resource_map + node(0x0100, struct.pack("<II", prefix, uri))
+            + element_chunks(root) + node(0x0101, struct.pack("<II", prefix, uri)))
+    return struct.pack("<HHI", 0x0003, 8, 8 + len(body)) + body
+
+
+def write_apk(path, manifest):
+    with zipfile.ZipFile(path, "w") as apk:
+        apk.writestr("AndroidManifest.xml", manifest)
+        apk.writestr("classes.dex", b"dex\n035\0" + bytes(100))
+    return str(path)
+
+
+EXPECTED = {"versionCode": 30401, "versionName": "3.4.1", "compileSdkVersion": 34,
+            "package": "org.example.notes", "platformBuildVersionCode": 34}
+
+
+@pytest.mark.parametrize("utf8", [False, True])
+def test_parse_manifest_reads_only_the_manifest_element(utf8):
+    assert parse_manifest(compile_manifest(MANIFEST, utf8)) == EXPECTED
+
+
+def test_parse_manifest_with_stripped_attribute_names():
+    # Obfuscators blank android: names; the resource map still identifies the version fields
+    attributes = parse_manifest(compile_manifest(MANIFEST, strip_names=True))
+    assert attributes["versionCode"] == 30401
+    assert attributes["versionName"] == "3.4.1"
+    assert attributes["package"] == "org.example.notes"
+
+
+def test_parse_manifest_rejects_other_data():
+    with pytest.raises(ApkMetadataError):
+        parse_manifest(b"<manifest/>")
+    with pytest.raises(ApkMetadataError):
+        parse_manifest(compile_manifest(MANIFEST)[:8])
+
+
+def test_read_apk_info_combines_version_code_major(tmp_path):
+    manifest = MANIFEST.replace('android:versionCode="30401"',
+                                'android:versionCode="30401" android:versionCodeMajor="2"')
+    path = write_apk(tmp_path / "notes.apk", compile_manifest(manifest))
+    info = read_apk_info(path)
+    assert (info.package, info.version_code, info.version_name, info.split) == \
+        ("org.example.notes", (2 << 32) | 30401, "3.4.1", None)
+    with open(path, "rb") as f:
+        assert info.sha256 == hashlib.sha256(f.read()).hexdigest()
+
+
+def test_read_apk_info_without_manifest(tmp_path):
+    path = tmp_path / "broken.apk"
+    with zipfile.ZipFile(path, "w") as apk:
+        apk.writestr("classes.dex", b"")
+    with pytest.raises(ApkMetadataError, match="broken.apk"):
+        read_apk_info(str(path))
+
+
+def test_cache_picks_the_base_of_a_split_set(tmp_path):
+    split = MANIFEST.replace('package="org.example.notes"', 'package="org.example.notes" split="config.arm64_v8a"')
+    base = write_apk(tmp_path / "base.apk", compile_manifest(MANIFEST))
+    config = write_apk(tmp_path / "split_config.apk", compile_manifest(split))
+    cache = ApkMetadataCache(str(tmp_path / "cache.json"))
+    assert cache.base_info([config, base]).sha256 == read_apk_info(base).sha256
+    # A new cache instance answers from the file without parsing again
+    assert ApkMetadataCache(str(tmp_path / "cache.json"))._by_hash == cache._by_hash
+
+
+class FakeClient:
+    def __init__(self, output):
+        self.output = output
+        self.commands = []
+
+    def shell(self, cmd, serial=None):
+        self.commands.append(cmd)
+        return self.output
+
+
+def test_remote_sha256():
+    digest = "ab" * 32
+    client = FakeClient(f"{digest.upper()}  /data/app/org.example.notes-1/base.apk\n")
+    assert remote_sha256(client, "/data/app/org.example.notes-1/base.apk") == digest
+    assert client.commands == ["sha256sum /data/app/org.example.notes-1/base.apk 2>/dev/null"]
+    # No sha256sum on the device: the caller installs rather than skipping
+    assert remote_sha256(FakeClient(""), "/data/app/base.apk") is None
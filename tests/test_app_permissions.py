@@ -0,0 +1,187 @@
+import pytest
+
+from app_permissions import (PermissionChange, apply_matrix, parse_matrix, parse_permissions,
+                             plan_changes)
+from shell_session import ShellResult
+
+# Trimmed from `dumpsys package com.example.notes` on Android 13 with a work profile (user 10)
+NOTES_DUMP = """\
+Activity Resolver Table:
+  Non-Data Actions:
+      android.intent.action.MAIN:
+        5d2c7e1 com.example.notes/.MainActivity filter 9a0b3f4
+          Action: "android.intent.action.MAIN"
+          Category: "android.intent.category.LAUNCHER"
+
+Permissions:
+  Permission [com.example.notes.permission.C2D_MESSAGE] (3f1a2b7):
+    sourcePackage=com.example.notes
+    uid=10234 gids=null type=0 prot=signature
+    perm=PermissionInfo{8e21c0d com.example.notes.permission.C2D_MESSAGE}
+
+Key Set Manager:
+  [com.example.notes]
+      Signing KeySets: 57
+
+Packages:
+  Package [com.example.notes] (8c1d2e3):
+    userId=10234
+    pkg=Package{f00ba42 com.example.notes}
+    codePath=/data/app/~~Qw1xZ9==/com.example.notes-Ab3kL0==
+    versionCode=30401 minSdk=21 targetSdk=33
+    versionName=3.4.1
+    flags=[ HAS_CODE ALLOW_CLEAR_USER_DATA ALLOW_BACKUP ]
+    declared permissions:
+      com.example.notes.permission.C2D_MESSAGE: prot=signature, INSTALLED
+    requested permissions:
+      android.permission.INTERNET
+      android.permission.ACCESS_NETWORK_STATE
+      android.permission.CAMERA
+      android.permission.ACCESS_FINE_LOCATION
+      android.permission.POST_NOTIFICATIONS
+      com.example.notes.permission.C2D_MESSAGE
+    install permissions:
+      com.example.notes.permission.C2D_MESSAGE: granted=true
+      android.permission.INTERNET: granted=true
+      android.permission.ACCESS_NETWORK_STATE: granted=true
+    User 0: ceDataInode=131074 installed=true hidden=false suspended=false distractionFlags=0 stopped=false notLaunched=false enabled=0 instant=false virtual=false
+      gids=[3003]
+      runtime permissions:
+        android.permission.POST_NOTIFICATIONS: granted=false, flags=[ USER_SENSITIVE_WHEN_GRANTED|USER_SENSITIVE_WHEN_DENIED]
+        android.permission.ACCESS_FINE_LOCATION: granted=true, flags=[ USER_SET|USER_SENSITIVE_WHEN_GRANTED|USER_SENSITIVE_WHEN_DENIED]
+        android.permission.CAMERA: granted=true, flags=[ USER_SET|USER_SENSITIVE_WHEN_GRANTED|USER_SENSITIVE_WHEN_DENIED]
+      enabledComponents:
+        com.example.notes.SyncService
+    User 10: ceDataInode=0 installed=true hidden=false suspended=false distractionFlags=0 stopped=true notLaunched=true enabled=0 instant=false virtual=false
+      gids=[3003]
+      runtime permissions:
+        android.permission.POST_NOTIFICATIONS: granted=true, flags=[ USER_SET|USER_SENSITIVE_WHEN_GRANTED|USER_SENSITIVE_WHEN_DENIED]
+        android.permission.ACCESS_FINE_LOCATION: granted=false, flags=[ USER_SENSITIVE_WHEN_GRANTED|USER_SENSITIVE_WHEN_DENIED]
+        android.permission.CAMERA: granted=false, flags=[ USER_SENSITIVE_WHEN_GRANTED|USER_SENSITIVE_WHEN_DENIED]
+
+Queries:
+  system apps queryable: false
+"""
+
+# An updated system app: the factory copy is listed again under "Hidden system packages"
+CHROME_DUMP = """\
+Packages:
+  Package [com.android.chrome] (2b7e9d1):
+    userId=10120
+    codePath=/data/app/~~Zk2==/com.android.chrome-Yq8==
+    versionCode=612814733 minSdk=29 targetSdk=33
+    requested permissions:
+      android.permission.INTERNET
+      android.permission.CAMERA
+      android.permission.RECORD_AUDIO
+    install permissions:
+      android.permission.INTERNET: granted=true
+    User 0: ceDataInode=262211 installed=true hidden=false suspended=false distractionFlags=0 stopped=false notLaunched=false enabled=0 instant=false virtual=false
+      gids=[3003]
+      runtime permissions:
+        android.permission.RECORD_AUDIO: granted=false, flags=[ USER_SET|USER_FIXED]
+        android.permission.CAMERA: granted=false, flags=[ USER_SET]
+
+Hidden system packages:
+  Package [com.android.chrome] (c4a1f08):
+    userId=10120
+    codePath=/product/app/Chrome
+    versionCode=559012833 minSdk=29 targetSdk=31
+    requested permissions:
+      android.permission.INTERNET
+      android.permission.CAMERA
+      android.permission.READ_EXTERNAL_STORAGE
+    install permissions:
+      android.permission.INTERNET: granted=true
+    User 0: ceDataInode=0 installed=true hidden=false suspended=false distractionFlags=0 stopped=false notLaunched=false enabled=0 instant=false virtual=false
+      runtime permissions:
+        android.permission.CAMERA: granted=true, flags=[ GRANTED_BY_DEFAULT]
+        android.permission.READ_EXTERNAL_STORAGE: granted=true, flags=[ GRANTED_BY_DEFAULT]
+"""
+
+
+def test_install_and_runtime_permissions():
+    state = parse_permissions(NOTES_DUMP)["com.example.notes"]
+    assert state.requested == {
+        "android.permission.INTERNET", "android.permission.ACCESS_NETWORK_STATE", "android.permission.CAMERA",
+        "android.permission.ACCESS_FINE_LOCATION", "android.permission.POST_NOTIFICATIONS",
+        "com.example.notes.permission.C2D_MESSAGE"}
+    assert state.install_granted == {"android.permission.INTERNET", "android.permission.ACCESS_NETWORK_STATE",
+                                     "com.example.notes.permission.C2D_MESSAGE"}
+    assert state.runtime_granted == {"android.permission.ACCESS_FINE_LOCATION", "android.permission.CAMERA"}
+    assert state.runtime_denied == {"android.permission.POST_NOTIFICATIONS"}
+
+
+def test_runtime_permissions_of_another_user():
+    state = parse_permissions(NOTES_DUMP, user=10)["com.example.notes"]
+    assert state.runtime_granted == {"android.permission.POST_NOTIFICATIONS"}
+    assert state.runtime_denied == {"android.permission.ACCESS_FINE_LOCATION", "android.permission.CAMERA"}
+    # Install-time permissions are shared by all users
+    assert "android.permission.INTERNET" in state.install_granted
+
+
+def test_only_the_packages_section_counts():
+    states = parse_permissions(NOTES_DUMP)
+    assert list(states) == ["com.example.notes"]
+
+
+def test_hidden_system_package_is_skipped():
+    state = parse_permissions(CHROME_DUMP)["com.android.chrome"]
+    assert state.runtime_granted == set()
+    assert state.runtime_denied == {"android.permission.RECORD_AUDIO", "android.permission.CAMERA"}
+    assert "android.permission.READ_EXTERNAL_STORAGE" not in state.requested
+
+
+def test_parse_matrix():
+    text = "# package permission action\ncom.example.notes, android.permission.CAMERA, revoke\n\n" \
+           "com.example.notes\tandroid.permission.POST_NOTIFICATIONS\tGRANT  # onboarding\n"
+    assert parse_matrix(text) == [
+        PermissionChange("com.example.notes", "android.permission.CAMERA", False),
+        PermissionChange("com.example.notes", "android.permission.POST_NOTIFICATIONS", True)]
+    with pytest.raises(ValueError, match="Line 2"):
+        parse_matrix("a b grant\na b\n")
+
+
+def test_parse_matrix_rejects_duplicate_pairs():
+    with pytest.raises(ValueError, match="Line 3: .* already set on line 1"):
+        parse_matrix("a.b CAMERA grant\na.b LOCATION grant\na.b CAMERA revoke\n")
+
+
+class FakeSession:
+    def __init__(self, dumps):
+        self.dumps = dumps
+        self.commands = []
+
+    def run_many(self, cmds):
+        self.commands.append(cmds)
+        results = []
+        for cmd in cmds:
+            if cmd.startswith("dumpsys package "):
+                results.append(ShellResult(self.dumps.get(cmd.split()[-1], ""), 0))
+            elif "unknown.app" in cmd:
+                results.append(ShellResult("Exception occurred while executing 'grant':\n"
+                                           "java.lang.IllegalArgumentException: Unknown package: unknown.app", 255))
+            else:
+                results.append(ShellResult("", 0))
+        return results
+
+
+def test_apply_matrix_reports_every_item_in_order():
+    session = FakeSession({"com.example.notes": NOTES_DUMP})
+    changes = [
+        PermissionChange("com.example.notes", "android.permission.CAMERA", True),
+        PermissionChange("unknown.app", "android.permission.CAMERA", True),
+        PermissionChange("com.example.notes", "android.permission.POST_NOTIFICATIONS", True),
+        PermissionChange("com.example.notes", "android.permission.CAMERA", False),
+    ]
+    to_send, already = plan_changes(parse_permissions(NOTES_DUMP), changes)
+    assert already == [changes[0]]
+    results = apply_matrix(session, changes)
+    assert [(result.package, result.permission, result.grant, result.ok) for result in results] == [
+        (change.package, change.permission, change.grant, ok) for change, ok in zip(changes, (True, False, True, True))]
+    assert results[0].message == "unchanged"
+    assert "Unknown package" in results[1].message
+    assert session.commands[1] == [
+        "pm grant unknown.app android.permission.CAMERA",
+        "pm grant com.example.notes android.permission.POST_NOTIFICATIONS",
+        "pm revoke com.example.notes android.permission.CAMERA"]
@@ -0,0 +1,138 @@
+import os
+import socket
+import subprocess
+import threading
+
+import pytest
+
+from adb_client import AdbClient, AdbError
+from chunked_pull import DD_BLOCK, _verified_dd_command, plan_chunks, pull_large
+from fake_adb import FakeAdbServer
+
+CHUNK = DD_BLOCK
+DATA = os.urandom(4 * CHUNK + 1234)
+
+
+def local_exec(corrupt=None):
+    """Handler running exec: commands with the local sh; corrupt(command) can flip a byte."""
+    def handler(request, sock):
+        if request.startswith("host:transport"):
+            sock.sendall(b"OKAY")
+            return True
+        command = request[len("exec:"):]
+        proc = subprocess.Popen(["sh", "-c", command], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        sock.sendall(b"OKAY")
+
+        def feed():
+            try:
+                for data in iter(lambda: sock.recv(65536), b""):
+                    proc.stdin.write(data)
+                    proc.stdin.flush()
+            except OSError:
+                pass
+            finally:
+                try:
+                    proc.stdin.close()
+                except OSError:
+                    pass
+
+        threading.Thread(target=feed, daemon=True).start()
+        flip = corrupt is not None and corrupt(command)
+        try:
+            for data in iter(lambda: proc.stdout.read1(65536), b""):
+                if flip:
+                    data = bytes([data[0] ^ 0xff]) + data[1:]
+                    flip = False
+                sock.sendall(data)
+        except OSError:
+            proc.kill()
+        proc.wait()
+        # Wakes feed() too; a recv blocked on another thread keeps close() from sending FIN
+        sock.shutdown(socket.SHUT_RDWR)
+        return False
+    return handler
+
+
+@pytest.fixture
+def remote(tmp_path):
+    path = tmp_path / "remote.bin"
+    path.write_bytes(DATA)
+    return str(path)
+
+
+def pull(handler, remote, local, **kwargs):
+    server = FakeAdbServer(handler)
+    try:
+        return pull_large(AdbClient(port=server.port, timeout=5), remote, local,
+                          streams=2, chunk_size=CHUNK, **kwargs)
+    finally:
+        server.close()
+
+
+def test_plan_chunks():
+    assert plan_chunks(0, CHUNK) == [(0, 0, 0)]
+    assert plan_chunks(CHUNK, CHUNK) == [(0, 0, CHUNK)]
+    assert plan_chunks(2 * CHUNK + 5, CHUNK) == [(0, 0, CHUNK), (1, CHUNK, CHUNK), (2, 2 * CHUNK, 5)]
+    assert plan_chunks(2 * CHUNK + 5, CHUNK, {0: "x", 2: "y"}) == [(1, CHUNK, CHUNK)]
+
+
+def test_verified_command_puts_the_hash_after_the_data(remote):
+    output = subprocess.run(["sh", "-c", _verified_dd_command(remote, CHUNK, CHUNK)],
+                            capture_output=True, check=True).stdout
+    assert output[:CHUNK] == DATA[CHUNK:2 * CHUNK]
+    assert output[CHUNK:].split()[0] == subprocess.run(
+        ["md5sum"], input=DATA[CHUNK:2 * CHUNK], capture_output=True).stdout.split()[0]
+
+
+def test_pull_in_chunks(remote, tmp_path):
+    local = str(tmp_path / "out" / "local.bin")
+    result = pull(local_exec(), remote, local)
+    with open(local, "rb") as f:
+        assert f.read() == DATA
+    assert result["size"] == result["bytes"] == len(DATA)
+    assert result["resumed"] == result["retries"] == 0
+    assert os.path.getmtime(local) == int(os.path.getmtime(remote))
+    assert not os.path.exists(local + ".part") and not os.path.exists(local + ".part.json")
+
+
+def test_resume_after_cancel(remote, tmp_path):
+    local = str(tmp_path / "local.bin")
+    cancel = threading.Event()
+
+    def progress(done, total, elapsed, rates):
+        if done >= 2 * CHUNK:
+            cancel.set()
+
+    with pytest.raises(AdbError, match="resume"):
+        pull(local_exec(), remote, local, progress=progress, cancel_event=cancel)
+    assert os.path.exists(local + ".part.json") and not os.path.exists(local)
+
+    result = pull(local_exec(), remote, local)
+    with open(local, "rb") as f:
+        assert f.read() == DATA
+    assert result["resumed"] > 0
+    assert result["resumed"] + result["bytes"] == len(DATA)
+
+
+def test_mismatch_retries_the_chunk(remote, tmp_path):
+    local = str(tmp_path / "local.bin")
+    attempts = []
+
+    def corrupt(command):
+        if "skip=2 " not in command:
+            return False
+        attempts.append(command)
+        return len(attempts) == 1
+
+    result = pull(local_exec(corrupt), remote, local)
+    with open(local, "rb") as f:
+        assert f.read() == DATA
+    assert result["retries"] == 1
+    assert len(attempts) == 2
+
+
+def test_persistent_mismatch_gives_up(remote, tmp_path):
+    local = str(tmp_path / "local.bin")
+    with pytest.raises(AdbError, match="checksum mismatch"):
+        pull(local_exec(lambda command: "skip=1 " in command), remote, local)
+    assert not os.path.exists(local)
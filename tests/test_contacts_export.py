@@ -0,0 +1,59 @@
+import threading
+
+import pytest
+
+from adb_client import AdbError
+from contacts_export import export_rows
+
+
+class FakeConnection:
+    def __init__(self, chunks, cancel_event=None):
+        self.chunks = chunks
+        self.cancel_event = cancel_event
+
+    def iter_chunks(self):
+        for chunk in self.chunks:
+            yield chunk
+        if self.cancel_event is not None:
+            # Cancel while the query is still streaming
+            self.cancel_event.set()
+            yield b"Row: 99 _id=99, display_name=Late\n"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+class FakeClient:
+    def __init__(self, rows, cancel_event=None):
+        self.rows = rows
+        self.cancel_event = cancel_event
+
+    def open_service(self, service, serial=None):
+        lines = "".join(f"Row: {index} _id={row_id}, display_name={name}\n"
+                        for index, (row_id, name) in enumerate(self.rows))
+        return FakeConnection([lines.encode("utf-8")], self.cancel_event)
+
+
+def test_full_export(tmp_path):
+    path = str(tmp_path / "contacts.csv")
+    result = export_rows(FakeClient([(1, "Ann"), (2, "Bob, Jr.")]), path, columns=("_id", "display_name"))
+    assert result["rows"] == 2
+    with open(path, encoding="utf-8") as f:
+        assert f.read().splitlines() == ["_id,display_name", "1,Ann", '2,"Bob, Jr."']
+
+
+def test_failed_full_export_keeps_previous_file(tmp_path):
+    path = str(tmp_path / "contacts.csv")
+    export_rows(FakeClient([(1, "Ann")]), path, columns=("_id", "display_name"))
+    with open(path, encoding="utf-8") as f:
+        previous = f.read()
+    cancel_event = threading.Event()
+    with pytest.raises(AdbError):
+        export_rows(FakeClient([(1, "Ann"), (2, "Bob")], cancel_event), path, columns=("_id", "display_name"),
+                    cancel_event=cancel_event)
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == previous
+    assert not (tmp_path / "contacts.csv.tmp").exists()
@@ -0,0 +1,53 @@
+from device_props import PropertyStore
+
+
+class FakeClient:
+    def __init__(self):
+        self.boot_id = "boot-1"
+        self.uptime = 100.0
+        self.model = "Pixel"
+        self.commands = []
+
+    def shell(self, cmd, serial=None):
+        self.commands.append(cmd)
+        boot = f"{self.boot_id}\n{self.uptime} 50.0\n"
+        if cmd.startswith("getprop"):
+            return f"[ro.product.model]: [{self.model}]\n--adb-toolkit-boot--\n{boot}"
+        return boot
+
+
+def test_get_serves_cache_until_verify_after():
+    client = FakeClient()
+    store = PropertyStore(client, ttl=300.0, verify_after=30.0)
+    assert store.get("A").model == "Pixel"
+    client.model = "Other"
+    assert store.get("A").model == "Pixel"
+    assert len(client.commands) == 1
+
+
+def test_get_refetches_after_reboot():
+    client = FakeClient()
+    store = PropertyStore(client, ttl=300.0, verify_after=0.0)
+    rebooted = []
+    store.add_reboot_listener(rebooted.append)
+    store.get("A")
+    client.model = "Other"
+    # Same boot: the probe confirms the cache
+    assert store.get("A").model == "Pixel"
+    client.boot_id = "boot-2"
+    assert store.get("A").model == "Other"
+    assert rebooted == ["A"]
+
+
+def test_update_notifies_on_reboot():
+    client = FakeClient()
+    store = PropertyStore(client)
+    rebooted = []
+    store.add_reboot_listener(rebooted.append)
+    store.fetch("A")
+    client.uptime = 200.0
+    store.fetch("A")
+    assert rebooted == []
+    client.boot_id = "boot-2"
+    store.fetch("A")
+    assert rebooted == ["A"]
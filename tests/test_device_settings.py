@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+from device_settings import diff, load_profile, parse_settings_list
+
+
+def write_profile(tmp_path, profile):
+    path = tmp_path / "profile.json"
+    path.write_text(json.dumps(profile), encoding="utf-8")
+    return str(path)
+
+
+def test_load_profile_values(tmp_path):
+    path = write_profile(tmp_path, {"global": {"adb_enabled": True, "wifi_on": False, "timeout": 30,
+                                               "name": "lab", "gone": None}})
+    assert load_profile(path) == {"global": {"adb_enabled": "1", "wifi_on": "0", "timeout": "30",
+                                             "name": "lab", "gone": None}}
+
+
+@pytest.mark.parametrize("profile", [
+    {"global": "adb_enabled=1"},
+    {"secure": ["a", "b"]},
+    {"system": None},
+    ["global"],
+    {"vendor": {}},
+])
+def test_load_profile_rejects_bad_shapes(tmp_path, profile):
+    with pytest.raises(ValueError):
+        load_profile(write_profile(tmp_path, profile))
+
+
+def test_diff_only_reports_changes():
+    current = {"global": parse_settings_list("adb_enabled=1\nbanner=line one\nline two\n")}
+    profile = {"global": {"adb_enabled": "1", "banner": None, "stay_on": "3"}}
+    assert [(change.key, change.old, change.new) for change in diff(current, profile)] == [
+        ("banner", "line one\nline two", None), ("stay_on", None, "3")]
@@ -0,0 +1,77 @@
+import pytest
+
+from device_props import PropertyStore
+from device_snapshot import primary_ipv4, take_snapshot
+
+OUTPUTS = {
+    "interfaces": ("1: lo: <LOOPBACK,UP> mtu 65536 state UNKNOWN\n    inet 127.0.0.1/8 scope host lo\n"
+                   "2: wlan0: <BROADCAST,UP> mtu 1500 state UP\n    link/ether 02:00:00:00:00:01 brd ff:ff:ff:ff:ff:ff\n"
+                   "    inet 192.168.1.23/24 brd 192.168.1.255 scope global wlan0\n"),
+    "sockets": "tcp        0      0 0.0.0.0:5555   0.0.0.0:*   LISTEN      123/adbd\n",
+    "battery": "Current Battery Service state:\n  level: 87\n  temperature: 301\n",
+    "boot": "0b1e2c3d-boot\n1234.56 4000.00\n",
+    "props": "[ro.product.model]: [Pixel 7]\n[ro.build.version.sdk]: [34]\n",
+}
+
+
+class FakeConnection:
+    def __init__(self, data):
+        self.data = data
+
+    def iter_chunks(self):
+        # Small chunks so sections and lines straddle chunk boundaries
+        for offset in range(0, len(self.data), 13):
+            yield self.data[offset:offset + 13]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+class FakeClient:
+    def __init__(self):
+        self.services = []
+
+    def open_service(self, service, serial=None):
+        self.services.append(service)
+        output = ""
+        for part in service[len("exec:"):].split("; "):
+            if part.startswith("echo "):
+                name = part.split()[-1]
+                output += f"{part[len('echo '):]}\n{OUTPUTS[name]}"
+        return FakeConnection(output.encode("utf-8"))
+
+
+def test_full_snapshot_updates_properties():
+    client = FakeClient()
+    store = PropertyStore(client)
+    snapshot = take_snapshot(client, "A", store)
+    assert primary_ipv4(snapshot) == "192.168.1.23"
+    assert snapshot.interfaces[1].mac == "02:00:00:00:00:01"
+    assert snapshot.sockets[0].program == "adbd"
+    assert snapshot.battery["level"] == "87"
+    assert (snapshot.props.model, snapshot.props.boot_id, snapshot.props.uptime) == ("Pixel 7", "0b1e2c3d-boot", 1234.56)
+    assert store.peek("A") is snapshot.props
+
+
+def test_interfaces_only():
+    client = FakeClient()
+    store = PropertyStore(client)
+    snapshot = take_snapshot(client, "A", store, sections=("interfaces",))
+    assert primary_ipv4(snapshot) == "192.168.1.23"
+    assert "getprop" not in client.services[0] and "netstat" not in client.services[0]
+    assert snapshot.sockets == [] and snapshot.battery == {}
+    assert store.peek("A") is None
+
+
+def test_props_always_come_with_the_boot_id():
+    client = FakeClient()
+    snapshot = take_snapshot(client, sections=("props",))
+    assert snapshot.props.boot_id == "0b1e2c3d-boot"
+
+
+def test_unknown_section():
+    with pytest.raises(ValueError):
+        take_snapshot(FakeClient(), sections=("wifi",))
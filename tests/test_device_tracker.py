@@ -0,0 +1,49 @@
+import threading
+
+from adb_client import AdbClient
+from device_tracker import ATTACHED, CHANGED, DETACHED, DeviceTracker
+from fake_adb import FakeAdbServer
+
+UPDATES = [
+    "A device usb:1-1\n",
+    "A device usb:1-1\nB offline\n",
+    "A device usb:1-1\nB device\n",
+    "B device\n",
+]
+
+
+def test_track_devices_frames_and_listeners():
+    release = threading.Event()
+
+    def handle(request, sock):
+        if request == "host:track-devices-l":
+            sock.sendall(b"OKAY")
+            for update in UPDATES:
+                # Each update is a separate length-prefixed block, like the server sends
+                sock.sendall(b"%04x" % len(update) + update.encode())
+            release.wait(5)
+        return False
+
+    server = FakeAdbServer(handle)
+    tracker = DeviceTracker(AdbClient(port=server.port, timeout=5))
+    events = []
+    done = threading.Event()
+
+    def listener(event, info):
+        events.append((event, info["serial"], info["state"]))
+        if len(events) == len(UPDATES):
+            done.set()
+
+    tracker.add_listener(listener)
+    tracker.start()
+    try:
+        assert done.wait(5)
+        assert events == [(ATTACHED, "A", "device"), (ATTACHED, "B", "offline"), (CHANGED, "B", "device"),
+                          (DETACHED, "A", "device")]
+        assert tracker.ready() == ["B"]
+        assert tracker.get("A") is None
+        assert tracker.wait_for("B", timeout=1) == "B"
+    finally:
+        tracker.stop()
+        release.set()
+        server.close()
@@ -0,0 +1,63 @@
+import os
+
+import pytest
+
+from adb_client import AdbError
+from dir_sync import is_protected, md5_file, plan, remote_tree, sync_dir
+from shell_session import ShellSession
+
+
+@pytest.fixture
+def session():
+    session = ShellSession.local()
+    yield session
+    session.close()
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def test_plan():
+    source = {"same": (1, 1, "a"), "changed": (2, 1, "b"), "new": (3, 1, "c"), "unhashed": (4, 1, "d")}
+    target = {"same": (1, 5, "a"), "changed": (2, 1, "x"), "unhashed": (4, 1, None), "extra": (5, 1, "e")}
+    assert plan(source, target) == (["changed", "new", "unhashed"], ["extra"])
+    assert plan({}, target) == ([], ["changed", "extra", "same", "unhashed"])
+
+
+def test_remote_tree_hashes_only_changed_files(session, tmp_path):
+    root = tmp_path / "remote"
+    write(str(root / "a.txt"), b"alpha")
+    write(str(root / "sub dir" / "b c.txt"), b"beta")
+    unchanged = write(str(root / "kept.bin"), b"kept")
+    st = os.stat(unchanged)
+    known = {"kept.bin": (st.st_size, int(st.st_mtime), "cached"), "a.txt": (5, 0, "stale")}
+    tree = remote_tree(session, str(root), known)
+    assert tree == {
+        "a.txt": (5, int(os.stat(root / "a.txt").st_mtime), md5_file(str(root / "a.txt"))),
+        "sub dir/b c.txt": (4, int(os.stat(root / "sub dir" / "b c.txt").st_mtime),
+                            md5_file(str(root / "sub dir" / "b c.txt"))),
+        "kept.bin": (st.st_size, int(st.st_mtime), "cached"),
+    }
+
+
+def test_remote_tree_missing_folder(session, tmp_path):
+    assert remote_tree(session, str(tmp_path / "absent"), {}) is None
+
+
+@pytest.mark.parametrize("path", ["/", "/sdcard", "/sdcard/", "sdcard", "//storage/emulated/0/", "/sdcard/."])
+def test_storage_roots_are_protected(path):
+    assert is_protected(path)
+
+
+@pytest.mark.parametrize("path", ["/sdcard/test-data", "/sdcard/DCIM/", "/data/local/tmp/sync"])
+def test_subfolders_are_not_protected(path):
+    assert not is_protected(path)
+
+
+def test_sync_refuses_delete_on_storage_root(tmp_path):
+    with pytest.raises(AdbError, match="/sdcard/"):
+        sync_dir(None, str(tmp_path), "/sdcard/", "push", delete=True)
@@ -0,0 +1,33 @@
+import time
+
+from PIL import Image
+
+import frame_sampler
+from frame_sampler import FrameSampler, frame_image
+
+
+def test_frames_are_stored_compact_and_errors_clear(monkeypatch):
+    screen = Image.new("RGBA", (1440, 2560), (30, 120, 200, 255))
+    calls = []
+
+    def capture(client, serial=None):
+        calls.append(serial)
+        if len(calls) == 1:
+            raise OSError("device busy")
+        return screen
+
+    monkeypatch.setattr(frame_sampler.screen_capture, "capture", capture)
+    sampler = FrameSampler(None, capacity=4)
+    sampler.start()
+    deadline = time.monotonic() + 5
+    while sampler.latest() is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    sampler.stop()
+
+    frame = sampler.latest()
+    assert frame is not None and sampler.error is None
+    assert frame.size == (720, 1280)
+    assert len(frame.data) < 720 * 1280 * 3 // 20
+    image = frame_image(frame)
+    assert (image.size, image.mode) == ((720, 1280), "RGB")
+    assert all(abs(a - b) <= 2 for a, b in zip(image.getpixel((10, 10)), (30, 120, 200)))
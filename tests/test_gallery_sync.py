@@ -0,0 +1,85 @@
+import json
+import os
+import stat
+
+import pytest
+
+from adb_client import AdbClient
+from adb_sync import SyncEntry
+from fake_adb import FakeAdbServer, FakeSyncService, device_handler
+from gallery_sync import CAMERA_FOLDER, MANIFEST_NAME, plan_sync, sync_folder
+
+MTIME = FakeSyncService.MTIME
+
+
+@pytest.fixture
+def device():
+    files = {CAMERA_FOLDER + "IMG_0001.jpg": b"\xff\xd8one" * 5000,
+             CAMERA_FOLDER + "IMG_0002.JPG": b"\xff\xd8two" * 20000,
+             CAMERA_FOLDER + "VID_0003.mp4": b"video",
+             CAMERA_FOLDER + "Screenshot.png": b"\x89PNG" * 100}
+    service = FakeSyncService(files)
+    server = FakeAdbServer(device_handler({"sync:": service}))
+    yield AdbClient(port=server.port, timeout=5), service
+    server.close()
+
+
+def write(path, data, mtime=None):
+    with open(path, "wb") as f:
+        f.write(data)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def entry(name, size, mtime=MTIME, mode=stat.S_IFREG | 0o644):
+    return SyncEntry(name, mode, size, mtime)
+
+
+def test_plan_sync(tmp_path):
+    write(tmp_path / "known.jpg", b"12345")
+    write(tmp_path / "stale.jpg", b"12345")
+    write(tmp_path / "unlisted.jpg", b"12345", MTIME)
+    write(tmp_path / "touched.jpg", b"12345", MTIME + 60)
+    manifest = {"known.jpg": [5, MTIME], "stale.jpg": [5, MTIME - 1], "gone.jpg": [5, MTIME]}
+    entries = [entry("known.jpg", 5), entry("stale.jpg", 5), entry("unlisted.jpg", 5), entry("touched.jpg", 5),
+               entry("gone.jpg", 5), entry("new.png", 9), entry("clip.mp4", 9),
+               entry(".thumbnails", 0, mode=stat.S_IFDIR | 0o755)]
+    to_pull, up_to_date = plan_sync(entries, manifest, str(tmp_path))
+    assert [e.name for e in to_pull] == ["stale.jpg", "touched.jpg", "gone.jpg", "new.png"]
+    assert [e.name for e in up_to_date] == ["known.jpg", "unlisted.jpg"]
+
+
+def test_second_run_skips_unchanged_files(device, tmp_path):
+    client, service = device
+    first = sync_folder(client, str(tmp_path), workers=2)
+    assert (first["pulled"], first["skipped"], first["failed"]) == (3, 0, 0)
+    for name in ("IMG_0001.jpg", "IMG_0002.JPG", "Screenshot.png"):
+        with open(tmp_path / name, "rb") as f:
+            assert f.read() == service.files[CAMERA_FOLDER + name]
+        assert os.path.getmtime(tmp_path / name) == MTIME
+    assert not os.path.exists(tmp_path / "VID_0003.mp4")
+
+    service.received.clear()
+    service.files[CAMERA_FOLDER + "IMG_0002.JPG"] += b"edited"
+    second = sync_folder(client, str(tmp_path))
+    assert (second["pulled"], second["skipped"], second["failed"]) == (1, 2, 0)
+    assert service.received == [CAMERA_FOLDER + "IMG_0002.JPG"]
+
+
+def test_resume_after_an_interrupted_run(device, tmp_path):
+    client, service = device
+    # The previous run finished IMG_0001 but was killed before saving the manifest,
+    # and left IMG_0002 half written
+    write(tmp_path / "IMG_0001.jpg", service.files[CAMERA_FOLDER + "IMG_0001.jpg"], MTIME)
+    write(tmp_path / "IMG_0002.JPG.part", service.files[CAMERA_FOLDER + "IMG_0002.JPG"][:1000])
+    result = sync_folder(client, str(tmp_path))
+    assert (result["pulled"], result["skipped"]) == (2, 1)
+    assert sorted(service.received) == [CAMERA_FOLDER + "IMG_0002.JPG", CAMERA_FOLDER + "Screenshot.png"]
+    with open(tmp_path / "IMG_0002.JPG", "rb") as f:
+        assert f.read() == service.files[CAMERA_FOLDER + "IMG_0002.JPG"]
+    assert not os.path.exists(tmp_path / "IMG_0002.JPG.part")
+    with open(tmp_path / MANIFEST_NAME, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert manifest == {name: [len(service.files[CAMERA_FOLDER + name]), MTIME]
+                        for name in ("IMG_0001.jpg", "IMG_0002.JPG", "Screenshot.png")}
+
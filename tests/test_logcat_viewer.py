@@ -0,0 +1,46 @@
+import struct
+
+from logcat_viewer import BinaryLogParser, TextLogParser
+
+
+def record(priority, tag, message, pid=100, tid=101, sec=1700000000, nsec=123000000, extra=b""):
+    payload = bytes([priority]) + tag.encode() + b"\0" + message.encode() + b"\0"
+    # v1 headers have padding where later versions store hdr_size
+    hdr_size = 20 + len(extra) if extra else 0
+    return struct.pack("<HHiIII", len(payload), hdr_size, pid, tid, sec, nsec) + extra + payload
+
+
+def test_v1_header():
+    entries = BinaryLogParser().feed(record(4, "ActivityManager", "Start proc"))
+    assert len(entries) == 1
+    entry = entries[0]
+    assert (entry.pid, entry.tid, entry.priority, entry.tag, entry.message) == (
+        100, 101, 4, "ActivityManager", "Start proc")
+    assert (entry.sec, entry.nsec, entry.log_id, entry.uid) == (1700000000, 123000000, 0, 0)
+
+
+def test_v2_v3_and_v4_headers():
+    data = (record(6, "crash", "boom", extra=struct.pack("<I", 3))
+            + record(3, "net", "up", extra=struct.pack("<II", 2, 10123)))
+    first, second = BinaryLogParser().feed(data)
+    # A 24-byte header holds euid (v2) or lid (v3); neither is reported as the log id
+    assert (first.priority, first.tag, first.message, first.log_id, first.uid) == (6, "crash", "boom", 0, 0)
+    assert (second.tag, second.message, second.log_id, second.uid) == ("net", "up", 2, 10123)
+
+
+def test_records_split_across_chunks():
+    data = record(4, "a", "first") + record(5, "b", "second\n")
+    parser = BinaryLogParser()
+    entries = []
+    for offset in range(0, len(data), 7):
+        entries += parser.feed(data[offset:offset + 7])
+    assert [(entry.tag, entry.message) for entry in entries] == [("a", "first"), ("b", "second")]
+    assert not parser.buf
+
+
+def test_threadtime_text_fallback():
+    parser = TextLogParser()
+    assert parser.feed(b"01-31 12:34:56.789  1234  1250 I ActivityManager: hel") == []
+    entries = parser.feed(b"lo\r\n--------- beginning of main\n")
+    assert [(entry.pid, entry.tid, entry.priority, entry.tag, entry.message) for entry in entries] == [
+        (1234, 1250, 4, "ActivityManager", "hello")]
@@ -0,0 +1,37 @@
+from output_viewer import LineIndex
+
+
+def test_trailing_line_without_newline():
+    index = LineIndex("first\nsecond\nlast")
+    assert len(index) == 3
+    assert list(index.starts) == [0, 6, 13]
+    assert index.lines(0, 10) == ["first", "second", "last"]
+
+
+def test_trailing_newline_does_not_add_a_line():
+    index = LineIndex("first\nsecond\n")
+    assert len(index) == 2
+    assert index.line(1) == "second"
+    assert len(LineIndex("")) == 1 and LineIndex("").line(0) == ""
+    assert LineIndex("\n\n").lines(0, 5) == ["", ""]
+
+
+def test_crlf_input():
+    index = LineIndex("Package [a]:\r\n  userId=10001\r\n\r\nlast\r\n")
+    assert len(index) == 4
+    assert index.lines(0, 4) == ["Package [a]:", "  userId=10001", "", "last"]
+    assert index.line_of(len("Package [a]:\r\n  user")) == 1
+
+
+def test_visible_slice_lookup():
+    content = "".join(f"line {number}\n" for number in range(1000))
+    index = LineIndex(content)
+    assert index.lines(500, 3) == ["line 500", "line 501", "line 502"]
+    # The last page is cut at the end instead of running past it
+    assert index.lines(998, 25) == ["line 998", "line 999"]
+    assert index.lines(1000, 25) == []
+    offset = content.index("line 742")
+    assert index.line_of(offset) == 742
+    assert index.line_of(offset + 8) == 742  # the newline still belongs to its line
+    assert index.line_of(offset + 9) == 743
+    assert index.line_of(len(content) - 1) == 999
@@ -0,0 +1,74 @@
+from package_index import PackageIndex
+
+
+class FakeClient:
+    """pm of a given API level: -U needs 26, --show-versioncode needs 28.
+
+    Like AdbClient.shell over shell v2, only stdout comes back unless the command
+    redirects stderr into it.
+    """
+
+    def __init__(self, sdk):
+        self.sdk = sdk
+        self.commands = []
+
+    def shell(self, cmd, serial=None):
+        self.commands.append(cmd)
+        output = []
+        for listing in cmd.split("; "):
+            if listing.startswith("echo "):
+                output.append(listing[len("echo "):])
+                continue
+            merged = listing.endswith(" 2>&1")
+            flags = listing.replace(" 2>&1", "").split()[3:]
+            if ("-U" in flags and self.sdk < 26) or ("--show-versioncode" in flags and self.sdk < 28):
+                if merged:
+                    output.append(f"Error: Unknown option: {'-U' if self.sdk < 26 else '--show-versioncode'}")
+            elif "-d" in flags:
+                output.append("package:com.example.disabled")
+            elif "-s" in flags:
+                output.append("package:com.android.settings")
+            else:
+                lines = ["package:/system/app/Settings.apk=com.android.settings",
+                         "package:/data/app/base.apk=com.example.disabled"]
+                extra = (" versionCode:7" if "--show-versioncode" in flags else "") + (" uid:10001" if "-U" in flags else "")
+                output.extend(line + extra for line in lines)
+        return "\n".join(output) + "\n"
+
+
+def test_current_pm_lists_everything_in_one_round_trip():
+    client = FakeClient(33)
+    index = PackageIndex(client)
+    assert index.refresh()[0] == ["com.android.settings", "com.example.disabled"]
+    info = index.get("com.example.disabled")
+    assert (info.path, info.uid, info.version_code, info.enabled, info.system) == (
+        "/data/app/base.apk", 10001, 7, False, False)
+    assert len(client.commands) == 1
+
+
+def test_old_pm_falls_back_and_remembers():
+    client = FakeClient(23)
+    index = PackageIndex(client)
+    index.refresh()
+    info = index.get("com.android.settings")
+    assert (info.path, info.uid, info.version_code, info.system) == ("/system/app/Settings.apk", None, None, True)
+    assert len(client.commands) == 3
+    index.refresh_package("com.android.settings")
+    assert client.commands[-1].startswith("pm list packages -f com.android.settings 2>&1;")
+
+
+def test_api_26_keeps_uid():
+    index = PackageIndex(FakeClient(26))
+    index.refresh()
+    info = index.get("com.android.settings")
+    assert (info.uid, info.version_code) == (10001, None)
+
+
+
+def test_api_27_error_only_on_stderr_still_falls_back():
+    client = FakeClient(27)
+    index = PackageIndex(client)
+    index.refresh()
+    assert index.get("com.android.settings").uid == 10001
+    assert [command.split(";")[0] for command in client.commands] == [
+        "pm list packages -f -U --show-versioncode 2>&1", "pm list packages -f -U 2>&1"]
@@ -0,0 +1,70 @@
+from process_monitor import ProcessMonitor, parse_sample
+
+
+def stat_line(pid, name, utime, stime, start, rss, state="S"):
+    """A /proc/<pid>/stat line; fields after the name as the kernel prints them."""
+    fields = [state, 1, pid, 0, 0, -1, 4194560, 1200, 0, 3, 0, utime, stime, 0, 0, 20, 0, 12, 0,
+              start, 1500000000, rss, 18446744073709551615]
+    return f"{pid} ({name}) " + " ".join(str(field) for field in fields)
+
+
+def sample(total, *processes):
+    return "\n".join([f"cpu  {total} 0 0 0 0 0 0 0 0 0"] + [stat_line(*process) for process in processes])
+
+
+def new_monitor(cpus=1):
+    monitor = ProcessMonitor(client=None)
+    monitor._cpus = cpus
+    return monitor
+
+
+def test_parse_sample_with_parentheses_in_the_name():
+    total, columns = parse_sample(sample(1000, (42, "odd) (name", 7, 3, 500, 256),
+                                         (43, "system_server", 10, 5, 90, 4096)))
+    assert total == 1000
+    assert list(columns.pid) == [42, 43]
+    assert columns.name == ["odd) (name", "system_server"]
+    assert list(columns.ticks) == [10, 15]
+    assert list(columns.start) == [500, 90]
+    assert list(columns.rss) == [256, 4096]
+    assert columns.state == ["S", "S"]
+
+
+def test_parse_sample_skips_truncated_lines():
+    # A process that exits while cat reads it can leave a partial line
+    total, columns = parse_sample(sample(10, (42, "app", 1, 1, 5, 10)) + "\n43 (gone) S 1 43")
+    assert list(columns.pid) == [42]
+
+
+def test_cpu_percent_is_per_core():
+    monitor = new_monitor(cpus=4)
+    monitor.update(sample(1000, (42, "app", 100, 0, 500, 256), (43, "idle", 5, 0, 600, 128)))
+    samples = monitor.update(sample(1400, (42, "app", 130, 20, 500, 256), (43, "idle", 5, 0, 600, 128)))
+    # 400 jiffies over 4 cores is 100 per core; 50 ticks of one process is half a core
+    assert [round(process.cpu, 1) for process in samples] == [50.0, 0.0]
+    assert round(monitor.cpu, 1) == 12.5
+
+
+def test_reused_pid_starts_over():
+    monitor = new_monitor()
+    monitor.update(sample(1000, (42, "old", 900, 100, 500, 1000)))
+    samples = monitor.update(sample(1100, (42, "new", 5, 5, 1050, 200)))
+    assert samples[0].cpu == 0.0
+    assert samples[0].rss_delta == 0
+    assert samples[0].rss_growth == 0
+    samples = monitor.update(sample(1200, (42, "new", 15, 5, 1050, 300)))
+    assert samples[0].cpu == 10.0
+    assert samples[0].rss_delta == samples[0].rss_growth == 100 * 4
+
+
+def test_rss_growth_and_pruning_after_exit():
+    monitor = new_monitor()
+    monitor.update(sample(1000, (42, "app", 1, 1, 500, 100), (43, "worker", 1, 1, 600, 50)))
+    samples = monitor.update(sample(1100, (42, "app", 1, 1, 500, 150), (43, "worker", 1, 1, 600, 40)))
+    assert [(process.rss_delta, process.rss_growth) for process in samples] == [(200, 200), (-40, -40)]
+    monitor.update(sample(1200, (42, "app", 1, 1, 500, 175)))
+    assert monitor._first_rss == {(42, 500): 100}
+    # A later process with the same pid gets its own baseline
+    samples = monitor.update(sample(1300, (43, "worker", 1, 1, 1250, 80), (42, "app", 1, 1, 500, 175)))
+    assert samples[0].rss_growth == 0
+    assert monitor._first_rss == {(42, 500): 100, (43, 1250): 80}
@@ -0,0 +1,40 @@
+import pytest
+
+from adb_client import AdbCommandError
+from shell_session import ShellSession
+
+
+@pytest.fixture
+def session():
+    session = ShellSession.local()
+    yield session
+    session.close()
+
+
+def test_output_and_exit_code(session):
+    result = session.submit("echo one; echo two >&2; exit 3").result(10)
+    assert result.output == "one\ntwo\n"
+    assert result.returncode == 3
+
+
+def test_pipelined_commands_keep_their_order(session):
+    results = session.run_many([f"echo {number}; (exit {number % 2})" for number in range(20)], timeout=10)
+    assert [result.output for result in results] == [f"{number}\n" for number in range(20)]
+    assert [result.returncode for result in results] == [number % 2 for number in range(20)]
+
+
+def test_output_without_trailing_newline(session):
+    assert session.run("printf abc", timeout=10) == "abc"
+    assert session.run("printf ''", timeout=10) == ""
+
+
+def test_syntax_error_does_not_end_the_session(session):
+    assert session.submit("if then").result(10).returncode != 0
+    assert session.run("echo still here", timeout=10) == "still here\n"
+
+
+def test_check_raises(session):
+    with pytest.raises(AdbCommandError) as info:
+        session.run("echo nope; false", check=True, timeout=10)
+    assert info.value.returncode == 1
+    assert info.value.output == "nope\n"
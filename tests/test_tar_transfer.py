@@ -0,0 +1,174 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import zlib
+
+import pytest
+
+from tar_transfer import BLOCK, _StreamReader, extract_stream, write_stream
+
+LONG_NAME = "deeply/" + "nested_folder_name/" * 6 + "a_file_whose_path_is_well_over_one_hundred_bytes.txt"
+
+# Builds archives with the standard tarfile module. It runs isolated (-I) in another
+# directory because the repository's copy.py shadows the stdlib module tarfile imports.
+_STDLIB_WRITER = r"""
+import io, sys, tarfile
+members = [("plain.txt", b"hello"), ("empty.bin", b""), ("%s", b"long" * 300),
+           ("unicodé/файл.txt", "ü".encode() * 700)]
+with tarfile.open(sys.argv[1], "w" + sys.argv[3], format=getattr(tarfile, sys.argv[2])) as tar:
+    folder = tarfile.TarInfo("empty_dir")
+    folder.type = tarfile.DIRTYPE
+    folder.mode = 0o755
+    tar.addfile(folder)
+    for name, data in members:
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = 1600000000
+        tar.addfile(info, io.BytesIO(data))
+""" % LONG_NAME
+
+_STDLIB_READER = r"""
+import json, sys, tarfile
+with tarfile.open(sys.argv[1]) as tar:
+    print(json.dumps({m.name: tar.extractfile(m).read().decode() if m.isfile() else m.type.decode()
+                      for m in tar.getmembers()}))
+"""
+
+
+class FakeSocket:
+    def __init__(self, data, chunk=1000):
+        self.stream = io.BytesIO(data)
+        self.chunk = chunk
+
+    def recv(self, size):
+        return self.stream.read(min(size, self.chunk))
+
+
+class FakeConnection:
+    def __init__(self, data, chunk=1000):
+        self.sock = FakeSocket(data, chunk)
+
+
+def extract(data, local_dir, compressed=False):
+    return extract_stream(_StreamReader(FakeConnection(data), compressed), str(local_dir))
+
+
+def run_stdlib(script, *args, cwd):
+    result = subprocess.run([sys.executable, "-I", "-c", script, *args], cwd=str(cwd),
+                            capture_output=True, text=True, check=True)
+    return result.stdout
+
+
+def make_tree(root):
+    files = {
+        "plain.txt": b"hello",
+        "empty.bin": b"",
+        LONG_NAME: os.urandom(3000),
+        "sub/exact_block.bin": b"x" * BLOCK,
+    }
+    for name, data in files.items():
+        path = root.joinpath(*name.split("/"))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    (root / "empty_dir").mkdir()
+    return files
+
+
+def read_tree(root):
+    files, folders = {}, set()
+    for folder, dirs, names in os.walk(root):
+        rel = os.path.relpath(folder, root).replace(os.sep, "/")
+        if not dirs and not names and rel != ".":
+            folders.add(rel)
+        for name in names:
+            with open(os.path.join(folder, name), "rb") as f:
+                files[name if rel == "." else f"{rel}/{name}"] = f.read()
+    return files, folders
+
+
+def archive(root):
+    chunks = []
+    count = write_stream(str(root), chunks.append)
+    return b"".join(chunks), count
+
+
+def test_round_trip(tmp_path):
+    files = make_tree(tmp_path / "src")
+    data, count = archive(tmp_path / "src")
+    assert count == len(files)
+    assert len(data) % BLOCK == 0 and data.endswith(bytes(2 * BLOCK))
+    assert extract(data, tmp_path / "out") == len(files)
+    assert read_tree(tmp_path / "out") == (files, {"empty_dir"})
+
+
+def test_round_trip_gzip(tmp_path):
+    files = make_tree(tmp_path / "src")
+    data, _ = archive(tmp_path / "src")
+    deflater = zlib.compressobj(1, zlib.DEFLATED, 31)
+    compressed = deflater.compress(data) + deflater.flush()
+    assert extract(compressed, tmp_path / "out", compressed=True) == len(files)
+    assert read_tree(tmp_path / "out")[0] == files
+
+
+def test_stops_at_end_of_archive_blocks(tmp_path):
+    make_tree(tmp_path / "src")
+    data, count = archive(tmp_path / "src")
+    # Anything after the two zero blocks (e.g. a record-size pad) is not read as members
+    assert extract(data + b"garbage" * 100, tmp_path / "out") == count
+
+
+def test_mtime_is_kept(tmp_path):
+    (tmp_path / "src").mkdir()
+    path = tmp_path / "src" / "dated.txt"
+    path.write_bytes(b"x")
+    os.utime(path, (1500000000, 1500000000))
+    extract(archive(tmp_path / "src")[0], tmp_path / "out")
+    assert int(os.path.getmtime(tmp_path / "out" / "dated.txt")) == 1500000000
+
+
+def test_unsafe_paths_are_skipped(tmp_path):
+    run_stdlib(r"""
+import io, sys, tarfile
+with tarfile.open(sys.argv[1], "w", format=tarfile.GNU_FORMAT) as tar:
+    for name in ("../escape.txt", "/abs.txt", "ok.txt"):
+        info = tarfile.TarInfo(name)
+        info.size = 2
+        tar.addfile(info, io.BytesIO(b"hi"))
+""", str(tmp_path / "unsafe.tar"), cwd=tmp_path)
+    assert extract((tmp_path / "unsafe.tar").read_bytes(), tmp_path / "out" / "inner") == 1
+    assert os.listdir(tmp_path / "out") == ["inner"]
+    assert os.listdir(tmp_path / "out" / "inner") == ["ok.txt"]
+
+
+@pytest.mark.parametrize("fmt, compression", [
+    ("PAX_FORMAT", ""), ("GNU_FORMAT", ""), ("USTAR_FORMAT", ""), ("PAX_FORMAT", ":gz"),
+])
+def test_reads_stdlib_archives(tmp_path, fmt, compression):
+    path = tmp_path / "stdlib.tar"
+    script = _STDLIB_WRITER
+    if fmt == "USTAR_FORMAT":
+        # ustar splits the long path into prefix and name fields and is limited to ASCII
+        script = script.replace('("unicodé/файл.txt", "ü".encode() * 700)', '("u/f.txt", b"u" * 700)')
+    run_stdlib(script, str(path), fmt, compression, cwd=tmp_path)
+    assert extract(path.read_bytes(), tmp_path / "out", compressed=bool(compression)) == 4
+    files, folders = read_tree(tmp_path / "out")
+    assert files[LONG_NAME] == b"long" * 300
+    assert files["plain.txt"] == b"hello" and files["empty.bin"] == b""
+    assert folders == {"empty_dir"}
+    if fmt != "USTAR_FORMAT":
+        assert files["unicodé/файл.txt"] == "ü".encode() * 700
+    assert os.path.getmtime(tmp_path / "out" / "plain.txt") == 1600000000
+
+
+def test_stdlib_reads_our_archives(tmp_path):
+    files = make_tree(tmp_path / "src")
+    files = {name: data for name, data in files.items() if name != LONG_NAME}
+    (tmp_path / "src" / LONG_NAME.split("/")[0]).joinpath(*LONG_NAME.split("/")[1:]).write_bytes(b"long")
+    data, _ = archive(tmp_path / "src")
+    (tmp_path / "ours.tar").write_bytes(data)
+    members = json.loads(run_stdlib(_STDLIB_READER, str(tmp_path / "ours.tar"), cwd=tmp_path))
+    assert members[LONG_NAME] == "long"
+    assert members["plain.txt"] == "hello" and members["empty.bin"] == ""
+    assert members["empty_dir"] == "5"
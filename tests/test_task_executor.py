@@ -0,0 +1,69 @@
+import threading
+
+from task_executor import DONE, FAILED, TaskExecutor
+
+
+class FakeRoot:
+    """Stands in for Tk: after() callbacks run only when the test pumps them."""
+
+    def __init__(self):
+        self.pending = []
+
+    def after(self, ms, callback):
+        self.pending.append(callback)
+
+    def pump(self):
+        pending, self.pending = self.pending, []
+        for callback in pending:
+            callback()
+
+
+def test_errors_reach_the_ui_thread_with_their_message():
+    root = FakeRoot()
+    executor = TaskExecutor(root)
+    seen = []
+
+    def work(task):
+        raise RuntimeError("no device")
+
+    task = executor.submit("Screenshot", work,
+                           on_error=lambda task, error: seen.append((threading.current_thread(), str(error))))
+    task.future.result()
+    assert task.status == FAILED
+    # Nothing touches the UI until the Tk thread polls the queue
+    assert seen == []
+    root.pump()
+    assert seen == [(threading.current_thread(), "no device")]
+    executor.shutdown()
+
+
+def test_results_and_ui_calls_are_posted():
+    root = FakeRoot()
+    executor = TaskExecutor(root)
+    seen = []
+
+    def work(task):
+        task.call_ui(seen.append, "progress")
+        return "result"
+
+    task = executor.submit("Job", work, on_success=seen.append)
+    task.future.result()
+    assert task.status == DONE
+    root.pump()
+    assert seen == ["progress", "result"]
+    executor.shutdown()
+
+
+def test_dedicated_tasks_leave_the_pool_free():
+    root = FakeRoot()
+    executor = TaskExecutor(root, max_workers=1)
+    release = threading.Event()
+    mirror = executor.submit("Mirror", lambda task: release.wait(5), dedicated=True)
+    short = executor.submit("Short", lambda task: "done")
+    assert short.future.result(5) is None and short.status == DONE
+    assert not mirror.future.done()
+    mirror.cancel()
+    assert mirror.cancelled
+    release.set()
+    mirror.future.result(5)
+    executor.shutdown()
@@ -0,0 +1,85 @@
+import math
+
+import pytest
+
+from telemetry import _SECTION, TelemetryRecorder, TelemetrySeries, parse_battery, zone_names
+
+BATTERY = """Current Battery Service state:
+  AC powered: false
+  USB powered: true
+  Wireless powered: false
+  Max charging current: 500000
+  Max charging voltage: 5000000
+  Charge counter: 3154000
+  status: 2
+  health: 2
+  present: true
+  level: 83
+  scale: 100
+  voltage: {voltage}
+  temperature: 312
+  technology: Li-ion
+"""
+
+
+@pytest.mark.parametrize("voltage", ["4213", "4213000"])
+def test_parse_battery_voltage_in_mv_or_uv(voltage):
+    values = parse_battery(BATTERY.format(voltage=voltage))
+    assert values["voltage"] == pytest.approx(4.213)
+    assert values["level"] == 83.0
+    assert values["temperature"] == pytest.approx(31.2)
+    assert values["plugged"] == 2.0
+
+
+def test_parse_battery_level_scale_and_garbage():
+    values = parse_battery("  level: 50\n  scale: 200\n  AC powered: true\n  Dock powered: true\n")
+    assert values == {"level": 25.0, "plugged": 9.0}
+    assert parse_battery("Can't find service: battery\n") == {"plugged": 0.0}
+
+
+def test_late_metric_is_backfilled_with_nan():
+    series = TelemetrySeries()
+    series.append(1.0, {"level": 80})
+    series.append(2.0, {"level": 79, "thermal_cpu0": 41.5})
+    series.append(3.0, {"thermal_cpu0": 42.0})
+    assert len(series) == 3
+    assert series.names() == ["level", "thermal_cpu0"]
+    level, cpu = series.columns["level"], series.columns["thermal_cpu0"]
+    assert math.isnan(cpu[0]) and list(cpu[1:]) == [41.5, 42.0]
+    assert list(level[:2]) == [80.0, 79.0] and math.isnan(level[2])
+    assert math.isnan(series.latest()["level"])
+
+
+def test_downsample_buckets():
+    series = TelemetrySeries()
+    for index in range(10):
+        series.append(float(index), {"level": float(index)} if index not in (5, 6) else {})
+    # Few enough points: returned as recorded, minus the gaps
+    times, values = series.downsample("level", max_points=20)
+    assert times == [0.0, 1.0, 2.0, 3.0, 4.0, 7.0, 8.0, 9.0] and values == times
+    # Buckets of 2.5 rows: [0, 2), [2, 5), [5, 7) with only NaN, [7, 10)
+    times, values = series.downsample("level", max_points=4)
+    assert times == [0.0, 3.0, 8.0]
+    assert values == [0.5, 3.0, 8.0]
+    assert series.downsample("missing", max_points=4) == ([], [])
+
+
+def test_record_with_missing_sections():
+    recorder = TelemetryRecorder(client=None)
+    recorder._zones = zone_names("/sys/class/thermal/thermal_zone0/type:cpu0\n"
+                                 "/sys/class/thermal/thermal_zone1/type:battery\n")
+    # Only the battery dump came back: no current and no thermal zones
+    recorder.record(BATTERY.format(voltage="4213"), timestamp=1.0)
+    recorder.record(f"{BATTERY.format(voltage='4200')}{_SECTION}\n-152000\n{_SECTION}\n"
+                    "/sys/class/thermal/thermal_zone0/temp:45200\n"
+                    "/sys/class/thermal/thermal_zone1/temp:31\n"
+                    "/sys/class/thermal/thermal_zone7/temp:garbage\n", timestamp=2.0)
+    recorder.record("", timestamp=3.0)
+    series = recorder.series
+    assert len(series) == 3 and recorder.generation == 3
+    assert math.isnan(series.columns["current"][0]) and series.columns["current"][1] == -152.0
+    assert series.columns["thermal_cpu0"][1] == pytest.approx(45.2)
+    assert series.columns["thermal_battery"][1] == 31.0
+    assert "thermal_7" not in series.columns
+    assert series.latest()["plugged"] == 0.0
+    assert math.isnan(series.latest()["voltage"])